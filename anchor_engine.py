@@ -0,0 +1,416 @@
+"""
+Headless ground anchor calculations.
+
+Runs the three analysis modes of the app (check capacity, design length,
+safety factor) without Streamlit or Plotly and returns structured results.
+Also usable from the command line:
+
+    python -m anchor_engine design --soil soil.csv --free-length 5 --angle 45 --diameter 150 --load 30 --fos 3
+    python -m anchor_engine --input case.json
+"""
+import argparse
+import csv
+import json
+import sys
+from dataclasses import asdict, dataclass, field, fields
+from types import SimpleNamespace
+
+import numpy as np
+
+import capacity
+import profiling
+
+MODE_CHECK = "check"
+MODE_DESIGN = "design"
+MODE_SAFETY = "safety"
+MODES = (MODE_CHECK, MODE_DESIGN, MODE_SAFETY)
+
+# SNI 8460:2017 limits
+MIN_FREE_LENGTH = 4.5
+PULLOUT_TEST_BOND_LENGTH = 13.0
+MIN_SPT = {"Sand": 25, "Clay": 20}
+
+MAX_BOND_LENGTH = 100.0
+LENGTH_STEP = 0.1
+
+
+@dataclass
+class Anchor:
+    free_length: float
+    angle_deg: float
+    dia_mm: float
+    design_load: float
+    bond_length: float = 0.0
+    fos: float = 1.0
+    enlarge_coeff: float = 1.0
+    elevation: float = 0.0
+
+    @property
+    def sin_theta(self):
+        return float(np.sin(np.radians(self.angle_deg)))
+
+    @property
+    def bond_start(self):
+        return self.elevation + (self.free_length * self.sin_theta)
+
+
+@dataclass
+class Notice:
+    code: str
+    title: str
+    message: str
+
+
+@dataclass
+class LayerResult:
+    top: float
+    bottom: float
+    soil_type: str
+    spt: float
+    thickness: float
+    bond_length: float
+    ultimate_bond_stress: float
+    working_bond_stress: float
+    working_capacity: float
+
+
+@dataclass
+class AnchorResult:
+    mode: str
+    anchor: Anchor
+    bond_length: float
+    fos: float
+    bond_start: float
+    bond_end: float
+    ultimate_capacity: float = 0.0
+    working_capacity: float = 0.0
+    layers: list = field(default_factory=list)
+    warnings: list = field(default_factory=list)
+    violations: list = field(default_factory=list)
+    error: Notice = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def passed(self):
+        """Whether the anchor satisfies the design load (always True for solved modes)."""
+        if not self.ok:
+            return False
+        if self.mode == MODE_CHECK:
+            return self.working_capacity >= self.anchor.design_load
+        return True
+
+    @property
+    def status(self):
+        if not self.ok:
+            return "ERROR"
+        return "PASS" if self.passed else "FAIL"
+
+    def layer_rows(self):
+        """Per-layer table in the format shown by the app."""
+        return [{
+            "Range": f"{l.top}m - {l.bottom}m",
+            "Soil Thickness (m)": round(l.thickness, 2), "Bond Length (m)": round(l.bond_length, 2),
+            "Type": l.soil_type, "Ultimate Bond Stress (kg/cm²)": round(l.ultimate_bond_stress, 4),
+            "Working Bond Stress (kg/cm²)": round(l.working_bond_stress, 4), "Working Capacity (Tons)": round(l.working_capacity, 2)
+        } for l in self.layers]
+
+    def to_dict(self):
+        out = asdict(self)
+        out["status"] = self.status
+        return out
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict."""
+        data = {k: v for k, v in data.items() if k != "status"}
+        data["anchor"] = Anchor(**data["anchor"])
+        data["layers"] = [LayerResult(**l) for l in data["layers"]]
+        data["warnings"] = [Notice(**n) for n in data["warnings"]]
+        data["violations"] = [Notice(**n) for n in data["violations"]]
+        data["error"] = Notice(**data["error"]) if data["error"] else None
+        return cls(**data)
+
+
+def input_error(mode, anchor):
+    """Notice for anchor inputs no analysis can use (non-finite or out of range), else None."""
+    return input_errors(mode, anchor)[0]
+
+
+def input_errors(mode, anchors):
+    """
+    `input_error` for anchors given as arrays of the Anchor fields (one entry
+    per anchor, e.g. wall.WallAnchors): a Notice or None per anchor.
+    """
+    required = {"angle_deg": "Angle of inclination", "dia_mm": "Borehole diameter", "design_load": "Design load",
+                "enlarge_coeff": "Enlargement coefficient"}
+    if mode != MODE_SAFETY:
+        required["fos"] = "Factor of safety"
+    if mode != MODE_DESIGN:
+        required["bond_length"] = "Bond length"
+    # (field, is invalid, message) in the order the checks are reported
+    checks = [(name, lambda v: ~np.isfinite(v) | (v <= 0), f"{label} must be a positive number (got {{}}).")
+              for name, label in required.items()]
+    checks.append(("angle_deg", lambda v: v > 90, "Angle of inclination must be at most 90° (got {})."))
+    checks.append(("free_length", lambda v: ~np.isfinite(v) | (v < 0), "Free length must be a finite, non-negative number (got {})."))
+    checks.append(("elevation", lambda v: ~np.isfinite(v), "Anchor elevation must be a finite, non-negative number (got {})."))
+
+    n = np.size(anchors.angle_deg)
+    errors = [None] * n
+    for name, invalid, message in checks:
+        values = np.broadcast_to(np.asarray(getattr(anchors, name), dtype=float), (n,))
+        with np.errstate(invalid="ignore"):
+            bad = invalid(values)
+        for i in np.flatnonzero(bad):
+            if errors[i] is None:
+                errors[i] = Notice("invalid_input", "Invalid Input", message.format(float(values[i])))
+    return errors
+
+
+# ========== Analysis Modes ==========
+def check_capacity(anchor, strata, profile=None):
+    """Working capacity of an anchor with fixed bond length and SF."""
+    return analyse(MODE_CHECK, anchor, strata, profile=profile)
+
+
+def design_length(anchor, strata, profile=None, step=LENGTH_STEP):
+    """Bond length required to carry the design load with the given SF."""
+    return analyse(MODE_DESIGN, anchor, strata, profile=profile, step=step)
+
+
+def safety_factor(anchor, strata, profile=None):
+    """Actual SF of an anchor with fixed bond length under the design load."""
+    return analyse(MODE_SAFETY, anchor, strata, profile=profile)
+
+
+def analyse(mode, anchor, strata, profile=None, step=LENGTH_STEP):
+    """
+    Run one analysis mode. `strata` is a capacity.Stratigraphy; pass `profile`
+    to reuse a CapacityProfile already built for the anchor's diameter.
+    `step` rounds the design length up (None keeps the exact root).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown analysis mode {mode!r}, expected one of {MODES}")
+    invalid = input_error(mode, anchor)
+    if invalid is not None:
+        return _invalid(mode, anchor, invalid)
+    if profile is None:
+        with profiling.stage("capacity_profile"):
+            profile = capacity.CapacityProfile(strata, anchor.dia_mm, anchor.enlarge_coeff)
+
+    sin_theta = anchor.sin_theta
+    z_s = anchor.bond_start
+    bond_l = anchor.bond_length
+    fos = anchor.fos
+
+    if mode == MODE_DESIGN:
+        with profiling.stage("design_solve"):
+            solved_l = float(profile.required_bond_length(z_s, sin_theta, anchor.design_load * fos, step=step))
+        error = _design_error(solved_l, strata.max_depth)
+        if error is None:
+            bond_l = solved_l
+    else:
+        z_e = z_s + bond_l * sin_theta
+        error = _tip_error(z_e, strata.max_depth)
+        if mode == MODE_SAFETY:
+            fos = float(profile.capacity(z_s, z_e, sin_theta) / anchor.design_load)
+            error = error or _capacity_error(fos)
+
+    overlaps = None if error else profile.overlaps(z_s, z_s + bond_l * sin_theta)
+    return _result(mode, anchor, strata, bond_l, fos, error, overlaps, profile.effective_dia_cm)
+
+
+def analyse_many(mode, anchors, stratigraphies, step=LENGTH_STEP):
+    """
+    `analyse` for many anchors, each with its own stratigraphy, with the design
+    solve, capacities and layer overlaps evaluated together over one
+    capacity.ProfileStack. Results are the same as calling `analyse` per anchor.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown analysis mode {mode!r}, expected one of {MODES}")
+    results = [None] * len(anchors)
+    valid = []
+    for i, anchor in enumerate(anchors):
+        invalid = input_error(mode, anchor)
+        if invalid is not None:
+            results[i] = _invalid(mode, anchor, invalid)
+        else:
+            valid.append(i)
+    if not valid:
+        return results
+
+    anchors_v = [anchors[i] for i in valid]
+    strata_v = [stratigraphies[i] for i in valid]
+    columns = {name: np.array([getattr(a, name) for a in anchors_v], dtype=float) for name in (f.name for f in fields(Anchor))}
+    with profiling.stage("capacity_profile"):
+        stack = capacity.ProfileStack.from_stratigraphies(strata_v, columns["dia_mm"], columns["enlarge_coeff"])
+    bond_l, fos, z_s, z_e, errors = solve_stack(mode, SimpleNamespace(**columns), stack, step=step)
+
+    overlaps = stack.overlaps(z_s, z_e)
+    for k, i in enumerate(valid):
+        strata = strata_v[k]
+        results[i] = _result(mode, anchors_v[k], strata, float(bond_l[k]), float(fos[k]), errors[k],
+                             None if errors[k] else overlaps[k, :len(strata)], float(stack.effective_dia_cm[k]))
+    return results
+
+
+def solve_stack(mode, anchors, stack, step=LENGTH_STEP):
+    """
+    Bond lengths and SFs of anchors given as arrays of the Anchor fields, one
+    per row of a capacity.ProfileStack, whose inputs have passed
+    `input_errors`: (bond_length, fos, bond_start, bond_end, errors), with a
+    Notice or None per anchor in errors.
+    """
+    sin_theta = np.sin(np.radians(anchors.angle_deg))
+    z_s = anchors.elevation + anchors.free_length * sin_theta
+    bond_l = np.array(anchors.bond_length, dtype=float)
+    fos = np.array(anchors.fos, dtype=float)
+    max_depth = stack.max_depth.tolist()
+
+    if mode == MODE_DESIGN:
+        with profiling.stage("design_solve"):
+            solved_l = stack.required_bond_length(z_s, sin_theta, anchors.design_load * fos, step=step)
+        errors = [_design_error(l, d) for l, d in zip(solved_l.tolist(), max_depth)]
+        bond_l = np.where([e is None for e in errors], solved_l, bond_l)
+    else:
+        z_e = z_s + bond_l * sin_theta
+        errors = [_tip_error(z, d) for z, d in zip(z_e.tolist(), max_depth)]
+        if mode == MODE_SAFETY:
+            fos = stack.capacity(z_s, z_e, sin_theta) / anchors.design_load
+            errors = [e or _capacity_error(f) for e, f in zip(errors, fos.tolist())]
+    return bond_l, fos, z_s, z_s + bond_l * sin_theta, errors
+
+
+def _invalid(mode, anchor, error):
+    return AnchorResult(mode=mode, anchor=anchor, bond_length=anchor.bond_length, fos=anchor.fos,
+                        bond_start=anchor.elevation, bond_end=anchor.elevation, error=error)
+
+
+def _design_error(solved_l, max_depth):
+    if np.isnan(solved_l):
+        return Notice("insufficient_soil", "Insufficient Soil Data",
+                      f"Depth reached {max_depth}m without meeting capacity.")
+    if solved_l > MAX_BOND_LENGTH:
+        return Notice("length_limit", "Error",
+                      f"Required bond length ({solved_l:.2f}m) exceeds the {MAX_BOND_LENGTH:.0f}m search limit.")
+    return None
+
+
+def _tip_error(z_e, max_depth):
+    if z_e > max_depth:
+        return Notice("tip_below_soil", "Error", f"Anchor tip ({z_e:.2f}m) exceeds defined soil depth ({max_depth}m).")
+    return None
+
+
+def _capacity_error(fos):
+    if fos <= 0:
+        return Notice("no_capacity", "Insufficient Capacity",
+                      "The bonded soil layers provide no bond capacity (SPT 0), so no safety factor exists.")
+    return None
+
+
+def _result(mode, anchor, strata, bond_l, fos, error, overlaps, effective_dia_cm):
+    """AnchorResult of a solved anchor with its SNI warnings and, without an error, the per-layer breakdown."""
+    warnings = []
+    if anchor.free_length < MIN_FREE_LENGTH:
+        warnings.append(Notice("free_length", "SNI 8460:2017 Warning", f"Minimum free length should be {MIN_FREE_LENGTH}m."))
+    if bond_l > PULLOUT_TEST_BOND_LENGTH and error is None:
+        prefix = "Calculated Bond length" if mode == MODE_DESIGN else "Bond length"
+        warnings.append(Notice("bond_length", "SNI 8460:2017 Warning",
+                               f"{prefix} > {PULLOUT_TEST_BOND_LENGTH:.0f}m requires on-site pullout test."))
+
+    z_s = anchor.bond_start
+    result = AnchorResult(mode=mode, anchor=anchor, bond_length=bond_l, fos=fos,
+                          bond_start=z_s, bond_end=z_s + bond_l * anchor.sin_theta,
+                          warnings=warnings, error=error)
+    if error is None:
+        with profiling.stage("assemble_layers"):
+            _assemble_layers(result, strata, overlaps, effective_dia_cm)
+    return result
+
+
+def _assemble_layers(result, strata, overlaps, effective_dia_cm):
+    """Fill in the per-layer breakdown, totals and SNI minimum SPT checks."""
+    sin_theta = result.anchor.sin_theta
+    tops, bottoms = strata.tops.tolist(), strata.bottoms.tolist()
+
+    for i in np.flatnonzero(overlaps > 0):
+        soil_type, spt = str(strata.soil_types[i]), float(strata.spt[i])
+        min_spt = MIN_SPT.get(soil_type)
+        if min_spt is not None and spt < min_spt:
+            result.violations.append(Notice("min_spt", "SNI Violation",
+                                            f"{soil_type} at {tops[i]}m-{bottoms[i]}m has SPT < {min_spt}."))
+
+        z_overlap = float(overlaps[i])
+        act_l = z_overlap / sin_theta
+        qs_ult = float(strata.bond_strength[i])
+        qs_work = qs_ult / result.fos
+        cap = (qs_work * (np.pi * effective_dia_cm * act_l * 100.0)) / 1000.0
+        result.working_capacity += cap
+        result.ultimate_capacity += cap * result.fos
+
+        result.layers.append(LayerResult(top=tops[i], bottom=bottoms[i], soil_type=soil_type, spt=spt,
+                                         thickness=z_overlap, bond_length=act_l, ultimate_bond_stress=qs_ult,
+                                         working_bond_stress=qs_work, working_capacity=cap))
+
+
+# ========== Command Line ==========
+def read_soil_csv(path):
+    """Read a stratigraphy CSV with 'Elevation (m)', 'Soil Type' and 'SPT' columns."""
+    with open(path, newline="") as f:
+        return capacity.Stratigraphy.from_records(csv.DictReader(f))
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m anchor_engine", description="Ground anchor capacity calculations.")
+    parser.add_argument("mode", nargs="?", choices=MODES, help="analysis mode (overrides 'mode' in --input)")
+    parser.add_argument("--input", help="JSON case with 'mode', 'anchor' and 'soil' (list of layer rows)")
+    parser.add_argument("--soil", help="stratigraphy CSV (overrides 'soil' in --input)")
+    parser.add_argument("--free-length", type=float)
+    parser.add_argument("--bond-length", type=float)
+    parser.add_argument("--angle", type=float, dest="angle_deg")
+    parser.add_argument("--diameter", type=float, dest="dia_mm")
+    parser.add_argument("--enlargement", type=float, dest="enlarge_coeff")
+    parser.add_argument("--elevation", type=float)
+    parser.add_argument("--load", type=float, dest="design_load")
+    parser.add_argument("--fos", type=float)
+    parser.add_argument("--exact", action="store_true", help="report the exact design length instead of rounding up to 0.1 m")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    case = {}
+    if args.input:
+        with open(args.input) as f:
+            case = json.load(f)
+
+    mode = args.mode or case.get("mode", MODE_CHECK)
+    params = dict(case.get("anchor", {}))
+    for name in ("free_length", "bond_length", "angle_deg", "dia_mm", "enlarge_coeff", "elevation", "design_load", "fos"):
+        value = getattr(args, name)
+        if value is not None:
+            params[name] = value
+
+    if args.soil:
+        strata = read_soil_csv(args.soil)
+    elif "soil" in case:
+        strata = capacity.Stratigraphy.from_records(case["soil"])
+    else:
+        sys.exit("error: no stratigraphy given (use --soil or 'soil' in --input)")
+
+    try:
+        anchor = Anchor(**params)
+    except TypeError as exc:
+        sys.exit(f"error: incomplete anchor definition ({exc})")
+
+    result = analyse(mode, anchor, strata, step=None if args.exact else LENGTH_STEP)
+    json.dump(result.to_dict(), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0 if result.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
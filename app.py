@@ -1,13 +1,145 @@
+import collections
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
+import anchor_engine
+import batch
+import capacity
 import formulas
+import incremental
+import logs
+import optimiser
+import parametric
 import plots
+import profiling
+import reliability
+import report
+import result_cache
+import wall
 
 st.set_page_config(layout="wide", page_title="Ground Anchor Analysis")
 
+ENGINE_MODES = {
+    "Check Capacity (Fixed Length & SF)": anchor_engine.MODE_CHECK,
+    "Design Mode (Find Required Length)": anchor_engine.MODE_DESIGN,
+    "Safety Check (Find Actual SF)": anchor_engine.MODE_SAFETY,
+}
+
+MAX_COMPARED_ANCHORS = 2000
+DIAGNOSTIC_RUNS = 10
+
+DEFAULT_SOIL = [
+    {"Elevation (m)": 8.0, "Soil Type": "Clay", "SPT": 25.0},
+    {"Elevation (m)": 20.0, "Soil Type": "Sand", "SPT": 25.0},
+]
+
+def soil_editor(key=None, uncertainty=False, data=None):
+    init_data = pd.DataFrame(DEFAULT_SOIL if data is None else data, columns=list(DEFAULT_SOIL[0]))
+    column_config = {
+        "Soil Type": st.column_config.SelectboxColumn("Soil Type", options=["Clay", "Sand"], required=True),
+        "SPT": st.column_config.NumberColumn("SPT Value", min_value=1),
+        "Elevation (m)": st.column_config.NumberColumn("Bottom Elevation (m)", min_value=0.1)
+    }
+    if uncertainty:
+        init_data["SPT COV"] = 0.3
+        init_data["Distribution"] = "lognormal"
+        column_config["SPT COV"] = st.column_config.NumberColumn("SPT COV", min_value=0.0, max_value=2.0, step=0.05)
+        column_config["Distribution"] = st.column_config.SelectboxColumn("Distribution", options=list(reliability.DISTRIBUTIONS), required=True)
+
+    return st.data_editor(
+        init_data,
+        num_rows="dynamic",
+        use_container_width=True,
+        key=key,
+        column_config=column_config
+    )
+
+# --- CACHED REFERENCE CONTENT ---
+# Shared across sessions; keyed on the correlation version so a change to
+# the correlations invalidates everything built from them. The figures are
+# shared objects (cache_resource): unpickling them on every cache_data hit is
+# slower than building them. st.plotly_chart serialises a copy, so they are
+# never modified. The small tables stay in cache_data, whose copies are cheap.
+@st.cache_resource(show_spinner=False)
+def benchmark_figures(correlation_version):
+    return {
+        "granular": plots.plot_granular_benchmark(),
+        "clay": plots.plot_clay_benchmark(),
+        "comparison_100": plots.plot_comparison_benchmark(100),
+        "comparison_30": plots.plot_comparison_benchmark(30),
+    }
+
+@st.cache_data(show_spinner=False)
+def benchmark_table(correlation_version):
+    return pd.DataFrame(plots.get_benchmark_table()).set_index("SPT")
+
+@st.cache_data(show_spinner=False)
+def crossover_point(correlation_version):
+    return formulas.crossover_spt()
+
+@st.cache_data(show_spinner=False)
+def alpha_table():
+    return pd.DataFrame({
+        "Soil Type": [
+            "Gravel", "Sandy gravel", "Gravelly sand", 
+            "Coarse / Medium / Fine / Silty sand", "Silt", "Clay", 
+            "Marl / Marly limestone", "Altered or fragmented rock"
+        ],
+        "Coefficient α": ["1.3 - 1.4", "1.2 - 1.4", "1.2 - 1.3", "1.1 - 1.2", "1.1 - 1.2", "1.2", "1.1 - 1.2", "1.1"]
+    })
+
+@st.cache_resource(show_spinner=False)
+def anchor_sketch():
+    with open("anchor-sketch.png", "rb") as f:
+        return f.read()
+
+@st.cache_data(show_spinner="Importing log...", max_entries=8)
+def imported_log(data, name, tolerance, min_thickness, soil_type):
+    return logs.read_log(data, tolerance=tolerance, min_thickness=min_thickness, default_soil_type=soil_type, name=name)
+
+@st.cache_resource(show_spinner=False)
+def result_store():
+    return result_cache.ResultCache()
+
+def diagnostics_panel(runs, slot):
+    with slot.container(), st.expander("Diagnostics", expanded=True):
+        latest_first = list(range(len(runs)))[::-1]
+        shown = st.selectbox("Run", latest_first, format_func=lambda i: (
+            f"{runs[i].label} · {time.strftime('%H:%M:%S', time.localtime(runs[i].wall_time))} · {runs[i].duration_ns / 1e6:.0f} ms"))
+        st.dataframe(pd.DataFrame(runs[shown].summary(), columns=["Stage", "Calls", "Total (ms)", "Mean (ms)", "Memory Δ (MB)"]),
+                     use_container_width=True, hide_index=True)
+        st.download_button("Export Chrome Trace", json.dumps(profiling.chrome_trace(runs)),
+                           "anchor_trace.json", "application/json", use_container_width=True)
+
 # --- NAVIGATION ---
-page = st.sidebar.selectbox("Select Page", ["Main Analysis", "Documentation"])
+page = st.sidebar.selectbox("Select Page", ["Main Analysis", "Parametric Study", "Reliability Analysis", "Anchor Optimiser", "Wall Layout", "Batch Project", "Documentation"])
+
+def cache_stats_panel(slot):
+    cache_stats = result_store().stats()
+    with slot.container():
+        c1, c2 = st.columns(2)
+        c1.metric("Hits", f"{cache_stats['hits']}")
+        c2.metric("Misses", f"{cache_stats['misses']}")
+        c1.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+        c2.metric("Entries", f"{cache_stats['entries']}")
+        st.caption(f"{cache_stats['bytes'] / 1024 ** 2:.1f} MB in `{result_store().path}`")
+
+with st.sidebar.expander("Result Cache"):
+    use_result_cache = st.toggle("Reuse stored results", value=True)
+    # Slots for the stats and the diagnostics, so the main analysis fragment
+    # can redraw them after a rerun that skips the rest of the script
+    cache_stats_slot = st.empty()
+    cache_stats_panel(cache_stats_slot)
+    if st.button("Clear Cache", use_container_width=True):
+        result_store().clear()
+        st.rerun()
 
 def benchmark_page():
     st.title("📚 Bond Strength & Design Benchmark Reference")
@@ -38,7 +170,7 @@ def benchmark_page():
 
 
     # Attach the image here
-    st.image("anchor-sketch.png", caption="Schematic representation of a tie rod grouted in a multilayer soil profile.", width=450)
+    st.image(anchor_sketch(), caption="Schematic representation of a tie rod grouted in a multilayer soil profile.", width=450)
     st.divider()
 
     # --- SECTION 2: ENLARGEMENT COEFFICIENT ---
@@ -54,15 +186,7 @@ def benchmark_page():
     
     with col_a:
         st.subheader("Typical Values for α")
-        alpha_data = {
-            "Soil Type": [
-                "Gravel", "Sandy gravel", "Gravelly sand", 
-                "Coarse / Medium / Fine / Silty sand", "Silt", "Clay", 
-                "Marl / Marly limestone", "Altered or fragmented rock"
-            ],
-            "Coefficient α": ["1.3 - 1.4", "1.2 - 1.4", "1.2 - 1.3", "1.1 - 1.2", "1.1 - 1.2", "1.2", "1.1 - 1.2", "1.1"]
-        }
-        st.table(pd.DataFrame(alpha_data))
+        st.table(alpha_table())
 
     with col_b:
         st.info("""
@@ -75,42 +199,445 @@ def benchmark_page():
     # --- SECTION 3: GRAPHS ---
     st.header("3. Bond Strength Benchmarks ($q_s$)")
     
+    figures = benchmark_figures(formulas.CORRELATION_VERSION)
     graph_col1, graph_col2 = st.columns(2)
     
     with graph_col1:
-        st.plotly_chart(plots.plot_granular_benchmark(), use_container_width=True)
-        st.plotly_chart(plots.plot_comparison_benchmark(100), use_container_width=True)
+        st.plotly_chart(figures["granular"], use_container_width=True)
+        st.plotly_chart(figures["comparison_100"], use_container_width=True)
 
     with graph_col2:
-        st.plotly_chart(plots.plot_clay_benchmark(), use_container_width=True)
-        st.plotly_chart(plots.plot_comparison_benchmark(30), use_container_width=True)
+        st.plotly_chart(figures["clay"], use_container_width=True)
+        st.plotly_chart(figures["comparison_30"], use_container_width=True)
+
+    with st.expander("Bond strength at selected SPT values"):
+        st.table(benchmark_table(formulas.CORRELATION_VERSION))
 
     st.divider()
 
     # --- SECTION 4: CROSSOVER SUMMARY ---
     st.subheader("🎯 Engineering Insights: The Crossover Point")
-    st.success("""
-    * **Clay Advantage:** In soft soils with **SPT < 41**, Clay typically provides a higher bond strength than Sand for the same N-value.
-    * **Sand Advantage:** In denser soils where **SPT > 41**, the linear growth of Sand bond strength (0.005 x N) overtakes the piecewise growth characteristic of Clay.
-    * **Critical Value:** At approximately **SPT 41.25**, the two models intersect at a bond strength of ~0.206 MPa.
+    crossover = crossover_point(formulas.CORRELATION_VERSION)
+    if crossover is None:
+        st.info("ℹ️ **No crossover:** With the current correlations the Sand and Clay curves do not intersect, "
+                "so neither soil type gives the higher bond strength over the whole SPT range.")
+        return
+    crossover_spt, crossover_qs = crossover
+    st.success(f"""
+    * **Clay Advantage:** In soft soils with **SPT < {crossover_spt:.0f}**, Clay typically provides a higher bond strength than Sand for the same N-value.
+    * **Sand Advantage:** In denser soils where **SPT > {crossover_spt:.0f}**, the linear growth of Sand bond strength (0.005 x N) overtakes the piecewise growth characteristic of Clay.
+    * **Critical Value:** At approximately **SPT {crossover_spt:.2f}**, the two models intersect at a bond strength of ~{crossover_qs:.3f} MPa.
     """)
 
-if page == "Documentation":
-    benchmark_page()
+def report_folder():
+    """Empty temporary folder for this session's report files; the previous run's folder is removed."""
+    previous = st.session_state.get("report_folder")
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+    st.session_state["report_folder"] = tempfile.mkdtemp(prefix="anchor_report_")
+    return st.session_state["report_folder"]
+
+def read_file(path):
+    """Download data that reads `path` only when the button is clicked."""
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+def batch_page():
+    st.title("🗂️ Batch Project Analysis")
+    st.markdown("""
+    Evaluate every anchor of a project in one run. Upload an **anchors CSV**
+    (`anchor_id, borehole, free_length, bond_length, angle_deg, dia_mm, enlarge_coeff, elevation, design_load, fos`)
+    and a **boreholes CSV** (`borehole, Elevation (m), Soil Type, SPT`, layers listed top to bottom).
+    """)
 
-else:
-    st.title("📊 Ground Anchor Ultimate Bond Strength Analysis")
+    batch_mode = st.sidebar.radio("Batch Analysis Mode", list(ENGINE_MODES))
+    workers = st.sidebar.number_input("Worker Processes", min_value=1, value=4, step=1)
+    chunk_size = st.sidebar.number_input("Anchors per Task", min_value=1, value=256, step=32)
+    build_report = st.sidebar.checkbox("Build Excel / HTML Report", help="Calculation report of every anchor, "
+                                       "written from the batch results as they arrive (one figure per borehole and geometry).")
+
+    up_col1, up_col2 = st.columns(2)
+    anchors_file = up_col1.file_uploader("Anchors CSV", type="csv")
+    boreholes_file = up_col2.file_uploader("Boreholes CSV", type="csv")
+
+    if not (anchors_file and boreholes_file):
+        st.info("💡 Upload both CSV files to start.")
+        return
+    if not st.button("Run Batch", use_container_width=True):
+        return
+
+    try:
+        boreholes = batch.read_boreholes(io.StringIO(boreholes_file.getvalue().decode("utf-8-sig")))
+        anchors = batch.read_anchors(io.StringIO(anchors_file.getvalue().decode("utf-8-sig")))
+    except (KeyError, ValueError, TypeError) as exc:
+        st.error(f"❌ **Invalid Input**: {exc}")
+        return
+
+    mode = ENGINE_MODES[batch_mode]
+    reports, report_paths = [], {}
+    if build_report:
+        # Streamed to files so the report is never held in memory; read back only on download
+        folder = report_folder()
+        report_paths = {"excel": os.path.join(folder, "anchor_report.xlsx") if report.excel_supported() else None,
+                        "html": os.path.join(folder, "anchor_report.html")}
+        reports = report.open_reports(mode, boreholes, excel=report_paths["excel"], html_target=report_paths["html"])
+
+    progress = st.progress(0.0, text="Starting...")
+    start = time.perf_counter()
+    summaries, layers = [], []
+    for chunk, results in batch.iter_batch(mode, anchors, boreholes, workers=int(workers), chunk_size=int(chunk_size),
+                                           cache_path=result_store().path if use_result_cache else None):
+        chunk_summaries, chunk_layers = batch.result_rows(mode, chunk, results)
+        summaries.extend(chunk_summaries)
+        layers.extend(chunk_layers)
+        for (anchor_id, borehole, anchor), result in zip(chunk, results):
+            for writer in reports:
+                writer.add(anchor_id, borehole, anchor, result, mode)
+        elapsed = time.perf_counter() - start
+        progress.progress(len(summaries) / len(anchors),
+                          text=f"{len(summaries)}/{len(anchors)} anchors ({len(summaries) / max(elapsed, 1e-9):.0f} anchors/s)")
+    elapsed = time.perf_counter() - start
+
+    summary_df = pd.DataFrame(summaries, columns=batch.SUMMARY_COLUMNS)
+    layers_df = pd.DataFrame(layers, columns=batch.LAYER_COLUMNS)
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Anchors", f"{len(summary_df)}")
+    m2.metric("Wall Time", f"{elapsed:.2f} s")
+    m3.metric("Throughput", f"{len(summary_df) / max(elapsed, 1e-9):.0f} anchors/s")
+    m4.metric("Not Passing", f"{(summary_df['status'] != 'PASS').sum()}")
+
+    st.dataframe(summary_df, use_container_width=True, hide_index=True)
+
+    with st.expander("Profile Comparison"):
+        by_id = {row["anchor_id"]: row for row in summaries if row["status"] != "ERROR"}
+        compared = [(anchor_id, borehole, anchor) for anchor_id, borehole, anchor in anchors if anchor_id in by_id]
+        compared = compared[:MAX_COMPARED_ANCHORS]
+        if len(by_id) > MAX_COMPARED_ANCHORS:
+            st.caption(f"Showing the first {MAX_COMPARED_ANCHORS} of {len(by_id)} evaluated anchors.")
+        st.plotly_chart(plots.plot_anchor_comparison(
+            [a[0] for a in compared], [boreholes[a[1]] for a in compared], [a[2].elevation for a in compared],
+            [by_id[a[0]]["bond_start"] for a in compared], [by_id[a[0]]["bond_end"] for a in compared]
+        ), use_container_width=True)
+
+    dl1, dl2, dl3, dl4 = st.columns(4)
+    dl1.download_button("Download Summary (CSV)", summary_df.to_csv(index=False), "anchor_results.csv", "text/csv")
+    dl2.download_button("Download Layers (CSV)", layers_df.to_csv(index=False), "anchor_layers.csv", "text/csv")
+    try:
+        for col, label, df, name in [(dl3, "Summary", summary_df, "anchor_results.parquet"),
+                                     (dl4, "Layers", layers_df, "anchor_layers.parquet")]:
+            parquet_buf = io.BytesIO()
+            df.to_parquet(parquet_buf, index=False)
+            col.download_button(f"Download {label} (Parquet)", parquet_buf.getvalue(), name)
+    except ImportError:
+        dl3.caption("Parquet export needs pyarrow or fastparquet.")
+
+    if build_report:
+        for writer in reports:
+            writer.close()
+        rp1, rp2 = st.columns(2)
+        if report_paths["excel"]:
+            rp1.download_button("Download Report (Excel)", read_file(report_paths["excel"]), "anchor_report.xlsx",
+                                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        else:
+            rp1.caption("Excel export needs openpyxl.")
+        rp2.download_button("Download Report (HTML)", read_file(report_paths["html"]), "anchor_report.html", "text/html")
+
+def parametric_page():
+    st.title("📈 Parametric Study")
+    st.markdown("Sensitivity of the required bond length and safety factor to the anchor geometry, evaluated over the full grid of input ranges in one pass.")
+
+    with st.form("parametric_form"):
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.subheader("1. Geometry Ranges")
+            angle_range = st.slider("Angle of Inclination (deg)", 1.0, 90.0, (15.0, 60.0))
+            n_angle = st.number_input("Angle Steps", min_value=2, max_value=200, value=50)
+            dia_range = st.slider("Borehole Diameter (mm)", 50.0, 400.0, (100.0, 250.0), step=10.0)
+            n_dia = st.number_input("Diameter Steps", min_value=2, max_value=200, value=50)
+
+        with col2:
+            st.subheader("2. Bulb & Length Ranges")
+            enl_range = st.slider("Enlargement Coefficient", 1.0, 2.0, (1.0, 1.4), step=0.05)
+            n_enl = st.number_input("Enlargement Steps", min_value=1, max_value=50, value=5)
+            free_range = st.slider("Free Length (m)", 1.0, 30.0, (4.5, 12.0), step=0.5)
+            n_free = st.number_input("Free Length Steps", min_value=1, max_value=100, value=20)
+
+        with col3:
+            st.subheader("3. Loads & Fixed Values")
+            design_load = st.number_input("Designated Load (Tons)", min_value=0.1, value=30.0)
+            fos = st.number_input("Target Factor of Safety (SF)", min_value=1.0, value=3.0, step=0.1)
+            bond_l = st.number_input("Bond Length for SF Map (m)", min_value=1.0, value=10.0)
+            anchor_elev = st.number_input("Anchor Elevation (m)", value=0.0)
 
-    # --- Mode Selection ---
-    analysis_mode = st.sidebar.radio(
-        "Select Analysis Mode",
-        [
-            "Check Capacity (Fixed Length & SF)", 
-            "Design Mode (Find Required Length)",
-            "Safety Check (Find Actual SF)"
-        ]
+        st.divider()
+        st.subheader("4. Soil Stratigraphy")
+        soil_data = soil_editor(key="parametric_soil")
+        run_btn = st.form_submit_button("Compute Grid", use_container_width=True)
+
+    if run_btn:
+        start = time.perf_counter()
+        st.session_state["parametric_grid"] = parametric.sweep(
+            capacity.Stratigraphy.from_frame(soil_data),
+            np.linspace(*angle_range, int(n_angle)), np.linspace(*dia_range, int(n_dia)),
+            np.linspace(*enl_range, int(n_enl)), np.linspace(*free_range, int(n_free)),
+            design_load, fos, bond_l, elevation=anchor_elev
+        )
+        st.session_state["parametric_time"] = time.perf_counter() - start
+
+    grid = st.session_state.get("parametric_grid")
+    if grid is None:
+        return
+
+    st.caption(f"{np.prod(grid.shape):,} combinations computed in {st.session_state['parametric_time'] * 1000:.1f} ms.")
+
+    sel1, sel2, sel3 = st.columns(3)
+    metric = sel1.radio("Result", ["Required Bond Length (m)", "Safety Factor"])
+    x_axis = sel2.selectbox("X Axis", parametric.AXES, index=1, format_func=parametric.AXIS_TITLES.get)
+    y_axis = sel3.selectbox("Y Axis", [a for a in parametric.AXES if a != x_axis], format_func=parametric.AXIS_TITLES.get)
+
+    fixed = {}
+    fixed_cols = st.columns(2)
+    for col, name in zip(fixed_cols, [a for a in parametric.AXES if a not in (x_axis, y_axis)]):
+        values = grid.axis(name)
+        value = col.select_slider(parametric.AXIS_TITLES[name], options=list(range(len(values))),
+                                  format_func=lambda i, v=values: f"{v[i]:.2f}")
+        fixed[name] = value
+
+    values = grid.required_bond_length if metric == "Required Bond Length (m)" else grid.fos
+    z = grid.slice2d(values, x_axis, y_axis, fixed)
+    x, y = grid.axis(x_axis), grid.axis(y_axis)
+    x_title, y_title = parametric.AXIS_TITLES[x_axis], parametric.AXIS_TITLES[y_axis]
+
+    plot_col1, plot_col2 = st.columns(2)
+    with plot_col1:
+        st.plotly_chart(plots.plot_parametric_heatmap(x, y, z, x_title, y_title, metric), use_container_width=True)
+    with plot_col2:
+        st.plotly_chart(plots.plot_parametric_contour(x, y, z, x_title, y_title, metric), use_container_width=True)
+
+    if np.isnan(z).any():
+        st.warning("⚠️ Blank cells: the anchor would extend below the defined soil profile.")
+
+def reliability_page():
+    st.title("🎲 Reliability Analysis")
+    st.markdown("Monte Carlo simulation of the ultimate capacity with uncertain SPT values, borehole diameter and enlargement coefficient.")
+
+    with st.form("reliability_form"):
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.subheader("1. Geometry")
+            dia_mm = st.number_input("Mean Borehole Diameter (mm)", min_value=50.0, value=150.0, step=10.0)
+            dia_cov = st.number_input("Diameter COV", min_value=0.0, max_value=1.0, value=0.05, step=0.01)
+            enlarge_coeff = st.number_input("Mean Enlargement Coefficient", min_value=1.0, value=1.0, step=0.1)
+            enlarge_cov = st.number_input("Enlargement COV", min_value=0.0, max_value=1.0, value=0.05, step=0.01)
+            geometry_dist = st.selectbox("Geometry Distribution", reliability.DISTRIBUTIONS, index=1)
+
+        with col2:
+            st.subheader("2. Anchor")
+            anchor_elev = st.number_input("Anchor Elevation (m)", value=0.0)
+            angle_deg = st.number_input("Angle of Inclination (deg)", min_value=1.0, max_value=90.0, value=45.0)
+            free_l = st.number_input("Free Length (m)", min_value=1.0, value=5.0)
+            bond_l = st.number_input("Bond Length (m)", min_value=1.0, value=10.0)
+            design_load = st.number_input("Designated Load (Tons)", min_value=0.1, value=30.0)
+
+        with col3:
+            st.subheader("3. Simulation")
+            n_samples = st.number_input("Samples", min_value=1_000, max_value=2_000_000, value=100_000, step=10_000)
+            seed = st.number_input("Random Seed", min_value=0, value=2024, step=1)
+            workers = st.number_input("Worker Processes", min_value=1, value=4, step=1,
+                                      help=f"Used from {reliability.PARALLEL_THRESHOLD:,} samples upwards.")
+
+        st.divider()
+        st.subheader("4. Soil Stratigraphy & SPT Uncertainty")
+        soil_data = soil_editor(key="reliability_soil", uncertainty=True)
+        run_btn = st.form_submit_button("Run Simulation", use_container_width=True)
+
+    if not run_btn:
+        return
+
+    anchor = anchor_engine.Anchor(free_length=free_l, angle_deg=angle_deg, dia_mm=dia_mm, design_load=design_load,
+                                  bond_length=bond_l, enlarge_coeff=enlarge_coeff, elevation=anchor_elev)
+    start = time.perf_counter()
+    try:
+        result = reliability.simulate(
+            anchor, capacity.Stratigraphy.from_frame(soil_data),
+            soil_data["SPT COV"].to_numpy(), soil_data["Distribution"].to_numpy(),
+            dia_cov=dia_cov, dia_dist=geometry_dist, enlarge_cov=enlarge_cov, enlarge_dist=geometry_dist,
+            n_samples=int(n_samples), seed=int(seed), workers=int(workers)
+        )
+    except ValueError as exc:
+        st.error(f"❌ **Error**: {exc}")
+        return
+    elapsed = time.perf_counter() - start
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Deterministic SF", f"{result.deterministic_fos:.2f}")
+    m2.metric("Mean SF", f"{result.fos.mean():.2f}", help=f"Std. dev. {result.fos.std():.3f}")
+    m3.metric("P(FS < 1)", f"{result.probability_of_failure:.2e}")
+    m4.metric("Reliability Index β", f"{result.reliability_index:.2f}",
+              help=f"Lognormal FS assumption: β = {result.reliability_index_lognormal:.2f}")
+
+    st.plotly_chart(plots.plot_reliability_histogram(result.fos), use_container_width=True)
+
+    pct = result.percentiles()
+    st.table(pd.DataFrame({
+        "Percentile": [f"P{q}" for q in pct],
+        "Factor of Safety": [round(v, 3) for v in pct.values()],
+        "Ultimate Capacity (Tons)": [round(v * design_load, 2) for v in pct.values()],
+    }).set_index("Percentile"))
+    st.caption(f"{result.n_samples:,} realisations in {elapsed:.2f} s (seed {int(seed)}).")
+
+def optimiser_page():
+    st.title("💰 Anchor Optimiser")
+    st.markdown("Cheapest anchor (angle, drill size, free length and bond length) meeting the design load and SF, subject to the SNI 8460:2017 checks.")
+
+    with st.form("optimiser_form"):
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.subheader("1. Design Requirements")
+            design_load = st.number_input("Designated Load (Tons)", min_value=0.1, value=30.0)
+            fos = st.number_input("Factor of Safety (SF)", min_value=1.0, value=3.0, step=0.1)
+            anchor_elev = st.number_input("Anchor Elevation (m)", value=0.0)
+            enlarge_coeff = st.number_input("Borehole Enlargement Coefficient", min_value=1.0, value=1.0, step=0.1)
+            allow_pullout = st.checkbox("Allow bond length > 13m (pullout test)", value=False)
+
+        with col2:
+            st.subheader("2. Search Space")
+            angle_range = st.slider("Angle of Inclination (deg)", 1.0, 90.0, (10.0, 45.0))
+            angle_step = st.number_input("Angle Step (deg)", min_value=0.5, value=1.0, step=0.5)
+            free_range = st.slider("Free Length (m)", anchor_engine.MIN_FREE_LENGTH, 30.0, (anchor_engine.MIN_FREE_LENGTH, 12.0), step=0.5)
+            free_step = st.number_input("Free Length Step (m)", min_value=0.1, value=0.5, step=0.1)
+
+        with col3:
+            st.subheader("3. Drill Sizes & Rates")
+            rates = st.data_editor(
+                pd.DataFrame({
+                    "Diameter (mm)": list(optimiser.DRILL_SIZES),
+                    "Drilling Cost (/m)": [round(0.6 * d, 1) for d in optimiser.DRILL_SIZES],
+                    "Grouting Cost (/m)": [round(0.004 * d * d, 1) for d in optimiser.DRILL_SIZES],
+                }),
+                num_rows="dynamic", use_container_width=True, hide_index=True
+            )
+
+        st.divider()
+        st.subheader("4. Soil Stratigraphy")
+        soil_data = soil_editor(key="optimiser_soil")
+        run_btn = st.form_submit_button("Optimise", use_container_width=True)
+
+    if not run_btn:
+        return
+
+    rates = rates.dropna().sort_values("Diameter (mm)")
+    start = time.perf_counter()
+    result = optimiser.optimise(
+        capacity.Stratigraphy.from_frame(soil_data), design_load, fos,
+        angles=np.arange(angle_range[0], angle_range[1] + 1e-9, angle_step),
+        diameters=rates["Diameter (mm)"].to_numpy(),
+        free_lengths=np.arange(free_range[0], free_range[1] + 1e-9, free_step),
+        cost_model=optimiser.CostModel(rates["Drilling Cost (/m)"].to_numpy(), rates["Grouting Cost (/m)"].to_numpy()),
+        enlarge_coeff=enlarge_coeff, elevation=anchor_elev, allow_pullout_test=allow_pullout,
+    )
+    elapsed = time.perf_counter() - start
+
+    if not len(result):
+        st.error("❌ **No Feasible Anchor**: No candidate meets the load, SF and SNI requirements. Widen the search space or allow a pullout test.")
+        return
+
+    best = result.best()
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Minimum Cost", f"{best['Cost']:,.0f}")
+    c2.metric("Angle", f"{best['Angle (deg)']:.1f}°")
+    c3.metric("Borehole Diameter", f"{best['Diameter (mm)']:.0f} mm")
+    c4.metric("Free Length", f"{best['Free Length (m)']:.2f} m")
+    c5.metric("Bond Length", f"{best['Bond Length (m)']:.2f} m")
+    st.caption(f"{result.n_evaluated:,} candidates evaluated, {len(result):,} feasible, in {elapsed * 1000:.1f} ms.")
+
+    pareto_idx = result.pareto_indices()
+    hover = [f"{a:.1f}°, Ø{d:.0f} mm, free {f:.2f} m, bond {b:.2f} m"
+             for a, d, f, b in zip(result.angle_deg, result.dia_mm, result.free_length, result.bond_length)]
+    st.plotly_chart(plots.plot_pareto_front(result.total_length, result.cost, pareto_idx, hover), use_container_width=True)
+
+    st.subheader("Pareto Front: Cost vs. Length")
+    st.dataframe(pd.DataFrame(result.pareto()).round(2), use_container_width=True, hide_index=True)
+
+DEFAULT_WALL_BOREHOLES = [
+    {"borehole": "BH-1", "chainage": 0.0, "Elevation (m)": 6.0, "Soil Type": "Clay", "SPT": 22.0},
+    {"borehole": "BH-1", "chainage": 0.0, "Elevation (m)": 20.0, "Soil Type": "Sand", "SPT": 30.0},
+    {"borehole": "BH-2", "chainage": 40.0, "Elevation (m)": 9.0, "Soil Type": "Clay", "SPT": 25.0},
+    {"borehole": "BH-2", "chainage": 40.0, "Elevation (m)": 22.0, "Soil Type": "Sand", "SPT": 35.0},
+    {"borehole": "BH-3", "chainage": 85.0, "Elevation (m)": 5.0, "Soil Type": "Clay", "SPT": 20.0},
+    {"borehole": "BH-3", "chainage": 85.0, "Elevation (m)": 18.0, "Soil Type": "Sand", "SPT": 28.0},
+]
+
+DEFAULT_WALL_ROWS = [
+    {"elevation": 1.5, "free_length": 6.0, "bond_length": 10.0, "angle_deg": 20.0, "dia_mm": 150.0, "enlarge_coeff": 1.0, "design_load": 30.0, "fos": 2.5},
+    {"elevation": 4.5, "free_length": 5.0, "bond_length": 10.0, "angle_deg": 20.0, "dia_mm": 150.0, "enlarge_coeff": 1.0, "design_load": 40.0, "fos": 2.5},
+]
+
+def wall_page():
+    st.title("🧱 Wall Layout")
+    st.markdown("""
+    Anchor rows along a retaining wall. Each anchor's stratigraphy is interpolated between the boreholes on either side
+    of its chainage (layer bottoms and SPT vary linearly when both logs have the same layer sequence, otherwise the nearest log is used).
+    """)
+
+    wall_mode = st.sidebar.radio("Wall Analysis Mode", list(ENGINE_MODES))
+
+    st.subheader("1. Borehole Logs")
+    upload = st.file_uploader("Boreholes CSV (borehole, chainage, Elevation (m), Soil Type, SPT)", type="csv")
+    bh_init = pd.read_csv(upload) if upload else pd.DataFrame(DEFAULT_WALL_BOREHOLES)
+    bh_data = st.data_editor(
+        bh_init, num_rows="dynamic", use_container_width=True, key=f"wall_boreholes_{upload.file_id if upload else 'default'}",
+        column_config={"Soil Type": st.column_config.SelectboxColumn("Soil Type", options=["Clay", "Sand"], required=True)}
     )
 
+    st.subheader("2. Anchor Rows")
+    ch_col1, ch_col2, ch_col3 = st.columns(3)
+    ch_start = ch_col1.number_input("Start Chainage (m)", value=0.0)
+    ch_end = ch_col2.number_input("End Chainage (m)", value=85.0)
+    spacing = ch_col3.number_input("Horizontal Spacing (m)", min_value=0.1, value=1.5, step=0.1)
+    rows = st.data_editor(pd.DataFrame(DEFAULT_WALL_ROWS), num_rows="dynamic", use_container_width=True, key="wall_rows")
+
+    bh_data = bh_data.dropna(subset=["borehole", "chainage", "Elevation (m)", "SPT"])
+    rows = rows.dropna()
+    if bh_data.empty or rows.empty or ch_end < ch_start:
+        st.info("💡 Define at least one borehole layer, one anchor row and a valid chainage range.")
+        return
+
+    start = time.perf_counter()
+    index = wall.BoreholeIndex.from_records(bh_data.to_dict("records"))
+    anchors = wall.generate_anchors(rows.to_dict("records"), ch_start, ch_end, spacing)
+    result = wall.evaluate(ENGINE_MODES[wall_mode], anchors, index)
+    elapsed = time.perf_counter() - start
+
+    status = result.status
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Anchors", f"{len(anchors):,}")
+    m2.metric("Boreholes", f"{len(index)}")
+    m3.metric("Not Passing", f"{(status != 'PASS').sum():,}")
+    m4.metric("Compute Time", f"{elapsed * 1000:.0f} ms")
+    if result.spt_violation.any():
+        st.error(f"❌ **SNI Violation**: {result.spt_violation.sum():,} anchors are bonded in layers below the minimum SPT.")
+
+    st.plotly_chart(plots.plot_wall_section(index, result), use_container_width=True)
+
+    results_df = pd.DataFrame(result.to_records())
+    st.dataframe(results_df.round(3), use_container_width=True, hide_index=True)
+    st.download_button("Download Wall Results (CSV)", results_df.to_csv(index=False), "wall_results.csv", "text/csv")
+
+@st.fragment
+def main_analysis(analysis_mode, log_layers, log_key):
+    """Form and results of the main analysis; submitting reruns only this fragment."""
+    # A fragment rerun skips the rest of the script, including the run started there
+    fragment_run = profiling_on and profiling.active() is None
+    if fragment_run:
+        profiling.begin("Main Analysis (fragment)")
+
     with st.form("anchor_form"):
         top_col1, top_col2, top_col3 = st.columns(3)
 
@@ -131,6 +658,7 @@ else:
             if analysis_mode == "Design Mode (Find Required Length)":
                 st.info("💡 Bond Length will be calculated based on the Design Load.")
                 bond_l_input = 0.0 
+                round_bond_l = st.checkbox("Round required length up to 0.1 m", value=True)
             else:
                 bond_l_input = st.number_input("Bond Length (m)", min_value=1.0, value=10.0)
                 if bond_l_input > 13.0:
@@ -148,121 +676,63 @@ else:
 
         st.divider()
         st.subheader("4. Soil Stratigraphy")
-        init_data = pd.DataFrame([
-            {"Elevation (m)": 8.0, "Soil Type": "Clay", "SPT": 25.0},
-            {"Elevation (m)": 20.0, "Soil Type": "Sand", "SPT": 25.0},
-        ])
-
-        soil_data = st.data_editor(
-            init_data,
-            num_rows="dynamic",
-            use_container_width=True,
-            column_config={
-                "Soil Type": st.column_config.SelectboxColumn("Soil Type", options=["Clay", "Sand"], required=True),
-                "SPT": st.column_config.NumberColumn("SPT Value", min_value=1),
-                "Elevation (m)": st.column_config.NumberColumn("Bottom Elevation (m)", min_value=0.1)
-            }
-        )
+        soil_data = soil_editor(key=log_key, data=log_layers)
         submit_btn = st.form_submit_button("Run Analysis", use_container_width=True)
 
+    if submit_btn and soil_data.empty:
+        st.error("❌ **No Soil Layers**: Add at least one layer to the soil stratigraphy.")
+        submit_btn = False
+
     if submit_btn:
-        angle_rad = np.radians(angle_deg)
-        sin_theta = np.sin(angle_rad)
-        effective_dia_cm = (dia_mm * enlarge_coeff) / 10.0
-        conv_mpa_to_kg = 10.1971621
-        max_soil_depth = soil_data['Elevation (m)'].max()
-
-        final_bond_l = bond_l_input
-        final_fos = fos_input
-        error_flag = False
-
-        # --- Mode 2 Logic: Design Mode ---
-        if analysis_mode == "Design Mode (Find Required Length)":
-            current_bond_l = 0.5
-            found = False
-            while current_bond_l <= 100.0:
-                temp_ult_cap = 0.0
-                z_s = anchor_elev + (free_l * sin_theta)
-                z_e = anchor_elev + ((free_l + current_bond_l) * sin_theta)
-
-                if z_e > max_soil_depth:
-                    st.error(f"❌ **Insufficient Soil Data**: Depth reached {max_soil_depth}m without meeting capacity.")
-                    error_flag = True
-                    break
-                
-                tops = [0.0] + soil_data['Elevation (m)'].tolist()[:-1]
-                for i, row in soil_data.iterrows():
-                    z_ov = max(0.0, min(z_e, row['Elevation (m)']) - max(z_s, tops[i]))
-                    if z_ov > 0:
-                        qs = (formulas.calculate_clay_bond_strength(row['SPT']) if row['Soil Type']=="Clay" else formulas.calculate_sand_bond_strength(row['SPT'])) * conv_mpa_to_kg
-                        temp_ult_cap += (qs * (np.pi * effective_dia_cm * (z_ov/sin_theta) * 100.0)) / 1000.0
-
-                if (temp_ult_cap / final_fos) >= design_load:
-                    final_bond_l = current_bond_l
-                    found = True
-                    break
-                current_bond_l += 0.1
-
-            if found and final_bond_l > 13.0:
-                st.warning("⚠️ **SNI 8460:2017 Warning**: Calculated Bond length > 13m requires on-site pullout test.")
-
-        # --- Mode 1 & 3 Logic (Fixed Bond Length) ---
-        else:
-            z_s = anchor_elev + (free_l * sin_theta)
-            z_e = anchor_elev + ((free_l + final_bond_l) * sin_theta)
+        # stratigraphy -> capacity profile -> solve -> table / plot; each stage is
+        # kept in session state and recomputed only when its own inputs changed
+        graph = incremental.Graph(st.session_state, "main_analysis")
+        soil_key = (tuple(soil_data.columns), pd.util.hash_pandas_object(soil_data, index=False).values.tobytes())
+        strata = graph.stage("stratigraphy", soil_key, (), lambda: capacity.Stratigraphy.from_frame(soil_data))
+        profile = graph.stage("capacity_profile", (dia_mm, enlarge_coeff), ("stratigraphy",),
+                              lambda: capacity.CapacityProfile(strata, dia_mm, enlarge_coeff))
+        anchor = anchor_engine.Anchor(
+            free_length=free_l, angle_deg=angle_deg, dia_mm=dia_mm, design_load=design_load,
+            bond_length=bond_l_input, fos=fos_input, enlarge_coeff=enlarge_coeff, elevation=anchor_elev
+        )
+        step = 0.1 if analysis_mode == "Design Mode (Find Required Length)" and round_bond_l else None
+        result = graph.stage("solve", (ENGINE_MODES[analysis_mode], anchor, step), ("capacity_profile",),
+                             lambda: result_cache.analyse(result_store() if use_result_cache else None,
+                                                          ENGINE_MODES[analysis_mode], anchor, strata,
+                                                          profile=profile, step=step))
+        final_bond_l = result.bond_length
+        final_fos = result.fos
 
-            if z_e > max_soil_depth:
-                st.error(f"❌ **Error**: Anchor tip ({z_e:.2f}m) exceeds defined soil depth ({max_soil_depth}m).")
-                error_flag = True
+        if result.error:
+            st.error(f"❌ **{result.error.title}**: {result.error.message}")
 
-            if analysis_mode == "Safety Check (Find Actual SF)":
-                total_ult_capacity = 0.0
-                tops = [0.0] + soil_data['Elevation (m)'].tolist()[:-1]
-                for i, row in soil_data.iterrows():
-                    z_ov = max(0.0, min(z_e, row['Elevation (m)']) - max(z_s, tops[i]))
-                    if z_ov > 0:
-                        qs = (formulas.calculate_clay_bond_strength(row['SPT']) if row['Soil Type']=="Clay" else formulas.calculate_sand_bond_strength(row['SPT'])) * conv_mpa_to_kg
-                        total_ult_capacity += (qs * (np.pi * effective_dia_cm * (z_ov/sin_theta) * 100.0)) / 1000.0
-                final_fos = total_ult_capacity / design_load
+        # Input warnings are already shown in the form; only report computed ones here
+        for notice in result.warnings:
+            if notice.code == "bond_length" and result.mode == anchor_engine.MODE_DESIGN:
+                st.warning(f"⚠️ **{notice.title}**: {notice.message}")
+
+        for notice in result.violations:
+            st.error(f"❌ **{notice.title}**: {notice.message}")
 
         # --- Final Result Assembly ---
-        if not error_flag:
-            z_bond_start = anchor_elev + (free_l * sin_theta)
-            z_bond_end = anchor_elev + ((free_l + final_bond_l) * sin_theta)
-            results_raw = []
-            total_working_capacity = 0.0
-            tops = [0.0] + soil_data['Elevation (m)'].tolist()[:-1]
-
-            for i, row in soil_data.iterrows():
-                z_overlap = max(0.0, min(z_bond_end, row['Elevation (m)']) - max(z_bond_start, tops[i]))
-                if z_overlap > 0:
-                    # SNI SPT Check
-                    if row['Soil Type'] == "Sand" and row['SPT'] < 25:
-                        st.error(f"❌ **SNI Violation**: Sand at {tops[i]}m-{row['Elevation (m)']}m has SPT < 25.")
-                    if row['Soil Type'] == "Clay" and row['SPT'] < 20:
-                        st.error(f"❌ **SNI Violation**: Clay at {tops[i]}m-{row['Elevation (m)']}m has SPT < 20.")
-
-                    act_l = z_overlap / sin_theta
-                    qs_ult = (formulas.calculate_clay_bond_strength(row['SPT']) if row['Soil Type']=="Clay" else formulas.calculate_sand_bond_strength(row['SPT'])) * conv_mpa_to_kg
-                    qs_work = qs_ult / final_fos
-                    cap = (qs_work * (np.pi * effective_dia_cm * act_l * 100.0)) / 1000.0
-                    total_working_capacity += cap
-
-                    results_raw.append({
-                        "Range": f"{tops[i]}m - {row['Elevation (m)']}m",
-                        "Soil Thickness (m)": round(z_overlap, 2), "Bond Length (m)": round(act_l, 2),
-                        "Type": row['Soil Type'], "Ultimate Bond Stress (kg/cm²)": round(qs_ult, 4),
-                        "Working Bond Stress (kg/cm²)": round(qs_work, 4), "Working Capacity (Tons)": round(cap, 2)
-                    })
+        if result.ok:
+            results_raw = graph.stage("layer_table", (), ("solve",), result.layer_rows)
+            z_bond_start = result.bond_start
+            total_working_capacity = result.working_capacity
 
             if results_raw:
                 out_col1, out_col2 = st.columns([1, 1])
                 with out_col1:
-                    st.plotly_chart(plots.plot_anchor_plotly(soil_data, free_l, final_bond_l, anchor_elev, angle_deg), use_container_width=True)
+                    # Depends on geometry and soil only, so a new load or SF alone reuses it
+                    fig = graph.stage("plot", (free_l, final_bond_l, anchor_elev, angle_deg), ("stratigraphy",),
+                                      lambda: plots.plot_anchor_plotly(soil_data, free_l, final_bond_l, anchor_elev, angle_deg))
+                    with profiling.stage("render_plot"):
+                        st.plotly_chart(fig, use_container_width=True)
                 with out_col2:
                     st.subheader("Calculation Summary")
                     st.info(f"📍 **Top of Bond Elevation:** {z_bond_start:.2f} m")
-                    st.table(pd.DataFrame(results_raw).set_index("Range").T)
+                    with profiling.stage("render_table"):
+                        st.table(pd.DataFrame(results_raw).set_index("Range").T)
                     st.divider()
                     st.subheader("Design Verification")
 
@@ -293,4 +763,84 @@ else:
         **Calculation References:**
         1. **SNI 8460:2017** - *Persyaratan Perancangan Geoteknik.*
         2. **Bustamante, M. (1985)** - *Une méthode pour le calcul des tirants et des micropieux injectés.*
-        """)
\ No newline at end of file
+        """)
+
+    if submit_btn:
+        cache_stats_panel(cache_stats_slot)
+    if fragment_run:
+        diagnostic_runs = st.session_state.setdefault("diagnostic_runs", collections.deque(maxlen=DIAGNOSTIC_RUNS))
+        diagnostic_runs.append(profiling.end())
+        diagnostics_panel(diagnostic_runs, diagnostics_slot)
+
+# --- DIAGNOSTICS ---
+# Per-stage timings of this script run, when enabled by ANCHOR_PROFILE or ?profile=1
+profiling_on = profiling.ENABLED or st.query_params.get("profile", "").lower() in ("1", "true")
+if profiling_on:
+    diagnostics_slot = st.sidebar.empty()
+    profiling.begin(page)
+
+if page == "Documentation":
+    benchmark_page()
+
+elif page == "Wall Layout":
+    wall_page()
+
+elif page == "Anchor Optimiser":
+    optimiser_page()
+
+elif page == "Reliability Analysis":
+    reliability_page()
+
+elif page == "Parametric Study":
+    parametric_page()
+
+elif page == "Batch Project":
+    batch_page()
+
+else:
+    st.title("📊 Ground Anchor Ultimate Bond Strength Analysis")
+
+    # --- Mode Selection ---
+    analysis_mode = st.sidebar.radio(
+        "Select Analysis Mode",
+        [
+            "Check Capacity (Fixed Length & SF)", 
+            "Design Mode (Find Required Length)",
+            "Safety Check (Find Actual SF)"
+        ]
+    )
+
+    log_layers, log_key = None, None
+    with st.expander("📥 Import CPT/SPT Log"):
+        st.caption("CSV (`depth, qc, fs` for CPT or `depth, SPT, Soil Type`) or AGS4 (SCPT / ISPT groups). "
+                   "Readings are converted to SPT and merged into layers.")
+        log_file = st.file_uploader("Log File", type=["csv", "txt", "ags"])
+        lc1, lc2, lc3 = st.columns(3)
+        log_tolerance = lc1.number_input("SPT Tolerance per Layer", min_value=0.5, value=2.0, step=0.5)
+        log_min_thickness = lc2.number_input("Minimum Layer Thickness (m)", min_value=0.01, value=0.2, step=0.05)
+        log_soil_type = lc3.selectbox("SPT Logs Without Soil Type", ["Sand", "Clay"])
+        if log_file:
+            try:
+                soundings = imported_log(log_file.getvalue(), log_file.name.rsplit(".", 1)[0],
+                                         log_tolerance, log_min_thickness, log_soil_type)
+            except (ValueError, UnicodeDecodeError) as exc:
+                st.error(f"❌ **Invalid Log**: {exc}")
+                soundings = None
+            if soundings == {}:
+                # An empty import clears the table rather than leaving the default soil in it
+                st.error("❌ **Empty Log**: The file has no readings to import.")
+                log_layers, log_key = [], f"soil_{log_file.file_id}_empty"
+            elif soundings:
+                sounding = soundings[st.selectbox("Sounding", list(soundings))]
+                st.caption(f"{sounding.kind}: {sounding.readings} readings merged into {len(sounding.stratigraphy)} layers.")
+                if not len(sounding.stratigraphy):
+                    st.error(f"❌ **Empty Log**: Sounding {sounding.name} has no layers to import.")
+                log_layers = sounding.stratigraphy.to_records()
+                log_key = f"soil_{log_file.file_id}_{sounding.name}_{log_tolerance}_{log_min_thickness}_{log_soil_type}"
+
+    main_analysis(analysis_mode, log_layers, log_key)
+
+if profiling_on:
+    diagnostic_runs = st.session_state.setdefault("diagnostic_runs", collections.deque(maxlen=DIAGNOSTIC_RUNS))
+    diagnostic_runs.append(profiling.end())
+    diagnostics_panel(diagnostic_runs, diagnostics_slot)
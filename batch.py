@@ -0,0 +1,280 @@
+"""
+Batch evaluation of many anchors against a set of borehole profiles.
+
+Anchors CSV columns (one row per anchor):
+    anchor_id, borehole, free_length, bond_length, angle_deg, dia_mm,
+    enlarge_coeff, elevation, design_load, fos
+Boreholes CSV columns (layers in order, grouped by borehole):
+    borehole, Elevation (m), Soil Type, SPT
+
+Usage:
+    python -m batch design anchors.csv boreholes.csv -o results.csv --layers-out layers.csv --workers 4
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import anchor_engine
+import capacity
+import result_cache
+
+ANCHOR_FIELDS = ("free_length", "bond_length", "angle_deg", "dia_mm", "enlarge_coeff", "elevation", "design_load", "fos")
+REQUIRED_FIELDS = ("free_length", "angle_deg", "dia_mm", "design_load")
+
+SUMMARY_COLUMNS = [
+    "anchor_id", "borehole", "mode", "status", "bond_length", "fos", "ultimate_capacity",
+    "working_capacity", "design_load", "bond_start", "bond_end", "warnings", "violations", "error",
+]
+LAYER_COLUMNS = [
+    "anchor_id", "borehole", "top", "bottom", "soil_type", "spt", "thickness", "bond_length",
+    "ultimate_bond_stress", "working_bond_stress", "working_capacity",
+]
+
+# Borehole profiles and result cache of the current worker process, set by _init_worker
+_BOREHOLES = {}
+_CACHE = None
+
+
+# ========== Input ==========
+def open_text(source):
+    """Accept a path, a text stream or a binary upload."""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, newline="")
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+
+
+def read_boreholes(source):
+    """Read a boreholes CSV into {borehole: Stratigraphy}."""
+    rows = {}
+    with open_text(source) as f:
+        for row in csv.DictReader(f):
+            rows.setdefault(row["borehole"].strip(), []).append(row)
+    return {name: capacity.Stratigraphy.from_records(layers) for name, layers in rows.items()}
+
+
+def read_anchors(source):
+    """Read an anchors CSV into a list of (anchor_id, borehole, Anchor)."""
+    anchors = []
+    with open_text(source) as f:
+        for n, row in enumerate(csv.DictReader(f), start=1):
+            missing = [k for k in REQUIRED_FIELDS if not (row.get(k) or "").strip()]
+            if missing:
+                raise ValueError(f"Anchor row {n} is missing {', '.join(missing)}")
+            params = {k: float(row[k]) for k in ANCHOR_FIELDS if (row.get(k) or "").strip()}
+            anchor_id = (row.get("anchor_id") or "").strip() or str(n)
+            anchors.append((anchor_id, (row.get("borehole") or "").strip(), anchor_engine.Anchor(**params)))
+    return anchors
+
+
+# ========== Evaluation ==========
+def _notices(notices):
+    return "; ".join(f"{n.title}: {n.message}" for n in notices)
+
+
+def summary_row(anchor_id, borehole, result):
+    return {
+        "anchor_id": anchor_id, "borehole": borehole, "mode": result.mode, "status": result.status,
+        "bond_length": result.bond_length, "fos": result.fos,
+        "ultimate_capacity": result.ultimate_capacity, "working_capacity": result.working_capacity,
+        "design_load": result.anchor.design_load, "bond_start": result.bond_start, "bond_end": result.bond_end,
+        "warnings": _notices(result.warnings), "violations": _notices(result.violations),
+        "error": _notices([result.error]) if result.error else "",
+    }
+
+
+def layer_rows(anchor_id, borehole, result):
+    return [{"anchor_id": anchor_id, "borehole": borehole, **vars(layer)} for layer in result.layers]
+
+
+def unknown_borehole_row(anchor_id, borehole, mode):
+    # Numbers stay empty (None) so numeric columns keep a numeric type, e.g. for Parquet
+    return {**dict.fromkeys(SUMMARY_COLUMNS), "anchor_id": anchor_id, "borehole": borehole, "mode": mode,
+            "status": "ERROR", "warnings": "", "violations": "", "error": f"Unknown borehole {borehole!r}"}
+
+
+def analyse_anchors(mode, anchors, boreholes, step=anchor_engine.LENGTH_STEP, cache=None):
+    """
+    AnchorResult of each (anchor_id, borehole, Anchor) item against `boreholes`
+    (None where the borehole is unknown), in input order. Capacity profiles are
+    shared between anchors with the same borehole, diameter and enlargement
+    coefficient; with a result_cache.ResultCache, repeated anchors are read from it.
+    An anchor whose analysis raises gets a result with an "exception" error notice.
+    """
+    profiles = {}
+    known = []
+    for anchor_id, borehole, anchor in anchors:
+        strata = boreholes.get(borehole)
+        if strata is None:
+            continue
+        key = (borehole, anchor.dia_mm, anchor.enlarge_coeff)
+        if key not in profiles:
+            profiles[key] = capacity.CapacityProfile(strata, anchor.dia_mm, anchor.enlarge_coeff)
+        known.append((anchor, strata, profiles[key]))
+
+    try:
+        analysed = result_cache.analyse_many(cache, mode, known, step=step)
+    except Exception:
+        # Find the failing anchors one by one so the rest of the chunk still gets results
+        analysed = [_analyse_one(cache, mode, item, step) for item in known]
+    results = iter(analysed)
+    return [next(results) if borehole in boreholes else None for _, borehole, _ in anchors]
+
+
+def _analyse_one(cache, mode, item, step):
+    anchor, strata, profile = item
+    try:
+        return result_cache.analyse(cache, mode, anchor, strata, profile=profile, step=step)
+    except Exception as exc:
+        return anchor_engine.AnchorResult(mode=mode, anchor=anchor, bond_length=anchor.bond_length, fos=anchor.fos,
+                                          bond_start=anchor.elevation, bond_end=anchor.elevation,
+                                          error=anchor_engine.Notice("exception", "Error", f"{type(exc).__name__}: {exc}"))
+
+
+def evaluate_anchors(mode, anchors, boreholes, step=anchor_engine.LENGTH_STEP, cache=None):
+    """Summary rows and layer rows of `analyse_anchors`."""
+    return result_rows(mode, anchors, analyse_anchors(mode, anchors, boreholes, step, cache))
+
+
+def result_rows(mode, anchors, results):
+    """Summary rows and layer rows of (anchor_id, borehole, Anchor) items and their `analyse_anchors` results."""
+    summaries, layers = [], []
+    for (anchor_id, borehole, anchor), result in zip(anchors, results):
+        if result is None:
+            summaries.append(unknown_borehole_row(anchor_id, borehole, mode))
+            continue
+        summaries.append(summary_row(anchor_id, borehole, result))
+        layers.extend(layer_rows(anchor_id, borehole, result))
+    return summaries, layers
+
+
+def iter_results(mode, anchors, boreholes, step=anchor_engine.LENGTH_STEP, cache=None, chunk_size=256):
+    """Yield (anchor_id, borehole, AnchorResult or None) in input order, `chunk_size` anchors at a time."""
+    for i in range(0, len(anchors), chunk_size):
+        chunk = anchors[i:i + chunk_size]
+        for (anchor_id, borehole, _), result in zip(chunk, analyse_anchors(mode, chunk, boreholes, step, cache)):
+            yield anchor_id, borehole, result
+
+
+def _init_worker(boreholes, cache_path):
+    global _BOREHOLES, _CACHE
+    _BOREHOLES = boreholes
+    _CACHE = result_cache.ResultCache(cache_path) if cache_path else None
+
+
+def _worker_task(task, mode, chunk, step):
+    return task(mode, chunk, _BOREHOLES, step, _CACHE)
+
+
+def _analyse_chunk(mode, chunk, boreholes, step, cache):
+    return chunk, analyse_anchors(mode, chunk, boreholes, step, cache)
+
+
+def _map_chunks(task, mode, anchors, boreholes, workers, chunk_size, step, cache_path):
+    """
+    Yield `task(mode, chunk, boreholes, step, cache)` for every chunk, in
+    completion order when a process pool is used.
+    """
+    chunks = [anchors[i:i + chunk_size] for i in range(0, len(anchors), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        cache = result_cache.ResultCache(cache_path) if cache_path else None
+        for chunk in chunks:
+            yield task(mode, chunk, boreholes, step, cache)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(boreholes, cache_path)) as pool:
+        futures = [pool.submit(_worker_task, task, mode, chunk, step) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_batch(mode, anchors, boreholes, workers=None, chunk_size=256, step=anchor_engine.LENGTH_STEP,
+              cache_path=None):
+    """
+    Evaluate all anchors, yielding (summary rows, layer rows) per chunk as it completes.
+    `workers=1` evaluates in this process; otherwise chunks go to a process pool
+    (default size os.cpu_count()). Completion order is not the input order.
+    With `cache_path`, results are read from and written to that result cache.
+    """
+    return _map_chunks(evaluate_anchors, mode, anchors, boreholes, workers, chunk_size, step, cache_path)
+
+
+def iter_batch(mode, anchors, boreholes, workers=None, chunk_size=256, step=anchor_engine.LENGTH_STEP,
+               cache_path=None):
+    """Like run_batch, yielding (chunk, AnchorResult or None per anchor) instead of rows."""
+    return _map_chunks(_analyse_chunk, mode, anchors, boreholes, workers, chunk_size, step, cache_path)
+
+
+# ========== Output ==========
+def write_csv(rows, target, columns):
+    """Write dict rows to a path or text stream."""
+    f = open(target, "w", newline="") if isinstance(target, (str, os.PathLike)) else target
+    try:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if f is not target:
+            f.close()
+
+
+def write_parquet(rows, target, columns):
+    """Write dict rows to Parquet (requires pandas with pyarrow or fastparquet)."""
+    import pandas as pd
+    pd.DataFrame(rows, columns=columns).to_parquet(target, index=False)
+
+
+def _write(rows, path, columns):
+    if str(path).endswith(".parquet"):
+        write_parquet(rows, path, columns)
+    else:
+        write_csv(rows, path, columns)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m batch", description="Evaluate many anchors from CSV.")
+    parser.add_argument("mode", choices=anchor_engine.MODES)
+    parser.add_argument("anchors", help="anchors CSV")
+    parser.add_argument("boreholes", help="boreholes CSV")
+    parser.add_argument("-o", "--output", default="results.csv", help="summary output (.csv or .parquet)")
+    parser.add_argument("--layers-out", help="per-layer breakdown output (.csv or .parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (1 = no pool)")
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--exact", action="store_true", help="exact design lengths instead of rounding up to 0.1 m")
+    parser.add_argument("--cache", nargs="?", const=result_cache.DEFAULT_PATH, default=None,
+                        help=f"use the persistent result cache (default file {result_cache.DEFAULT_PATH})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    boreholes = read_boreholes(args.boreholes)
+    anchors = read_anchors(args.anchors)
+    step = None if args.exact else anchor_engine.LENGTH_STEP
+
+    start = time.perf_counter()
+    summaries, layers = [], []
+    for chunk_summaries, chunk_layers in run_batch(args.mode, anchors, boreholes, workers=args.workers,
+                                                   chunk_size=args.chunk_size, step=step, cache_path=args.cache):
+        summaries.extend(chunk_summaries)
+        layers.extend(chunk_layers)
+        print(f"\r{len(summaries)}/{len(anchors)} anchors", end="", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    _write(summaries, args.output, SUMMARY_COLUMNS)
+    if args.layers_out:
+        _write(layers, args.layers_out, LAYER_COLUMNS)
+
+    failed = sum(row["status"] != "PASS" for row in summaries)
+    rate = len(summaries) / elapsed if elapsed > 0 else float("inf")
+    print(f"\n{len(summaries)} anchors in {elapsed:.2f}s ({rate:.0f} anchors/s), {failed} not passing", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Performance benchmarks for the calculation and plotting paths.
+
+Each benchmark times one operation over a few problem sizes and records the
+median time per operation (plus throughput or payload size where relevant).
+Results are written to JSON together with machine metadata and can be
+compared against a stored baseline; anything slower than the baseline by
+more than the threshold is flagged and makes the run exit with status 1.
+
+Usage:
+    python -m bench                              # run all, compare with bench_baseline.json if present
+    python -m bench --quick -k design            # smaller sizes, only benchmarks matching 'design'
+    python -m bench -o results.json --save-baseline
+    python -m bench --compare results.json --baseline bench_baseline.json --threshold 0.25
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import anchor_engine
+import batch
+import capacity
+import formulas
+import incremental
+
+BASELINE_PATH = "bench_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+MIN_REPEAT_TIME = 0.05
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """Register a benchmark. It takes `quick` and yields (case, seconds per op, extra fields)."""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+# ========== Timing ==========
+def measure(fn, repeat=5, min_time=MIN_REPEAT_TIME):
+    """
+    Median and best seconds per call of `fn`. The loop count is doubled until
+    one repeat takes at least `min_time`, as timeit's autorange does.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    times = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append((time.perf_counter() - start) / loops)
+    return statistics.median(times), min(times)
+
+
+def _stratigraphy(n_layers, depth=60.0, seed=0):
+    """Random clay/sand profile of `n_layers` equal layers down to `depth`."""
+    rng = np.random.default_rng(seed)
+    return capacity.Stratigraphy(np.linspace(depth / n_layers, depth, n_layers),
+                                 rng.choice(["Clay", "Sand"], n_layers), rng.uniform(10, 50, n_layers))
+
+
+DESIGN_ANCHOR = anchor_engine.Anchor(free_length=5.0, angle_deg=45.0, dia_mm=150.0, design_load=30.0, fos=3.0)
+
+
+# ========== Benchmarks ==========
+@benchmark
+def formulas_scalar(quick):
+    spt = np.random.default_rng(0).uniform(0, 60, 200 if quick else 1000).tolist()
+
+    def run():
+        for n in spt:
+            formulas.calculate_clay_bond_strength(n)
+            formulas.calculate_sand_bond_strength(n)
+
+    median, best = measure(run)
+    yield f"n={len(spt)}", median, {"best": best, "values_per_s": len(spt) / median}
+
+
+@benchmark
+def formulas_batch(quick):
+    for n in (1_000, 100_000) if quick else (1_000, 100_000, 1_000_000):
+        spt = np.random.default_rng(0).uniform(0, 60, n)
+
+        def run():
+            formulas.calculate_clay_bond_strength(spt)
+            formulas.calculate_sand_bond_strength(spt)
+
+        median, best = measure(run)
+        yield f"n={n}", median, {"best": best, "values_per_s": n / median}
+
+
+@benchmark
+def design_solve(quick):
+    for n_layers in (2, 10, 100, 1000) if quick else (2, 10, 100, 1000, 10000):
+        strata = _stratigraphy(n_layers)
+        median, best = measure(lambda: anchor_engine.analyse(anchor_engine.MODE_DESIGN, DESIGN_ANCHOR, strata))
+        yield f"layers={n_layers}", median, {"best": best}
+
+
+@benchmark
+def app_modes(quick):
+    """The three main-analysis modes end to end through Streamlit's headless AppTest."""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    at = AppTest.from_file(path, default_timeout=120).run()
+    # Measure the analysis itself, not the persistent result cache
+    for toggle in at.toggle:
+        if toggle.label == "Reuse stored results":
+            toggle.set_value(False)
+    at.run()
+
+    def clear_stages():
+        # Stages kept by the main analysis fragment would turn repeat submits into lookups
+        incremental.clear(at.session_state, "main_analysis")
+
+    for label, mode in [("Check Capacity (Fixed Length & SF)", "check"), ("Design Mode (Find Required Length)", "design"),
+                        ("Safety Check (Find Actual SF)", "safety")]:
+        at.sidebar.radio[0].set_value(label).run()
+        submit = next(b for b in at.button if b.label == "Run Analysis")
+        times = []
+        for _ in range(2 if quick else 5):
+            clear_stages()
+            start = time.perf_counter()
+            submit.click().run()
+            times.append(time.perf_counter() - start)
+            if at.exception:
+                raise RuntimeError(f"App raised during {mode} run: {at.exception}")
+        yield f"mode={mode}", statistics.median(times), {"best": min(times)}
+
+
+@benchmark
+def plot_profile(quick):
+    import pandas as pd
+    import plots
+
+    for n_layers in (10, 100, 1000) if quick else (10, 100, 1000, 10000):
+        strata = _stratigraphy(n_layers)
+        df = pd.DataFrame(strata.to_records())
+        size = len(plots.plot_anchor_plotly(df, 5.0, 10.0, 0.0, 45.0).to_json())
+        median, best = measure(lambda: plots.plot_anchor_plotly(df, 5.0, 10.0, 0.0, 45.0).to_json(), repeat=3)
+        yield f"layers={n_layers}", median, {"best": best, "json_bytes": size}
+
+
+@benchmark
+def batch_throughput(quick):
+    n = 1000 if quick else 5000
+    rng = np.random.default_rng(0)
+    boreholes = {f"BH{i}": _stratigraphy(int(rng.integers(2, 12)), seed=i) for i in range(20)}
+    names = list(boreholes)
+    anchors = [(str(i), names[i % len(names)], anchor_engine.Anchor(
+        free_length=float(rng.uniform(4, 8)), angle_deg=float(rng.choice([15, 30, 45])),
+        dia_mm=float(rng.choice([100, 150, 200])), design_load=float(rng.uniform(10, 60)), fos=2.0))
+        for i in range(n)]
+    for mode in anchor_engine.MODES:
+        median, best = measure(lambda: batch.evaluate_anchors(mode, anchors, boreholes), repeat=3)
+        yield f"mode={mode},anchors={n}", median, {"best": best, "anchors_per_s": n / median}
+
+
+# ========== Results ==========
+def metadata():
+    def version(module):
+        try:
+            return __import__(module).__version__
+        except ImportError:
+            return None
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": version("numpy"),
+        "plotly": version("plotly"),
+        "streamlit": version("streamlit"),
+    }
+
+
+def run(names=None, quick=False, echo=True):
+    """Run the selected benchmarks, returning {'metadata': ..., 'results': {key: record}}."""
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if names and not any(n in name for n in names):
+            continue
+        for case, seconds, extra in func(quick):
+            key = f"{name}[{case}]"
+            results[key] = {"seconds": seconds, **extra}
+            if echo:
+                print(f"{key:<48} {_format_time(seconds):>10}", file=sys.stderr)
+    return {"metadata": metadata(), "quick": quick, "results": results}
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Rows of (key, baseline seconds, current seconds, ratio, status) where status is
+    'regression' (slower by more than `threshold`), 'improvement', 'ok', 'new' or 'missing'.
+    Payload sizes ('json_bytes') growing by more than `threshold` are regressions too.
+    """
+    rows = []
+    base, cur = baseline["results"], current["results"]
+    for key in list(dict.fromkeys([*base, *cur])):
+        if key not in cur:
+            rows.append((key, base[key]["seconds"], None, None, "missing"))
+            continue
+        if key not in base:
+            rows.append((key, None, cur[key]["seconds"], None, "new"))
+            continue
+        ratio = cur[key]["seconds"] / base[key]["seconds"]
+        grown = "json_bytes" in base[key] and cur[key].get("json_bytes", 0) > base[key]["json_bytes"] * (1 + threshold)
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif grown:
+            status = "regression (json_bytes)"
+        elif ratio < 1 / (1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append((key, base[key]["seconds"], cur[key]["seconds"], ratio, status))
+    return rows
+
+
+def _format_time(seconds):
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def report(rows, current, baseline):
+    if baseline["metadata"].get("platform") != current["metadata"].get("platform") \
+            or baseline["metadata"].get("cpu_count") != current["metadata"].get("cpu_count"):
+        print("note: baseline was recorded on a different machine", file=sys.stderr)
+    if baseline.get("quick") != current.get("quick"):
+        print("note: baseline and current run use different --quick settings", file=sys.stderr)
+    for key, base, cur, ratio, status in rows:
+        change = f"{ratio:.2f}x" if ratio is not None else ""
+        print(f"{key:<48} {_format_time(base):>10} {_format_time(cur):>10} {change:>7}  {status}")
+
+
+# ========== Command Line ==========
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Run performance benchmarks.")
+    parser.add_argument("-k", dest="names", action="append", help="only run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="smaller problem sizes")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help=f"baseline JSON (default {BASELINE_PATH})")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--compare", metavar="RESULTS", help="compare an existing results JSON instead of running")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed slowdown before flagging a regression (default {DEFAULT_THRESHOLD:.0%})")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    if args.compare:
+        with open(args.compare) as f:
+            current = json.load(f)
+    else:
+        current = run(args.names, quick=args.quick)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold)
+    if args.names:
+        rows = [r for r in rows if r[4] != "missing"]
+    report(rows, current, baseline)
+    regressions = [r for r in rows if r[4].startswith("regression")]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import numpy as np
+import formulas
+
+CONV_MPA_TO_KG = 10.1971621
+
+
+def layer_bond_strength(soil_types, spt):
+    """
+    Ultimate bond strength (kg/cm²) of each layer.
+    Clay layers use the piecewise correlation, everything else the sand line.
+    """
+    spt = np.asarray(spt, dtype=float)
+    is_clay = np.asarray(soil_types) == "Clay"
+    qs_mpa = np.where(is_clay, formulas.calculate_clay_bond_strength(spt), formulas.calculate_sand_bond_strength(spt))
+    return qs_mpa * CONV_MPA_TO_KG
+
+
+def layer_unit_capacity(soil_types, spt, effective_dia_cm):
+    """Ultimate capacity (Tons) per metre of bond length within each layer."""
+    qs = layer_bond_strength(soil_types, spt)
+    return (qs * (np.pi * effective_dia_cm * 100.0)) / 1000.0
+
+
+# ========== Stratigraphy ==========
+class Stratigraphy:
+    """
+    Ordered soil layers described by bottom elevation, soil type and SPT.
+    Layer i spans from the bottom of layer i-1 (0.0 for the first) to its own bottom.
+    """
+
+    def __init__(self, bottoms, soil_types, spt):
+        self.bottoms = np.asarray(bottoms, dtype=float)
+        self.soil_types = np.asarray(soil_types, dtype=object)
+        self.spt = np.asarray(spt, dtype=float)
+        self.tops = np.concatenate(([0.0], self.bottoms[:-1]))
+        self.bond_strength = layer_bond_strength(self.soil_types, self.spt)
+
+    @classmethod
+    def from_frame(cls, soil_data):
+        """Build from the stratigraphy table used by the app."""
+        return cls(soil_data['Elevation (m)'], soil_data['Soil Type'], soil_data['SPT'])
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from rows keyed like the app table ('Elevation (m)', 'Soil Type', 'SPT')."""
+        records = list(records)
+        return cls([float(r['Elevation (m)']) for r in records],
+                   [r['Soil Type'] for r in records],
+                   [float(r['SPT']) for r in records])
+
+    def to_records(self):
+        return [{"Elevation (m)": b, "Soil Type": t, "SPT": s}
+                for b, t, s in zip(self.bottoms.tolist(), self.soil_types.tolist(), self.spt.tolist())]
+
+    def __len__(self):
+        return len(self.bottoms)
+
+    @property
+    def max_depth(self):
+        return float(self.bottoms.max())
+
+    @property
+    def boundaries(self):
+        """Sorted layer boundaries from the surface; a row whose bottom is above the previous one has zero thickness."""
+        return np.concatenate(([0.0], np.maximum.accumulate(self.bottoms)))
+
+
+# ========== Capacity Profile ==========
+class CapacityProfile:
+    """
+    Cumulative ultimate capacity of a stratigraphy for one grout bulb diameter.
+
+    Layer boundaries are kept sorted (a row whose bottom is above the previous
+    one has zero thickness) together with the capacity per metre of depth of a
+    vertical bond in each layer and its prefix sums. The capacity between two
+    depths is then a `searchsorted` plus two lookups, for scalars or arrays.
+    Inclined bonds divide by sin(theta), since they are 1/sin(theta) longer
+    across the same depth interval.
+    """
+
+    def __init__(self, stratigraphy, dia_mm, enlarge_coeff=1.0):
+        self.stratigraphy = stratigraphy
+        self.effective_dia_cm = (dia_mm * enlarge_coeff) / 10.0
+        self.boundaries = stratigraphy.boundaries
+        self.unit_capacity = (stratigraphy.bond_strength * (np.pi * self.effective_dia_cm * 100.0)) / 1000.0
+        self.cumulative = np.concatenate(([0.0], np.cumsum(self.unit_capacity * np.diff(self.boundaries))))
+
+    @property
+    def max_depth(self):
+        return float(self.boundaries[-1])
+
+    def depth_capacity(self, z):
+        """Capacity (Tons) of a vertical bond from the surface down to depth `z`."""
+        z = np.clip(np.asarray(z, dtype=float), self.boundaries[0], self.boundaries[-1])
+        k = np.clip(np.searchsorted(self.boundaries, z, side="right") - 1, 0, len(self.unit_capacity) - 1)
+        return (self.cumulative[k] + self.unit_capacity[k] * (z - self.boundaries[k]))[()]
+
+    def capacity(self, z_start, z_end, sin_theta):
+        """Ultimate capacity (Tons) of a bond between depths `z_start` and `z_end`."""
+        return ((self.depth_capacity(z_end) - self.depth_capacity(z_start)) / sin_theta)[()]
+
+    def depth_at_capacity(self, z_start, required_capacity, sin_theta):
+        """
+        Depth at which a bond starting at `z_start` reaches `required_capacity` (Tons).
+        NaN where the defined soil cannot supply it.
+        """
+        z_start = np.asarray(z_start, dtype=float)
+        target = self.depth_capacity(z_start) + np.asarray(required_capacity, dtype=float) * sin_theta
+
+        j = np.clip(np.searchsorted(self.cumulative, target, side="left") - 1, 0, len(self.unit_capacity) - 1)
+        unit = self.unit_capacity[j]
+        step = np.divide(target - self.cumulative[j], unit, out=np.zeros(np.shape(target)), where=unit > 0)
+        z_end = np.maximum(self.boundaries[j] + step, z_start)
+        return np.where(target > self.cumulative[-1], np.nan, z_end)[()]
+
+    def required_bond_length(self, z_start, sin_theta, required_capacity, step=None, min_length=0.5):
+        """
+        Exact bond length (m) whose ultimate capacity reaches `required_capacity` (Tons).
+
+        With `step` set, the length is rounded up to that increment (never below
+        `min_length`), matching a stepped search. NaN where the defined soil
+        cannot supply the required capacity.
+        """
+        z_end = self.depth_at_capacity(z_start, required_capacity, sin_theta)
+        length = np.maximum((z_end - z_start) / sin_theta, 0.0)
+
+        if step:
+            length = np.maximum(min_length, np.round(np.ceil(length / step - 1e-9) * step, 10))
+            length = np.where(z_start + length * sin_theta > self.max_depth, np.nan, length)
+
+        return length[()]
+
+    def overlaps(self, z_start, z_end):
+        """Depth interval (m) of the bond between `z_start` and `z_end` inside each layer."""
+        tops, bottoms = self.boundaries[:-1], self.boundaries[1:]
+        return np.maximum(0.0, np.minimum(z_end, bottoms) - np.maximum(z_start, tops))
+
+
+# ========== Profile Stack ==========
+class ProfileStack:
+    """
+    Many capacity profiles evaluated together, one row per anchor.
+
+    Layer arrays are (n_profiles, n_layers); profiles with fewer layers are
+    padded with zero-thickness layers at the bottom. All queries take one
+    value per row and are vectorized over the whole stack.
+    """
+
+    def __init__(self, bottoms, soil_types, spt, dia_mm, enlarge_coeff=1.0):
+        bottoms = np.atleast_2d(np.asarray(bottoms, dtype=float))
+        self.soil_types = np.atleast_2d(np.asarray(soil_types, dtype=object))
+        self.spt = np.atleast_2d(np.asarray(spt, dtype=float))
+        self.effective_dia_cm = (np.asarray(dia_mm, dtype=float) * enlarge_coeff) / 10.0
+        self.boundaries = np.concatenate((np.zeros((len(bottoms), 1)), np.maximum.accumulate(bottoms, axis=1)), axis=1)
+        self.bond_strength = layer_bond_strength(self.soil_types, self.spt)
+        self.unit_capacity = (self.bond_strength * (np.pi * np.reshape(self.effective_dia_cm, (-1, 1)) * 100.0)) / 1000.0
+        self.cumulative = np.concatenate(
+            (np.zeros((len(bottoms), 1)), np.cumsum(self.unit_capacity * np.diff(self.boundaries, axis=1), axis=1)), axis=1)
+
+    @classmethod
+    def from_stratigraphies(cls, stratigraphies, dia_mm, enlarge_coeff=1.0):
+        """Stack Stratigraphy objects, padding shorter ones."""
+        n_layers = max(len(s) for s in stratigraphies)
+        bottoms = np.array([np.pad(s.bottoms, (0, n_layers - len(s)), mode="edge") for s in stratigraphies])
+        types = np.array([np.pad(s.soil_types, (0, n_layers - len(s)), constant_values="Sand") for s in stratigraphies], dtype=object)
+        spt = np.array([np.pad(s.spt, (0, n_layers - len(s))) for s in stratigraphies])
+        return cls(bottoms, types, spt, dia_mm, enlarge_coeff)
+
+    def __len__(self):
+        return len(self.boundaries)
+
+    @property
+    def max_depth(self):
+        return self.boundaries[:, -1]
+
+    @property
+    def _rows(self):
+        return np.arange(len(self.boundaries))
+
+    def depth_capacity(self, z):
+        """Row-wise capacity (Tons) of a vertical bond from the surface down to depth `z`."""
+        z = np.clip(np.asarray(z, dtype=float), self.boundaries[:, 0], self.boundaries[:, -1])
+        n_layers = self.unit_capacity.shape[1]
+        k = np.clip((self.boundaries[:, 1:] <= z[:, None]).sum(axis=1), 0, n_layers - 1)
+        rows = self._rows
+        return self.cumulative[rows, k] + self.unit_capacity[rows, k] * (z - self.boundaries[rows, k])
+
+    def capacity(self, z_start, z_end, sin_theta):
+        return (self.depth_capacity(z_end) - self.depth_capacity(z_start)) / sin_theta
+
+    def depth_at_capacity(self, z_start, required_capacity, sin_theta):
+        z_start = np.asarray(z_start, dtype=float)
+        target = self.depth_capacity(z_start) + np.asarray(required_capacity, dtype=float) * sin_theta
+
+        n_layers = self.unit_capacity.shape[1]
+        j = np.clip((self.cumulative[:, 1:] < target[:, None]).sum(axis=1), 0, n_layers - 1)
+        rows = self._rows
+        unit = self.unit_capacity[rows, j]
+        step = np.divide(target - self.cumulative[rows, j], unit, out=np.zeros(len(target)), where=unit > 0)
+        z_end = np.maximum(self.boundaries[rows, j] + step, z_start)
+        return np.where(target > self.cumulative[:, -1], np.nan, z_end)
+
+    def required_bond_length(self, z_start, sin_theta, required_capacity, step=None, min_length=0.5):
+        """Row-wise equivalent of CapacityProfile.required_bond_length."""
+        z_end = self.depth_at_capacity(z_start, required_capacity, sin_theta)
+        length = np.maximum((z_end - z_start) / sin_theta, 0.0)
+
+        if step:
+            length = np.maximum(min_length, np.round(np.ceil(length / step - 1e-9) * step, 10))
+            length = np.where(z_start + length * sin_theta > self.max_depth, np.nan, length)
+
+        return length
+
+    def overlaps(self, z_start, z_end):
+        """(n_profiles, n_layers) depth interval of each bond inside each layer."""
+        tops, bottoms = self.boundaries[:, :-1], self.boundaries[:, 1:]
+        return np.maximum(0.0, np.minimum(np.reshape(z_end, (-1, 1)), bottoms) - np.maximum(np.reshape(z_start, (-1, 1)), tops))
@@ -1,40 +1,75 @@
 import numpy as np
 
+# Bump whenever a correlation or its table changes; caches key on it.
+CORRELATION_VERSION = "bustamante-1985/1"
+
+# ========== Clay Breakpoint Table ==========
+# Piecewise linear correlation for clay. The first segment runs from (0, 0)
+# to the first tabulated point, and above SPT 12 the correlation follows the
+# straight 12-36 line (the tabulated SPT 24 point is not a breakpoint) and is
+# extrapolated with the same slope beyond SPT 36.
+CLAY_SPT = np.array([0.0, 0.75, 2.25, 5.0, 6.0, 7.5, 10.0, 12.0, 36.0])
+CLAY_BOND_STRENGTH = np.array([0.0, 0.008, 0.022, 0.044, 0.05, 0.06, 0.075, 0.087, 0.185])
+
+CLAY_TAIL_SLOPE = (0.185 - 0.087) / (36 - 12)
+
+# Per-segment tables, one entry per segment starting at CLAY_SPT[i]
+# (the last entry is the extrapolation beyond SPT 36).
+_CLAY_X0 = CLAY_SPT
+_CLAY_Y0 = CLAY_BOND_STRENGTH
+_CLAY_DY = np.append(np.diff(CLAY_BOND_STRENGTH), 0.0)
+_CLAY_DX = np.append(np.diff(CLAY_SPT), 1.0)
+_CLAY_SLOPE = np.full(len(CLAY_SPT), CLAY_TAIL_SLOPE)
+_CLAY_SLOPE[0] = CLAY_BOND_STRENGTH[1] / CLAY_SPT[1]
+# Tabulated segments (0.75-12) are evaluated as y0 + (x - x0) * dy / dx;
+# the first segment and the 12-36 line / tail use their fixed slope.
+_CLAY_TABULATED = np.zeros(len(CLAY_SPT), dtype=bool)
+_CLAY_TABULATED[1:-2] = True
+
+SAND_SLOPE = 0.005
+
+
 def calculate_clay_bond_strength(spt_value):
-    SPT_clay = np.array([0.75, 2.25, 5.0, 6.0, 7.5, 10.0, 12.0, 24.0, 36.0])
-    bond_strength_clay = np.array([0.008, 0.022, 0.044, 0.05, 0.06, 0.075, 0.087, 0.135, 0.185])
     """
     Calculate bond strength for clay soil.
-    Piecewise linear interpolation.
-    For SPT <= 0.75: Extrapolate from first segment
+    Piecewise linear interpolation over CLAY_SPT, vectorized over scalars or arrays.
+    For SPT <= 0.75: Extrapolate from (0,0) to the first data point
+    For SPT > 36: Extrapolate with the 12-36 slope
     """
-    # Handle SPT <= 0.75 (extrapolate from first data point)
-    if spt_value <= SPT_clay[0]:
-        if spt_value <= 0:
-            return 0.0  # SPT cannot be negative or zero
-        # Linear extrapolation from (0,0) to first data point
-        slope = bond_strength_clay[0] / SPT_clay[0]
-        return slope * spt_value
-    
-    # For SPT between data points up to 12
-    if spt_value <= 12:
-        for i in range(len(SPT_clay) - 1):
-            if SPT_clay[i] <= spt_value <= SPT_clay[i + 1]:
-                x1, y1 = SPT_clay[i], bond_strength_clay[i]
-                x2, y2 = SPT_clay[i + 1], bond_strength_clay[i + 1]
-                return y1 + (spt_value - x1) * (y2 - y1) / (x2 - x1)
-        return bond_strength_clay[-1]
-    
-    # For 12 < SPT <= 36
-    elif spt_value <= 36:
-        slope = (0.185 - 0.087) / (36 - 12)
-        return 0.087 + slope * (spt_value - 12)
-    
-    # For SPT > 36
-    else:
-        slope = (0.185 - 0.087) / (36 - 12)
-        return 0.185 + slope * (spt_value - 36)
+    spt = np.asarray(spt_value, dtype=float)
+    seg = np.clip(np.searchsorted(CLAY_SPT, spt, side="left") - 1, 0, len(CLAY_SPT) - 1)
+
+    offset = spt - _CLAY_X0[seg]
+    tabulated = _CLAY_Y0[seg] + offset * _CLAY_DY[seg] / _CLAY_DX[seg]
+    sloped = _CLAY_Y0[seg] + _CLAY_SLOPE[seg] * offset
+    bond = np.where(_CLAY_TABULATED[seg], tabulated, sloped)
+
+    # SPT cannot be negative or zero
+    bond = np.where(spt <= 0, 0.0, bond)
+    return bond[()]
+
 
 def calculate_sand_bond_strength(spt):
     # Constant linear relationship for Sand from provided notebook
-    return 0.005 * spt
\ No newline at end of file
+    return (SAND_SLOPE * np.asarray(spt, dtype=float))[()]
+
+
+def crossover_spt():
+    """
+    SPT above which the sand line overtakes the clay correlation, and the bond
+    strength (MPa) there. Both curves are linear between clay breakpoints, so
+    the root is exact within the first segment where the difference changes sign.
+    """
+    xs = CLAY_SPT[1:]
+    diff = calculate_sand_bond_strength(xs) - calculate_clay_bond_strength(xs)
+    for i in range(len(xs) - 1):
+        if diff[i] < 0 <= diff[i + 1]:
+            spt = xs[i] - diff[i] * (xs[i + 1] - xs[i]) / (diff[i + 1] - diff[i])
+            return float(spt), float(calculate_sand_bond_strength(spt))
+
+    # Beyond the last breakpoint both curves are straight lines
+    slope_gap = SAND_SLOPE - CLAY_TAIL_SLOPE
+    if diff[-1] < 0 < slope_gap:
+        spt = xs[-1] - diff[-1] / slope_gap
+        return float(spt), float(calculate_sand_bond_strength(spt))
+    return None
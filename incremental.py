@@ -0,0 +1,57 @@
+"""
+Dependency-tracked memoisation of analysis stages across reruns.
+
+A stage is stored together with the key of its own inputs and the versions
+of the stages it depends on. It is recomputed only when one of those
+changed, and its version only moves on when it was actually recomputed, so
+downstream stages whose own inputs are unchanged are kept as well. The
+store is any mutable mapping (st.session_state in the app).
+"""
+import profiling
+
+
+class Graph:
+    def __init__(self, store, namespace):
+        self.store = store
+        self.namespace = namespace
+        self.recomputed = []
+        self.reused = []
+
+    def _slot(self, name):
+        return f"{self.namespace}.{name}"
+
+    def version(self, name):
+        entry = self.store.get(self._slot(name))
+        return entry["version"] if entry else 0
+
+    def stage(self, name, key, deps, compute):
+        """
+        Value of stage `name` for inputs `key` (anything comparable with ==),
+        recomputed with `compute()` unless neither `key` nor any stage in
+        `deps` changed since it was last stored.
+        """
+        slot = self._slot(name)
+        full_key = (key, tuple(self.version(d) for d in deps))
+        entry = self.store.get(slot)
+        if entry is not None and _same(entry["key"], full_key):
+            self.reused.append(name)
+            return entry["value"]
+        with profiling.stage(name):
+            value = compute()
+        self.store[slot] = {"key": full_key, "value": value, "version": entry["version"] + 1 if entry else 1}
+        self.recomputed.append(name)
+        return value
+
+
+def clear(store, namespace):
+    """Drop every stage stored under `namespace`."""
+    prefix = f"{namespace}."
+    for key in [k for k in store if str(k).startswith(prefix)]:
+        del store[key]
+
+
+def _same(a, b):
+    try:
+        return bool(a == b)
+    except ValueError:  # e.g. array comparisons without a single truth value
+        return False
@@ -0,0 +1,395 @@
+"""
+Streaming import of high-resolution CPT and SPT logs.
+
+Logs are read in chunks of lines (memory-mapped when given a path) and each
+chunk is parsed straight into NumPy arrays. Readings are converted to an
+equivalent SPT N60 and a Clay/Sand class, then coalesced into a compact
+capacity.Stratigraphy as they arrive, so the raw log is never held in full.
+
+Supported inputs:
+    CSV CPT: depth, qc (MPa), fs (MPa, or kPa when the header says so)
+    CSV SPT: depth, SPT, optional Soil Type
+    AGS4:    SCPT group (SCPT_DPTH, SCPT_RES, SCPT_FRES) or ISPT group (ISPT_TOP, ISPT_NVAL)
+CSV logs may hold several soundings told apart by a borehole / LOCA_ID column.
+
+Usage:
+    python -m logs sounding.csv -o boreholes.csv --tolerance 3 --min-thickness 0.3
+"""
+import argparse
+import csv
+import io
+import itertools
+import mmap
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+import batch
+import capacity
+
+CHUNK_BYTES = 1024 * 1024
+
+KIND_CPT = "CPT"
+KIND_SPT = "SPT"
+
+# Robertson (2010) non-normalised soil behaviour type index and the
+# Jefferies & Davies (1993) qc / N60 ratio
+PA_MPA = 0.1013
+CLAY_IC = 2.6
+
+DEPTH_COLUMNS = ("depth", "depth (m)", "z", "z (m)", "scpt_dpth", "ispt_top")
+QC_COLUMNS = ("qc", "qc (mpa)", "cone resistance", "scpt_res")
+FS_COLUMNS = ("fs", "fs (mpa)", "fs (kpa)", "sleeve friction", "scpt_fres")
+SPT_COLUMNS = ("spt", "n", "n60", "spt n", "ispt_nval")
+TYPE_COLUMNS = ("soil type", "soil", "type")
+NAME_COLUMNS = ("borehole", "sounding", "location", "loca_id")
+
+
+# ========== Correlations ==========
+def behaviour_index(qc, fs):
+    """Soil behaviour type index Isbt from cone resistance and sleeve friction (MPa)."""
+    qc = np.maximum(qc, 1e-6)
+    rf = np.maximum(fs / qc * 100.0, 1e-6)
+    return np.sqrt((3.47 - np.log10(qc / PA_MPA)) ** 2 + (np.log10(rf) + 1.22) ** 2)
+
+
+def cpt_to_spt(qc, fs):
+    """Equivalent N60 and clay flag (Isbt > 2.6) for CPT readings."""
+    ic = behaviour_index(qc, fs)
+    n60 = (qc / PA_MPA) / 10 ** (1.1268 - 0.2817 * ic)
+    return n60, ic > CLAY_IC
+
+
+# ========== Layer Coalescing ==========
+class _Layer:
+    __slots__ = ("bottom", "thickness", "clay_thickness", "spt_sum")
+
+    def __init__(self, bottom, thickness, clay_thickness, spt_sum):
+        self.bottom = bottom
+        self.thickness = thickness
+        self.clay_thickness = clay_thickness
+        self.spt_sum = spt_sum
+
+    @property
+    def clay(self):
+        return self.clay_thickness * 2 > self.thickness
+
+    @property
+    def spt(self):
+        return self.spt_sum / self.thickness if self.thickness > 0 else 0.0
+
+    def absorb(self, other):
+        self.bottom = other.bottom
+        self.thickness += other.thickness
+        self.clay_thickness += other.clay_thickness
+        self.spt_sum += other.spt_sum
+
+
+def _moving_mean(values, window):
+    """Centred moving average, with the window shrinking at the ends."""
+    if window <= 1:
+        return values
+    n = len(values)
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    lo = np.clip(np.arange(n) - window // 2, 0, n)
+    hi = np.clip(np.arange(n) + window // 2 + 1, 0, n)
+    return (csum[hi] - csum[lo]) / (hi - lo)
+
+
+class LayerCoalescer:
+    """
+    Merge a stream of readings into layers. A reading at depth d covers the
+    interval from the previous reading (or the surface) down to d.
+
+    Readings stay in the current layer while they have its soil class and
+    their SPT is within `tolerance` of its thickness-weighted mean. Anything
+    else opens a pending layer, which only replaces the current one once it is
+    at least `min_thickness` thick; a thin lens followed by readings that match
+    the current layer again is absorbed into it.
+    """
+
+    def __init__(self, tolerance=2.0, min_thickness=0.2):
+        self.tolerance = tolerance
+        self.min_thickness = min_thickness
+        self.readings = 0
+        self._last_depth = 0.0
+        self._layers = []
+        self._current = None
+        self._pending = None
+
+    def feed(self, depth, spt, clay):
+        """Add a chunk of readings in depth order; readings not below the previous one are dropped."""
+        depth = np.asarray(depth, dtype=float)
+        spt = np.asarray(spt, dtype=float)
+        clay = np.asarray(clay, dtype=bool)
+        previous = np.maximum.accumulate(np.concatenate(([self._last_depth], depth)))[:-1]
+        keep = (depth > previous) & np.isfinite(spt)
+        depth, spt, clay = depth[keep], spt[keep], clay[keep]
+        if not len(depth):
+            return
+        thickness = np.diff(depth, prepend=self._last_depth)
+        self._last_depth = float(depth[-1])
+        self.readings += len(depth)
+
+        # Group readings into runs first, so the merge loop below sees runs rather
+        # than individual readings. Runs break where the class or the SPT band of
+        # a moving average over about `min_thickness` of log changes; the merge
+        # itself only uses the raw thickness-weighted sums.
+        window = int(np.clip(round(self.min_thickness / max(float(np.median(thickness)), 1e-9)), 1, 101))
+        smooth_spt, smooth_clay = _moving_mean(spt, window), _moving_mean(clay.astype(float), window) > 0.5
+        band = np.floor(smooth_spt / self.tolerance) if self.tolerance > 0 else smooth_spt
+        starts = np.flatnonzero(np.concatenate(([True], (smooth_clay[1:] != smooth_clay[:-1]) | (band[1:] != band[:-1]))))
+        ends = np.append(starts[1:], len(depth)) - 1
+        run_thickness = np.add.reduceat(thickness, starts)
+        run_spt = np.add.reduceat(spt * thickness, starts)
+        run_clay = np.add.reduceat(thickness * clay, starts)
+        for bottom, h, h_clay, s in zip(depth[ends].tolist(), run_thickness.tolist(),
+                                        run_clay.tolist(), run_spt.tolist()):
+            self._add(_Layer(bottom, h, h_clay, s))
+
+    def _matches(self, layer, run):
+        return layer.clay == run.clay and abs(run.spt - layer.spt) <= self.tolerance
+
+    def _add(self, run):
+        if self._current is None:
+            self._current = run
+        elif self._pending is None:
+            if self._matches(self._current, run):
+                self._current.absorb(run)
+            else:
+                self._pending = run
+        elif self._matches(self._pending, run) or not self._matches(self._current, run):
+            self._pending.absorb(run)
+        else:
+            self._current.absorb(self._pending)
+            self._current.absorb(run)
+            self._pending = None
+
+        if self._pending is not None and self._pending.thickness >= self.min_thickness:
+            # Scatter on both sides of the current mean averages back into it
+            if self._matches(self._current, self._pending):
+                self._current.absorb(self._pending)
+            else:
+                self._layers.append(self._current)
+                self._current = self._pending
+            self._pending = None
+
+    def finish(self):
+        """Stratigraphy of everything fed so far (an empty one if nothing was)."""
+        layers = list(self._layers)
+        if self._current is not None:
+            current = _Layer(self._current.bottom, self._current.thickness,
+                             self._current.clay_thickness, self._current.spt_sum)
+            if self._pending is not None:
+                current.absorb(self._pending)
+            layers.append(current)
+        return capacity.Stratigraphy([l.bottom for l in layers],
+                                     ["Clay" if l.clay else "Sand" for l in layers],
+                                     [l.spt for l in layers])
+
+
+# ========== Reading ==========
+@dataclass
+class Sounding:
+    name: str
+    kind: str
+    readings: int
+    stratigraphy: capacity.Stratigraphy
+
+
+def iter_line_chunks(source, chunk_bytes=CHUNK_BYTES):
+    """Yield lists of non-blank text lines, about `chunk_bytes` at a time, from a path, bytes or a stream."""
+    if isinstance(source, (str, os.PathLike)):
+        if os.path.getsize(source) == 0:
+            return
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from _chunks(mm.read, chunk_bytes)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield from _chunks(io.BytesIO(source).read, chunk_bytes)
+    else:
+        yield from _chunks(source.read, chunk_bytes)
+
+
+def _chunks(read, chunk_bytes):
+    # Blocks are cut after their last newline before decoding, so neither lines
+    # nor multi-byte characters are split; the remainder starts the next block
+    tail = None
+    first = True
+    while True:
+        data = read(chunk_bytes)
+        at_end = not data
+        if tail:
+            data = tail + data
+        if not data:
+            return
+        if at_end:
+            block, tail = data, None
+        else:
+            cut = data.rfind(b"\n" if isinstance(data, bytes) else "\n") + 1
+            if cut == 0:
+                tail = data
+                continue
+            block, tail = data[:cut], data[cut:]
+        text = block.decode("utf-8") if isinstance(block, bytes) else block
+        if first:
+            text = text.lstrip("\ufeff")
+            first = False
+        lines = [line for line in text.splitlines() if line.strip()]
+        if lines:
+            yield lines
+        if at_end:
+            return
+
+
+class _Soundings:
+    """Coalescers keyed by (kind, name), in order of first appearance."""
+
+    def __init__(self, tolerance, min_thickness):
+        self.tolerance = tolerance
+        self.min_thickness = min_thickness
+        self.coalescers = {}
+
+    def feed(self, kind, names, depth, spt, clay):
+        if names is None:
+            names = np.full(len(depth), "")
+        labels, first = np.unique(names, return_index=True)
+        for name in labels[np.argsort(first)].tolist():
+            rows = names == name
+            key = (kind, name)
+            if key not in self.coalescers:
+                self.coalescers[key] = LayerCoalescer(self.tolerance, self.min_thickness)
+            self.coalescers[key].feed(depth[rows], spt[rows], clay[rows])
+
+    def result(self, default_name):
+        names = [name for _, name in self.coalescers]
+        out = {}
+        for (kind, name), coalescer in self.coalescers.items():
+            label = name or default_name
+            if names.count(name) > 1:
+                label = f"{label} {kind}"
+            out[label] = Sounding(label, kind, coalescer.readings, coalescer.finish())
+        return out
+
+
+def _find(header, names):
+    for i, h in enumerate(header):
+        if h in names:
+            return i
+    return None
+
+
+def _read_csv(first, rest, soundings, default_soil_type):
+    header_line = first[0]
+    delimiter = max(",;\t", key=header_line.count)
+    header = [h.strip().strip('"').lower() for h in header_line.rstrip("\r\n").split(delimiter)]
+    depth_col, name_col, type_col = _find(header, DEPTH_COLUMNS), _find(header, NAME_COLUMNS), _find(header, TYPE_COLUMNS)
+    qc_col, fs_col, spt_col = _find(header, QC_COLUMNS), _find(header, FS_COLUMNS), _find(header, SPT_COLUMNS)
+    if depth_col is None:
+        raise ValueError(f"No depth column in log header (expected one of {', '.join(DEPTH_COLUMNS)})")
+    if qc_col is not None and fs_col is not None:
+        kind, value_cols = KIND_CPT, (depth_col, qc_col, fs_col)
+        fs_scale = 0.001 if "kpa" in header[fs_col] else 1.0
+    elif spt_col is not None:
+        kind, value_cols = KIND_SPT, (depth_col, spt_col)
+    else:
+        raise ValueError("Log needs either qc and fs columns (CPT) or an SPT column")
+
+    for lines in itertools.chain([first[1:]], rest):
+        if not lines:
+            continue
+        values = np.loadtxt(lines, delimiter=delimiter, usecols=value_cols, ndmin=2, quotechar='"')
+        names = None
+        if name_col is not None:
+            names = np.char.strip(np.loadtxt(lines, delimiter=delimiter, usecols=(name_col,), dtype=str,
+                                             ndmin=1, quotechar='"'))
+        if kind == KIND_CPT:
+            spt, clay = cpt_to_spt(values[:, 1], values[:, 2] * fs_scale)
+        else:
+            spt = values[:, 1]
+            if type_col is not None:
+                types = np.loadtxt(lines, delimiter=delimiter, usecols=(type_col,), dtype=str, ndmin=1, quotechar='"')
+                clay = np.char.startswith(np.char.lower(np.char.strip(types)), "c")
+            else:
+                clay = np.full(len(spt), default_soil_type == "Clay")
+        soundings.feed(kind, names, values[:, 0], spt, clay)
+
+
+def _read_ags(chunks, soundings, default_soil_type):
+    """AGS4 SCPT and ISPT groups; other groups are skipped."""
+    group, columns = None, {}
+    for lines in chunks:
+        rows = {KIND_CPT: [], KIND_SPT: []}
+        for row in csv.reader(lines):
+            if not row:
+                continue
+            if row[0] == "GROUP":
+                group, columns = row[1], {}
+            elif row[0] == "HEADING":
+                columns = {h: i for i, h in enumerate(row)}
+            elif row[0] == "DATA" and group in ("SCPT", "ISPT"):
+                try:
+                    if group == "SCPT":
+                        rows[KIND_CPT].append((row[columns["LOCA_ID"]], float(row[columns["SCPT_DPTH"]]),
+                                               float(row[columns["SCPT_RES"]]), float(row[columns["SCPT_FRES"]])))
+                    else:
+                        rows[KIND_SPT].append((row[columns["LOCA_ID"]], float(row[columns["ISPT_TOP"]]),
+                                               float(row[columns["ISPT_NVAL"]])))
+                except (KeyError, ValueError, IndexError):
+                    continue  # rows without a reading (e.g. refusal, blank cells)
+        for kind, data in rows.items():
+            if not data:
+                continue
+            names = np.array([r[0] for r in data])
+            values = np.array([r[1:] for r in data], dtype=float)
+            if kind == KIND_CPT:
+                spt, clay = cpt_to_spt(values[:, 1], values[:, 2])
+            else:
+                spt, clay = values[:, 1], np.full(len(data), default_soil_type == "Clay")
+            soundings.feed(kind, names, values[:, 0], spt, clay)
+
+
+def read_log(source, tolerance=2.0, min_thickness=0.2, default_soil_type="Sand", chunk_bytes=CHUNK_BYTES, name="Log"):
+    """
+    {name: Sounding} for every sounding of a CPT/SPT log (CSV or AGS4).
+    `tolerance` is the SPT spread allowed within one layer and `min_thickness`
+    the thinnest layer kept; `default_soil_type` classifies SPT logs without a
+    soil type column. `name` labels a CSV log without a borehole column.
+    """
+    soundings = _Soundings(tolerance, min_thickness)
+    chunks = iter_line_chunks(source, chunk_bytes)
+    first = next(chunks, None)
+    if first is None:
+        return {}
+    if first[0].lstrip('"').startswith("GROUP"):
+        _read_ags(itertools.chain([first], chunks), soundings, default_soil_type)
+    else:
+        _read_csv(first, chunks, soundings, default_soil_type)
+    return soundings.result(name)
+
+
+# ========== Command Line ==========
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m logs", description="Coalesce CPT/SPT logs into soil layers.")
+    parser.add_argument("log", help="CPT/SPT log (CSV or AGS4)")
+    parser.add_argument("-o", "--output", default="boreholes.csv", help="boreholes CSV in the batch input format")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="SPT spread allowed within a layer")
+    parser.add_argument("--min-thickness", type=float, default=0.2, help="thinnest layer kept (m)")
+    parser.add_argument("--soil-type", choices=("Clay", "Sand"), default="Sand", help="class of SPT logs without a soil type column")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    soundings = read_log(args.log, tolerance=args.tolerance, min_thickness=args.min_thickness,
+                         default_soil_type=args.soil_type, name=os.path.splitext(os.path.basename(args.log))[0])
+    rows = [{"borehole": name, **layer} for name, s in soundings.items() for layer in s.stratigraphy.to_records()]
+    batch.write_csv(rows, args.output, ["borehole", "Elevation (m)", "Soil Type", "SPT"])
+    for s in soundings.values():
+        print(f"{s.name} ({s.kind}): {s.readings} readings -> {len(s.stratigraphy)} layers", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
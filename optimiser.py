@@ -0,0 +1,118 @@
+"""
+Cost-minimising anchor design.
+
+Searches angle, borehole diameter (from a list of drill sizes) and free
+length; for each combination the cheapest bond length is the shortest one
+that carries the design load with the target SF, so it is solved exactly
+rather than searched. Candidates breaking the SNI 8460:2017 rules used by
+the app (minimum free length, bond length > 13 m without pullout test,
+minimum SPT per soil type in the bonded layers) are pruned before costing.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+import anchor_engine
+import parametric
+
+DRILL_SIZES = (100.0, 115.0, 127.0, 150.0, 165.0, 178.0, 200.0, 250.0)
+
+
+@dataclass
+class CostModel:
+    """
+    Rates per metre drilled (free + bond length) and per metre grouted (bond length).
+    Each rate is a scalar or one value per diameter.
+    """
+    drill_per_m: object = 1.0
+    grout_per_m: object = 1.0
+
+
+@dataclass
+class OptimisationResult:
+    """Feasible candidates sorted by cost (cheapest first)."""
+    angle_deg: np.ndarray
+    dia_mm: np.ndarray
+    free_length: np.ndarray
+    bond_length: np.ndarray
+    cost: np.ndarray
+    n_evaluated: int
+
+    @property
+    def total_length(self):
+        return self.free_length + self.bond_length
+
+    def __len__(self):
+        return len(self.cost)
+
+    def record(self, i):
+        return {"Angle (deg)": float(self.angle_deg[i]), "Diameter (mm)": float(self.dia_mm[i]),
+                "Free Length (m)": float(self.free_length[i]), "Bond Length (m)": float(self.bond_length[i]),
+                "Total Length (m)": float(self.total_length[i]), "Cost": float(self.cost[i])}
+
+    def best(self):
+        return self.record(0) if len(self) else None
+
+    def pareto_indices(self):
+        """Candidates not beaten on both cost and total length (sorted by cost)."""
+        if not len(self):
+            return np.array([], dtype=int)
+        # Sorted by cost, so a candidate is on the front if it is shorter than every cheaper one
+        length = self.total_length
+        prev_best = np.concatenate(([np.inf], np.minimum.accumulate(length)[:-1]))
+        return np.flatnonzero(length < prev_best)
+
+    def pareto(self):
+        return [self.record(i) for i in self.pareto_indices()]
+
+
+def _spt_violation(strata, z_start, z_end):
+    """True where any layer crossed by the bond is below the SNI minimum SPT."""
+    boundaries = strata.boundaries
+    thickness = np.diff(boundaries)
+    min_spt = np.array([anchor_engine.MIN_SPT.get(t, -np.inf) for t in strata.soil_types])
+    bad = (strata.spt < min_spt) & (thickness > 0)
+    bad_prefix = np.concatenate(([0], np.cumsum(bad)))
+
+    n = len(thickness)
+    first = np.clip(np.searchsorted(boundaries, z_start, side="right") - 1, 0, n - 1)
+    last = np.clip(np.searchsorted(boundaries, z_end, side="left") - 1, 0, n - 1)
+    return (bad_prefix[last + 1] - bad_prefix[first]) > 0
+
+
+def optimise(strata, design_load, fos, angles, diameters=DRILL_SIZES, free_lengths=None,
+             cost_model=None, enlarge_coeff=1.0, elevation=0.0, allow_pullout_test=False,
+             step=anchor_engine.LENGTH_STEP):
+    """
+    Cheapest anchors for `design_load` (Tons) at safety factor `fos`.
+    Free lengths below the SNI minimum are dropped; by default the bond length
+    is limited to 13 m unless `allow_pullout_test` is set.
+    """
+    cost_model = cost_model or CostModel()
+    angles = np.asarray(angles, dtype=float)
+    diameters = np.asarray(diameters, dtype=float)
+    if free_lengths is None:
+        free_lengths = np.arange(anchor_engine.MIN_FREE_LENGTH, 15.0 + 1e-9, 0.5)
+    free_lengths = np.asarray(free_lengths, dtype=float)
+    free_lengths = free_lengths[free_lengths >= anchor_engine.MIN_FREE_LENGTH]
+
+    required = parametric.required_length_grid(strata, angles, diameters, [enlarge_coeff], free_lengths,
+                                               design_load * fos, elevation=elevation, step=step)[:, :, 0, :]
+    n_evaluated = required.size
+
+    a, d, f = np.meshgrid(angles, diameters, free_lengths, indexing="ij")
+    drill = np.broadcast_to(np.asarray(cost_model.drill_per_m, dtype=float), diameters.shape)[None, :, None]
+    grout = np.broadcast_to(np.asarray(cost_model.grout_per_m, dtype=float), diameters.shape)[None, :, None]
+    cost = drill * (f + required) + grout * required
+
+    max_bond = anchor_engine.MAX_BOND_LENGTH if allow_pullout_test else anchor_engine.PULLOUT_TEST_BOND_LENGTH
+    keep = np.isfinite(required) & (required <= max_bond)
+    a, d, f, bond, cost = a[keep], d[keep], f[keep], required[keep], cost[keep]
+
+    sin_theta = np.sin(np.radians(a))
+    z_start = elevation + f * sin_theta
+    ok = ~_spt_violation(strata, z_start, z_start + bond * sin_theta)
+    a, d, f, bond, cost = a[ok], d[ok], f[ok], bond[ok], cost[ok]
+
+    order = np.lexsort((f + bond, cost))
+    return OptimisationResult(a[order], d[order], f[order], bond[order], cost[order], n_evaluated)
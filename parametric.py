@@ -0,0 +1,85 @@
+"""
+Vectorized parametric studies over anchor geometry.
+
+The whole grid of angle x diameter x enlargement coefficient x free length
+is evaluated in one broadcasted pass over a single CapacityProfile. Capacity
+is linear in the grout bulb diameter, so the profile is built once for a
+1 cm bulb and scaled per grid point.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+import capacity
+
+AXES = ("angle_deg", "dia_mm", "enlarge_coeff", "free_length")
+AXIS_TITLES = {
+    "angle_deg": "Angle of Inclination (deg)",
+    "dia_mm": "Borehole Diameter (mm)",
+    "enlarge_coeff": "Enlargement Coefficient",
+    "free_length": "Free Length (m)",
+}
+
+
+@dataclass
+class ParametricGrid:
+    """Results indexed as [angle, diameter, enlargement, free length]."""
+    angle_deg: np.ndarray
+    dia_mm: np.ndarray
+    enlarge_coeff: np.ndarray
+    free_length: np.ndarray
+    required_bond_length: np.ndarray
+    fos: np.ndarray
+
+    @property
+    def shape(self):
+        return self.required_bond_length.shape
+
+    def axis(self, name):
+        return getattr(self, name)
+
+    def slice2d(self, values, x, y, fixed):
+        """
+        2-D slice of `values` with axis `y` along rows and `x` along columns.
+        `fixed` maps each remaining axis name to the grid index to hold.
+        """
+        index = tuple(slice(None) if name in (x, y) else fixed[name] for name in AXES)
+        plane = values[index]
+        return plane.T if AXES.index(x) < AXES.index(y) else plane
+
+
+def _grid(strata, angles, diameters, enlargements, free_lengths, elevation):
+    """Unit-diameter profile and the broadcast sin(theta), bulb diameter (cm) and bond start depth."""
+    unit_profile = capacity.CapacityProfile(strata, dia_mm=10.0)  # 1 cm grout bulb
+    sin_theta = np.sin(np.radians(np.asarray(angles, dtype=float)))[:, None, None, None]
+    dia_cm = (np.asarray(diameters, dtype=float)[:, None] * np.asarray(enlargements, dtype=float)[None, :] / 10.0)[None, :, :, None]
+    z_start = elevation + np.asarray(free_lengths, dtype=float)[None, None, None, :] * sin_theta
+    return unit_profile, sin_theta, dia_cm, z_start
+
+
+def required_length_grid(strata, angles, diameters, enlargements, free_lengths, required_capacity,
+                         elevation=0.0, step=None):
+    """Bond length reaching `required_capacity` (Tons, ultimate) at every grid point, NaN if unreachable."""
+    unit_profile, sin_theta, dia_cm, z_start = _grid(strata, angles, diameters, enlargements, free_lengths, elevation)
+    required = unit_profile.required_bond_length(z_start, sin_theta, required_capacity / dia_cm, step=step)
+    return np.broadcast_to(required, np.broadcast_shapes(sin_theta.shape, dia_cm.shape, z_start.shape))
+
+
+def sweep(strata, angles, diameters, enlargements, free_lengths, design_load, fos,
+          bond_length, elevation=0.0, step=None):
+    """
+    Required bond length (for `design_load` x `fos`) and safety factor (for a
+    fixed `bond_length`) at every combination of the four input ranges.
+    Points where the stratigraphy is too shallow are NaN.
+    """
+    unit_profile, sin_theta, dia_cm, z_start = _grid(strata, angles, diameters, enlargements, free_lengths, elevation)
+    shape = np.broadcast_shapes(sin_theta.shape, dia_cm.shape, z_start.shape)
+    required = unit_profile.required_bond_length(z_start, sin_theta, design_load * fos / dia_cm, step=step)
+
+    z_end = z_start + bond_length * sin_theta
+    ultimate = unit_profile.capacity(z_start, z_end, sin_theta) * dia_cm
+    safety = np.where(z_end > unit_profile.max_depth, np.nan, ultimate / design_load)
+
+    return ParametricGrid(np.asarray(angles, dtype=float), np.asarray(diameters, dtype=float),
+                          np.asarray(enlargements, dtype=float), np.asarray(free_lengths, dtype=float),
+                          np.broadcast_to(required, shape), np.broadcast_to(safety, shape))
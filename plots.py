@@ -1,9 +1,85 @@
 import plotly.graph_objects as go
 import numpy as np
 import formulas
+import profiling
 
 
 # ========== Plotly Anchor Analysis  ==========
+# Strata are drawn as one filled trace per soil type up to MAX_STRATA_POLYGONS
+# runs of same-type layers, and as a fixed-resolution heatmap beyond, so the
+# figure stays the same size however detailed the profile is.
+MAX_STRATA_POLYGONS = 300
+STRATA_CELLS = 1000
+MAX_STRATA_CELLS = 200_000
+MAX_SOIL_LABELS = 30
+WEBGL_POINTS = 2000
+
+def _soil_color(soil_type):
+    return "bisque" if soil_type == "Sand" else "darkseagreen"
+
+def _soil_runs(bottoms, soil_types):
+    """Tops, bottoms and types of runs of adjacent layers with the same soil type."""
+    bottoms = np.maximum.accumulate(np.asarray(bottoms, dtype=float))
+    types = np.asarray(soil_types, dtype=object)
+    tops = np.concatenate(([0.0], bottoms[:-1]))
+    keep = bottoms > tops
+    tops, bottoms, types = tops[keep], bottoms[keep], types[keep]
+    if not len(types):
+        return tops, bottoms, types
+    starts = np.flatnonzero(np.concatenate(([True], types[1:] != types[:-1])))
+    ends = np.append(starts[1:], len(types)) - 1
+    return tops[starts], bottoms[ends], types[starts]
+
+def _rects(x0, x1, y0, y1):
+    """Closed rectangles as one x/y pair separated by gaps (a single filled trace)."""
+    gap = np.full(len(y0), np.nan)
+    xs = np.stack([x0, x1, x1, x0, x0, gap], axis=1).ravel()
+    ys = np.stack([y0, y0, y1, y1, y0, gap], axis=1).ravel()
+    return xs, ys
+
+def _strata_cells(tops, bottoms, types, depth, cells):
+    """Depth cell edges and a colour code per cell (0 clay, 1 sand, 2 below the profile)."""
+    edges = np.linspace(0.0, depth, cells + 1)
+    centres = (edges[:-1] + edges[1:]) / 2
+    idx = np.searchsorted(bottoms, centres, side="left")
+    inside = idx < len(bottoms)
+    codes = np.full(cells, 2, dtype=np.uint8)
+    codes[inside] = np.where(types[idx[inside]] == "Sand", 1, 0)
+    return edges, codes
+
+STRATA_COLORSCALE = [[0, "darkseagreen"], [1 / 3, "darkseagreen"], [1 / 3, "bisque"], [2 / 3, "bisque"],
+                     [2 / 3, "white"], [1, "white"]]
+
+def _label_runs(tops, bottoms, depth, max_labels):
+    """Indices of the runs to label: the thickest one in each of `max_labels` depth bins."""
+    if not len(tops):
+        return np.array([], dtype=int)
+    mid = (tops + bottoms) / 2
+    bins = np.clip((mid / max(depth, 1e-9) * max_labels).astype(int), 0, max_labels - 1)
+    order = np.lexsort((tops - bottoms, bins))
+    _, first = np.unique(bins[order], return_index=True)
+    return np.sort(order[first])
+
+def _add_strata(fig, bottoms, soil_types, x_min, x_max, depth, max_labels=MAX_SOIL_LABELS):
+    tops, bottoms, types = _soil_runs(bottoms, soil_types)
+    if len(tops) <= MAX_STRATA_POLYGONS:
+        for soil_type in dict.fromkeys(types.tolist()):
+            sel = types == soil_type
+            xs, ys = _rects(np.full(sel.sum(), x_min), np.full(sel.sum(), x_max), tops[sel], bottoms[sel])
+            fig.add_trace(go.Scatter(x=xs, y=ys, fill='toself', fillcolor=_soil_color(soil_type), opacity=0.3,
+                                     mode='none', name=soil_type, hoverinfo='skip', showlegend=False))
+    else:
+        edges, codes = _strata_cells(tops, bottoms, types, depth, STRATA_CELLS)
+        fig.add_trace(go.Heatmap(z=codes[:, None], x=[x_min, x_max], y=edges, colorscale=STRATA_COLORSCALE,
+                                 zmin=0, zmax=2, opacity=0.3, showscale=False, hoverinfo='skip'))
+
+    # Position labels on the far right of the current view
+    lab = _label_runs(tops, bottoms, depth, max_labels)
+    fig.add_trace(go.Scatter(x=np.full(len(lab), x_max * 0.85), y=(tops[lab] + bottoms[lab]) / 2,
+                             text=types[lab], mode='text', textfont=dict(size=12, color="gray"),
+                             hoverinfo='skip', showlegend=False))
+
+@profiling.timed()
 def plot_anchor_plotly(layers_df, free_l, bond_l, anchor_elev, angle_deg):
     fig = go.Figure()
     
@@ -30,24 +106,10 @@ def plot_anchor_plotly(layers_df, free_l, bond_l, anchor_elev, angle_deg):
         # For inclined anchors, start at 0 and go to the right with a buffer
         x_min, x_max = 0, max(x2 + 2, 5)
 
-    # 4. Soil Stratigraphy (Background)
-    bottoms = layers_df['Elevation (m)'].tolist()
-    tops = [0.0] + bottoms[:-1]
+    # 4. Soil Stratigraphy (Background), filling the dynamic X range
+    bottoms = np.asarray(layers_df['Elevation (m)'], dtype=float)
     max_depth = max(bottoms[-1], y2 + 2)
-
-    for i, row in layers_df.iterrows():
-        top = tops[i]
-        bottom = bottoms[i]
-        color = "bisque" if row['Soil Type'] == "Sand" else "darkseagreen"
-        
-        # Extend the soil rectangles to fill the dynamic X range
-        fig.add_shape(type="rect", x0=x_min, y0=top, x1=x_max, y1=bottom,
-                      fillcolor=color, opacity=0.3, line_width=0, layer="below")
-        
-        # Position label on the far right of the current view
-        fig.add_annotation(x=x_max * 0.85, y=(top + bottom) / 2, 
-                           text=f"{row['Soil Type']}", showarrow=False, 
-                           font=dict(size=12, color="gray"))
+    _add_strata(fig, bottoms, layers_df['Soil Type'], x_min, x_max, max_depth)
 
     # 5. Plot Anchor Segments
     # Free Length
@@ -74,11 +136,200 @@ def plot_anchor_plotly(layers_df, free_l, bond_l, anchor_elev, angle_deg):
     
     return fig
 
+@profiling.timed()
+def plot_anchor_comparison(labels, stratigraphies, elevations, bond_starts, bond_ends, max_ticks=40):
+    """
+    Depth profiles of many anchors side by side: one strata column per anchor
+    with its free length (dashed) and bond length (thick) drawn down the middle.
+    """
+    n = len(labels)
+    elevations, bond_starts, bond_ends = (np.asarray(v, dtype=float) for v in (elevations, bond_starts, bond_ends))
+    runs = [_soil_runs(s.bottoms, s.soil_types) for s in stratigraphies]
+    depth = max(max((s.max_depth for s in stratigraphies), default=0.0), float(np.nanmax(bond_ends, initial=0.0))) + 1.0
+    fig = go.Figure()
+
+    # 1. Strata columns
+    if sum(len(r[0]) for r in runs) <= MAX_STRATA_POLYGONS:
+        col = np.concatenate([np.full(len(r[0]), i) for i, r in enumerate(runs)]) if n else np.array([])
+        tops, bottoms, types = (np.concatenate([r[k] for r in runs]) if n else np.array([]) for k in range(3))
+        for soil_type in dict.fromkeys(types.tolist()):
+            sel = types == soil_type
+            xs, ys = _rects(col[sel] - 0.4, col[sel] + 0.4, tops[sel], bottoms[sel])
+            fig.add_trace(go.Scatter(x=xs, y=ys, fill='toself', fillcolor=_soil_color(soil_type), opacity=0.3,
+                                     mode='none', name=soil_type, hoverinfo='skip'))
+    else:
+        cells = int(np.clip(MAX_STRATA_CELLS // max(n, 1), 20, STRATA_CELLS))
+        columns = [_strata_cells(*r, depth, cells) for r in runs]
+        edges = columns[0][0]
+        codes = np.stack([c[1] for c in columns], axis=1)
+        fig.add_trace(go.Heatmap(z=codes, x=np.arange(n), y=edges, colorscale=STRATA_COLORSCALE,
+                                 zmin=0, zmax=2, opacity=0.3, showscale=False, hoverinfo='skip', xgap=2))
+
+    # 2. Anchor segments, one trace each for all free and all bond lengths
+    trace = go.Scattergl if 3 * n > WEBGL_POINTS else go.Scatter
+    x = np.stack([np.arange(n), np.arange(n), np.full(n, np.nan)], axis=1).ravel()
+    gap = np.full(n, np.nan)
+    text = np.repeat(np.asarray(labels, dtype=object), 3)
+    fig.add_trace(trace(x=x, y=np.stack([elevations, bond_starts, gap], axis=1).ravel(), mode='lines',
+                        line=dict(color='blue', width=2, dash='dash'), name='Free Length',
+                        text=text, hovertemplate="%{text}: %{y:.2f} m<extra></extra>"))
+    fig.add_trace(trace(x=x, y=np.stack([bond_starts, bond_ends, gap], axis=1).ravel(), mode='lines',
+                        line=dict(color='red', width=6), name='Bond Length',
+                        text=text, hovertemplate="%{text}: %{y:.2f} m<extra></extra>"))
+
+    step = max(1, int(np.ceil(n / max_ticks)))
+    ticks = np.arange(0, n, step)
+    fig.update_layout(
+        title=f"Anchor Profile Comparison ({n} anchors)",
+        yaxis_range=[depth, 0],
+        xaxis=dict(tickvals=ticks, ticktext=[str(labels[i]) for i in ticks], range=[-0.5, n - 0.5]),
+        yaxis_title="Depth (m)",
+        template="plotly_white",
+        height=700,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+# ======== Wall Longitudinal Section =========
+
+def _polygons(polys):
+    """Flatten closed polygons into one x/y pair separated by None (a single filled trace)."""
+    xs, ys = [], []
+    for px, py in polys:
+        xs.extend(list(px) + [px[0], None])
+        ys.extend(list(py) + [py[0], None])
+    return xs, ys
+
+@profiling.timed()
+def plot_wall_section(index, result):
+    anchors = result.anchors
+    fig = go.Figure()
+
+    # 1. Strata between boreholes, one filled trace per soil type
+    ch_min = min(index.chainages[0], anchors.chainage.min())
+    ch_max = max(index.chainages[-1], anchors.chainage.max())
+    edges = np.concatenate(([ch_min], index.chainages, [ch_max]))
+    polys = {"Clay": [], "Sand": []}
+    for k in range(len(edges) - 1):
+        i = min(max(k - 1, 0), len(index) - 1)
+        j = min(k, len(index) - 1)
+        x0, x1 = edges[k], edges[k + 1]
+        if x1 <= x0:
+            continue
+        if i != j and index.compatible(i, j):
+            a, b = index.stratigraphies[i], index.stratigraphies[j]
+            for t, ta, ba, tb, bb in zip(a.soil_types, a.tops, a.bottoms, b.tops, b.bottoms):
+                polys.setdefault(t, []).append(([x0, x1, x1, x0], [ta, tb, bb, ba]))
+        else:
+            mid = (x0 + x1) / 2 if i != j else x1
+            for src, lo, hi in ((index.stratigraphies[i], x0, mid), (index.stratigraphies[j], mid, x1)):
+                if hi <= lo:
+                    continue
+                for t, top, bottom in zip(src.soil_types, src.tops, src.bottoms):
+                    polys.setdefault(t, []).append(([lo, hi, hi, lo], [top, top, bottom, bottom]))
+
+    for soil_type, shapes in polys.items():
+        if not shapes:
+            continue
+        xs, ys = _polygons(shapes)
+        color = "bisque" if soil_type == "Sand" else "darkseagreen"
+        fig.add_trace(go.Scatter(x=xs, y=ys, fill='toself', fillcolor=color, opacity=0.5, mode='lines',
+                                 line=dict(width=0.5, color='gray'), name=soil_type, hoverinfo='skip'))
+
+    # 2. Borehole locations
+    bh_x, bh_y = [], []
+    for ch, strata in zip(index.chainages, index.stratigraphies):
+        bh_x.extend([ch, ch, None])
+        bh_y.extend([0.0, strata.max_depth, None])
+    fig.add_trace(go.Scatter(x=bh_x, y=bh_y, mode='lines', line=dict(color='black', width=2), name='Boreholes', hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=index.chainages, y=np.zeros(len(index)), mode='markers+text', text=index.names,
+                             textposition='top center', marker=dict(symbol='triangle-down', size=10, color='black'),
+                             showlegend=False))
+
+    # 3. Anchors: free length (head to bond start) and bond zone, grouped by status
+    status = result.status
+    Trace = go.Scattergl if len(anchors) > 500 else go.Scatter
+    free_x = np.repeat(anchors.chainage, 3).astype(object)
+    free_y = np.column_stack([anchors.elevation, result.bond_start, np.full(len(anchors), np.nan)]).ravel().astype(object)
+    free_x[2::3] = None
+    free_y[2::3] = None
+    fig.add_trace(Trace(x=free_x, y=free_y, mode='lines', line=dict(color='gray', width=1, dash='dot'), name='Free Length'))
+
+    for label, color in (("PASS", "blue"), ("FAIL", "red"), ("ERROR", "black")):
+        sel = np.flatnonzero(status == label)
+        if not len(sel):
+            continue
+        x = np.repeat(anchors.chainage[sel], 3).astype(object)
+        y = np.column_stack([result.bond_start[sel], result.bond_end[sel], np.full(len(sel), np.nan)]).ravel().astype(object)
+        x[2::3] = None
+        y[2::3] = None
+        fig.add_trace(Trace(x=x, y=y, mode='lines', line=dict(color=color, width=4), name=f'Bond Zone ({label})'))
+
+    max_depth = max(max(s.max_depth for s in index.stratigraphies), np.nanmax(result.bond_end) + 2)
+    fig.update_layout(
+        title="Wall Longitudinal Section",
+        yaxis_range=[max_depth, 0],
+        xaxis_title="Chainage (m)",
+        yaxis_title="Depth (m)",
+        template="plotly_white",
+        height=600,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+# ======== Parametric Study =========
+
+@profiling.timed()
+def plot_parametric_heatmap(x, y, z, x_title, y_title, z_title):
+    fig = go.Figure(go.Heatmap(x=x, y=y, z=z, colorscale='Viridis', colorbar=dict(title=z_title),
+                               hovertemplate=f"{x_title}: %{{x:.2f}}<br>{y_title}: %{{y:.2f}}<br>{z_title}: %{{z:.2f}}<extra></extra>"))
+    fig.update_layout(title=f'{z_title} Heatmap', xaxis_title=x_title, yaxis_title=y_title, template='plotly_white', height=550)
+    return fig
+
+@profiling.timed()
+def plot_parametric_contour(x, y, z, x_title, y_title, z_title):
+    fig = go.Figure(go.Contour(x=x, y=y, z=z, colorscale='Viridis', colorbar=dict(title=z_title),
+                               contours=dict(showlabels=True, labelfont=dict(size=11, color='white'))))
+    fig.update_layout(title=f'{z_title} Design Chart', xaxis_title=x_title, yaxis_title=y_title, template='plotly_white', height=550)
+    return fig
+
+# ======== Reliability Analysis =========
+
+@profiling.timed()
+def plot_reliability_histogram(fos_samples, bins=80):
+    # Bin on the server so the browser never receives the raw samples
+    counts, edges = np.histogram(fos_samples[np.isfinite(fos_samples)], bins=bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    density = counts / max(counts.sum(), 1)
+    colors = np.where(centers < 1.0, 'crimson', 'steelblue')
+
+    fig = go.Figure(go.Bar(x=centers, y=density, width=np.diff(edges), marker_color=colors, name='Realisations'))
+    fig.add_vline(x=1.0, line=dict(color='crimson', dash='dash'), annotation_text='FS = 1')
+    fig.update_layout(title='Distribution of Factor of Safety', xaxis_title='Factor of Safety (FS)',
+                      yaxis_title='Relative Frequency', template='plotly_white', bargap=0, showlegend=False)
+    return fig
+
+# ======== Anchor Optimiser =========
+
+@profiling.timed()
+def plot_pareto_front(total_lengths, costs, pareto_idx, hover_text=None):
+    fig = go.Figure()
+    # WebGL keeps thousands of candidates responsive
+    fig.add_trace(go.Scattergl(x=total_lengths, y=costs, mode='markers', name='Feasible Candidates',
+                               marker=dict(color='lightsteelblue', size=5), text=hover_text))
+    fig.add_trace(go.Scatter(x=total_lengths[pareto_idx], y=costs[pareto_idx], mode='lines+markers', name='Pareto Front',
+                             line=dict(color='red', width=3, shape='hv'), marker=dict(size=9),
+                             text=None if hover_text is None else [hover_text[i] for i in pareto_idx]))
+    fig.update_layout(title='Cost vs. Total Anchor Length', xaxis_title='Total Anchor Length (m)', yaxis_title='Cost',
+                      template='plotly_white', legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    return fig
+
 # ======== Benchmarking Function =========
 
+@profiling.timed()
 def plot_granular_benchmark():
     spt_range = np.linspace(0, 100, 100)
-    bond_vals = [formulas.calculate_sand_bond_strength(x) for x in spt_range]
+    bond_vals = formulas.calculate_sand_bond_strength(spt_range)
     
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=spt_range, y=bond_vals, mode='lines', name='Sand (Linear: 0.005x)', line=dict(color='red', width=3)))
@@ -86,9 +337,10 @@ def plot_granular_benchmark():
                       xaxis_title='SPT (N)', yaxis_title='Bond Strength (MPa)', template='plotly_white')
     return fig
 
+@profiling.timed()
 def plot_clay_benchmark():
     spt_range = np.linspace(0.75, 100, 100)
-    bond_vals = [formulas.calculate_clay_bond_strength(x) for x in spt_range]
+    bond_vals = formulas.calculate_clay_bond_strength(spt_range)
     
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=spt_range, y=bond_vals, mode='lines+markers', name='Clay (Piecewise)', line=dict(color='blue', width=3)))
@@ -96,10 +348,11 @@ def plot_clay_benchmark():
                       xaxis_title='SPT (N)', yaxis_title='Bond Strength (MPa)', template='plotly_white')
     return fig
 
+@profiling.timed()
 def plot_comparison_benchmark(spt_max=100):
     spt_range = np.linspace(1, spt_max, 200)
-    clay_vals = [formulas.calculate_clay_bond_strength(x) for x in spt_range]
-    sand_vals = [formulas.calculate_sand_bond_strength(x) for x in spt_range]
+    clay_vals = formulas.calculate_clay_bond_strength(spt_range)
+    sand_vals = formulas.calculate_sand_bond_strength(spt_range)
     
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=spt_range, y=clay_vals, name='Clay', line=dict(color='blue')))
@@ -111,9 +364,9 @@ def plot_comparison_benchmark(spt_max=100):
 
 def get_benchmark_table():
     spts = [1, 2, 5, 10, 15, 20, 25, 30, 40, 50, 75, 100]
+    clay = formulas.calculate_clay_bond_strength(spts)
+    sand = formulas.calculate_sand_bond_strength(spts)
     data = []
-    for s in spts:
-        c = formulas.calculate_clay_bond_strength(s)
-        g = formulas.calculate_sand_bond_strength(s)
+    for s, c, g in zip(spts, clay.tolist(), sand.tolist()):
         data.append({"SPT": s, "Clay (MPa)": round(c, 4), "Sand (MPa)": round(g, 4), "Diff": round(g-c, 4)})
     return data
\ No newline at end of file
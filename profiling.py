@@ -0,0 +1,179 @@
+"""
+Lightweight stage timing for the app, the engine and the plot builders.
+
+Instrumented code marks stages with `stage(name)` or the `timed()` decorator.
+Stages are only recorded while a run is active in the current thread (see
+`profile_run`, or `begin`/`end`), so one Streamlit session never sees another
+session's timings. Without an active run both hooks reduce to one
+thread-local lookup, and `stage` returns a shared no-op context manager.
+
+Runs are started by the app when ANCHOR_PROFILE is set (or the page is opened
+with ?profile=1). ANCHOR_PROFILE=memory also starts tracemalloc so memory
+deltas count Python allocations instead of process RSS.
+"""
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+ENV_VAR = "ANCHOR_PROFILE"
+ENABLED = os.environ.get(ENV_VAR, "").strip().lower() not in ("", "0", "false", "no", "off")
+TRACE_MEMORY = os.environ.get(ENV_VAR, "").strip().lower() == "memory"
+
+
+class _Local(threading.local):
+    run = None  # class default, so lookups in threads without a run do not raise
+
+
+_local = _Local()
+
+
+def _memory():
+    """Current Python allocations (tracemalloc) or resident set size, in bytes."""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+@dataclass
+class Span:
+    name: str
+    start_ns: int
+    duration_ns: int
+    memory_delta: int
+    depth: int
+
+
+@dataclass
+class Run:
+    label: str
+    wall_time: float
+    start_ns: int
+    duration_ns: int = 0
+    spans: list = field(default_factory=list)
+    _depth: int = 0
+
+    def summary(self):
+        """Per-stage rows (stage, calls, total/mean ms, memory delta) in order of first use."""
+        stages = {}
+        for s in self.spans:
+            row = stages.setdefault(s.name, {"Stage": s.name, "Calls": 0, "Total (ms)": 0.0, "Memory Δ (MB)": 0.0})
+            row["Calls"] += 1
+            row["Total (ms)"] += s.duration_ns / 1e6
+            row["Memory Δ (MB)"] += s.memory_delta / 2 ** 20
+        for row in stages.values():
+            row["Mean (ms)"] = row["Total (ms)"] / row["Calls"]
+        return list(stages.values())
+
+
+class _Stage:
+    __slots__ = ("run", "name", "start", "memory")
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        self.run._depth += 1
+        self.memory = _memory()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.run._depth -= 1
+        self.run.spans.append(Span(self.name, self.start, end - self.start, _memory() - self.memory, self.run._depth))
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+# ========== Hooks ==========
+def active():
+    """The run being recorded in this thread, or None."""
+    return _local.run
+
+
+def stage(name):
+    """Context manager timing one stage of the active run (a no-op without one)."""
+    run = _local.run
+    if run is None:
+        return _NO_STAGE
+    return _Stage(run, name)
+
+
+def timed(name=None):
+    """Decorator timing every call of a function as a stage named `name` (default: its name)."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            run = _local.run
+            if run is None:
+                return fn(*args, **kwargs)
+            with _Stage(run, label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ========== Runs ==========
+def begin(label):
+    """Start recording a run in this thread, replacing one left open by an interrupted script."""
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _local.run = Run(label, time.time(), time.perf_counter_ns())
+    return _local.run
+
+
+def end():
+    """Stop recording and return the finished run (None if none was active)."""
+    run = _local.run
+    if run is not None:
+        run.duration_ns = time.perf_counter_ns() - run.start_ns
+        _local.run = None
+    return run
+
+
+@contextmanager
+def profile_run(label):
+    run = begin(label)
+    try:
+        yield run
+    finally:
+        end()
+
+
+# ========== Export ==========
+def chrome_trace(runs):
+    """Chrome trace event JSON (chrome://tracing, Perfetto) with one track per run."""
+    pid = os.getpid()
+    events = []
+    for tid, run in enumerate(runs, start=1):
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                       "args": {"name": f"{run.label} @ {time.strftime('%H:%M:%S', time.localtime(run.wall_time))}"}})
+        events.append({"name": run.label, "ph": "X", "pid": pid, "tid": tid,
+                       "ts": run.start_ns / 1e3, "dur": run.duration_ns / 1e3})
+        for s in run.spans:
+            events.append({"name": s.name, "ph": "X", "pid": pid, "tid": tid, "ts": s.start_ns / 1e3,
+                           "dur": s.duration_ns / 1e3, "args": {"memory_delta_bytes": s.memory_delta}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
@@ -0,0 +1,150 @@
+"""
+Monte Carlo reliability analysis of a single anchor.
+
+SPT values (per layer), borehole diameter and enlargement coefficient are
+sampled from normal or lognormal distributions given by mean and COV. The
+samples are evaluated in fixed-size vectorized chunks, each with its own
+child seed, so results are reproducible for a given seed whatever the
+number of worker processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+
+import capacity
+
+DISTRIBUTIONS = ("lognormal", "normal")
+
+# Below this many samples a process pool costs more than it saves
+PARALLEL_THRESHOLD = 200_000
+
+
+@dataclass
+class ReliabilityResult:
+    ultimate_capacity: np.ndarray
+    fos: np.ndarray
+    design_load: float
+    deterministic_fos: float
+
+    @property
+    def n_samples(self):
+        return len(self.fos)
+
+    @property
+    def probability_of_failure(self):
+        """P(FS < 1)."""
+        return float(np.mean(self.fos < 1.0))
+
+    @property
+    def reliability_index(self):
+        """Generalized reliability index, beta = -Phi^-1(Pf)."""
+        pf = self.probability_of_failure
+        if pf <= 0.0:
+            return float("inf")
+        if pf >= 1.0:
+            return float("-inf")
+        return -NormalDist().inv_cdf(pf)
+
+    @property
+    def reliability_index_lognormal(self):
+        """
+        Reliability index assuming a lognormal FS, mean(ln FS) / std(ln FS).
+        A deterministic FS (no spread) gives +inf above 1, -inf below 1 and NaN at exactly 1.
+        """
+        positive = self.fos[self.fos > 0]
+        if not len(positive):
+            return float("-inf")
+        ln_fos = np.log(positive)
+        mean, std = float(ln_fos.mean()), float(ln_fos.std())
+        # Identical samples still leave rounding noise in std
+        if std <= 1e-12 * max(abs(mean), 1.0):
+            return float(np.sign(mean) * np.inf) if mean else float("nan")
+        return mean / std
+
+    def percentiles(self, q=(5, 50, 95)):
+        return dict(zip(q, np.percentile(self.fos, q).tolist()))
+
+
+def _sample(rng, mean, cov, dist, size):
+    """Non-negative samples with the given mean and coefficient of variation."""
+    if cov <= 0:
+        return np.full(size, float(mean))
+    if dist == "lognormal":
+        sigma = np.sqrt(np.log1p(cov ** 2))
+        return rng.lognormal(np.log(mean) - 0.5 * sigma ** 2, sigma, size)
+    if dist == "normal":
+        return np.maximum(rng.normal(mean, mean * cov, size), 0.0)
+    raise ValueError(f"Unknown distribution {dist!r}, expected one of {DISTRIBUTIONS}")
+
+
+def _simulate_chunk(seed, size, layers, dia, enlarge):
+    """
+    Ultimate capacity (Tons) of `size` realisations.
+    `layers` = (soil types, SPT means, SPT COVs, SPT distributions, bond length per layer).
+    """
+    rng = np.random.default_rng(seed)
+    soil_types, spt_mean, spt_cov, spt_dist, bond_lengths = layers
+
+    spt = np.empty((size, len(spt_mean)))
+    for i in range(len(spt_mean)):
+        spt[:, i] = _sample(rng, spt_mean[i], spt_cov[i], spt_dist[i], size)
+    qs = capacity.layer_bond_strength(soil_types, spt)
+
+    dia_cm = _sample(rng, *dia, size) * _sample(rng, *enlarge, size) / 10.0
+    return dia_cm * (qs @ (np.pi * bond_lengths * 100.0 / 1000.0))
+
+
+def simulate(anchor, strata, spt_cov, spt_dist="lognormal", dia_cov=0.0, dia_dist="normal",
+             enlarge_cov=0.0, enlarge_dist="normal", n_samples=100_000, seed=0, chunk_size=50_000, workers=None):
+    """
+    Sample the ultimate capacity and SF of `anchor` (an anchor_engine.Anchor with
+    fixed bond length) in `strata`. The stratigraphy SPT values, `anchor.dia_mm`
+    and `anchor.enlarge_coeff` are the means; `spt_cov` / `spt_dist` may be given
+    per layer. Uses a process pool when `n_samples` >= PARALLEL_THRESHOLD unless
+    `workers` is 1.
+    """
+    for label, cov in (("SPT COV", spt_cov), ("Diameter COV", dia_cov), ("Enlargement COV", enlarge_cov)):
+        cov = np.asarray(cov, dtype=float)
+        if not (np.isfinite(cov) & (cov >= 0)).all():
+            raise ValueError(f"{label} must be a finite, non-negative number for every entry.")
+    profile = capacity.CapacityProfile(strata, anchor.dia_mm, anchor.enlarge_coeff)
+    sin_theta = anchor.sin_theta
+    z_s = anchor.bond_start
+    z_e = z_s + anchor.bond_length * sin_theta
+    if z_e > strata.max_depth:
+        raise ValueError(f"Anchor tip ({z_e:.2f}m) exceeds defined soil depth ({strata.max_depth}m).")
+
+    # Only layers crossed by the bond are sampled
+    overlaps = profile.overlaps(z_s, z_e)
+    active = np.flatnonzero(overlaps > 0)
+    n = len(strata)
+    layers = (
+        strata.soil_types[active],
+        strata.spt[active],
+        np.broadcast_to(np.asarray(spt_cov, dtype=float), (n,))[active],
+        np.broadcast_to(np.asarray(spt_dist, dtype=object), (n,))[active],
+        overlaps[active] / sin_theta,
+    )
+    if not np.isfinite(layers[1]).all():
+        raise ValueError("Every soil layer crossed by the bond needs an SPT value.")
+    dia = (anchor.dia_mm, dia_cov, dia_dist)
+    enlarge = (anchor.enlarge_coeff, enlarge_cov, enlarge_dist)
+
+    sizes = [min(chunk_size, n_samples - start) for start in range(0, n_samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    ultimate = np.empty(n_samples)
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+
+    if workers == 1 or n_samples < PARALLEL_THRESHOLD or len(sizes) == 1:
+        for i, (s, size) in enumerate(zip(seeds, sizes)):
+            ultimate[offsets[i]:offsets[i + 1]] = _simulate_chunk(s, size, layers, dia, enlarge)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_simulate_chunk, s, size, layers, dia, enlarge) for s, size in zip(seeds, sizes)]
+            for i, future in enumerate(futures):
+                ultimate[offsets[i]:offsets[i + 1]] = future.result()
+
+    deterministic = float(profile.capacity(z_s, z_e, sin_theta) / anchor.design_load)
+    return ReliabilityResult(ultimate, ultimate / anchor.design_load, anchor.design_load, deterministic)
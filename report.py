@@ -0,0 +1,279 @@
+"""
+Bulk calculation reports for many analysed anchors.
+
+`ExcelReport` writes a workbook with Summary, Inputs, Layers and Notices
+sheets (openpyxl in write-only mode, so rows are streamed to disk).
+`HtmlReport` writes one self-contained HTML page: plotly.js and the styles
+are embedded once in the header, each anchor gets its inputs, verification
+metrics, SNI notices and layer table, and a profile figure is rendered only
+the first time its borehole and geometry appear; later anchors link to it.
+Both take anchors one at a time through `add`; beyond the open files only
+the HTML summary rows and figure keys are kept, so a report of thousands of
+anchors stays small in memory.
+
+Usage:
+    python -m report design anchors.csv boreholes.csv --excel report.xlsx --html report.html
+"""
+import argparse
+import html
+import importlib.util
+import os
+import sys
+import time
+
+import pandas as pd
+
+import anchor_engine
+import batch
+import plots
+import result_cache
+
+INPUT_COLUMNS = ["anchor_id", "borehole", *batch.ANCHOR_FIELDS]
+LAYER_COLUMNS = ["anchor_id", "borehole", "Range", "Soil Thickness (m)", "Bond Length (m)", "Type",
+                 "Ultimate Bond Stress (kg/cm²)", "Working Bond Stress (kg/cm²)", "Working Capacity (Tons)"]
+NOTICE_COLUMNS = ["anchor_id", "borehole", "kind", "code", "title", "message"]
+
+
+def notice_rows(anchor_id, borehole, result):
+    """Warnings, SNI violations and the error of one result as rows."""
+    notices = [("warning", n) for n in result.warnings] + [("violation", n) for n in result.violations]
+    if result.error:
+        notices.append(("error", result.error))
+    return [{"anchor_id": anchor_id, "borehole": borehole, "kind": kind, "code": n.code, "title": n.title,
+             "message": n.message} for kind, n in notices]
+
+
+# ========== Excel ==========
+def excel_supported():
+    return importlib.util.find_spec("openpyxl") is not None
+
+
+class ExcelReport:
+    """Streaming multi-sheet workbook (requires openpyxl)."""
+
+    def __init__(self, target):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        self.target = target
+        self._workbook = Workbook(write_only=True)
+        self._sheets = {}
+        bold = Font(bold=True)
+        for title, columns in [("Summary", batch.SUMMARY_COLUMNS), ("Inputs", INPUT_COLUMNS),
+                               ("Layers", LAYER_COLUMNS), ("Notices", NOTICE_COLUMNS)]:
+            sheet = self._workbook.create_sheet(title)
+            sheet.freeze_panes = "A2"
+            header = []
+            for name in columns:
+                cell = WriteOnlyCell(sheet, value=name)
+                cell.font = bold
+                header.append(cell)
+            sheet.append(header)
+            self._sheets[title] = (sheet, columns)
+
+    def _append(self, title, row):
+        sheet, columns = self._sheets[title]
+        sheet.append([row.get(c) for c in columns])
+
+    def add(self, anchor_id, borehole, anchor, result, mode):
+        """Append one anchor; `result` is None when its borehole is unknown."""
+        self._append("Inputs", {"anchor_id": anchor_id, "borehole": borehole,
+                                **{k: getattr(anchor, k) for k in batch.ANCHOR_FIELDS}})
+        if result is None:
+            self._append("Summary", batch.unknown_borehole_row(anchor_id, borehole, mode))
+            return
+        self._append("Summary", batch.summary_row(anchor_id, borehole, result))
+        for row in result.layer_rows():
+            self._append("Layers", {"anchor_id": anchor_id, "borehole": borehole, **row})
+        for row in notice_rows(anchor_id, borehole, result):
+            self._append("Notices", row)
+
+    def close(self):
+        self._workbook.save(self.target)
+
+
+# ========== HTML ==========
+STYLE = """
+body { font-family: -apple-system, "Segoe UI", Roboto, sans-serif; margin: 2rem; color: #222; }
+h1 { margin-bottom: 0.2rem; }
+section { border-top: 1px solid #ddd; padding: 1rem 0; break-inside: avoid; }
+table { border-collapse: collapse; font-size: 0.85rem; margin: 0.5rem 0; }
+th, td { border: 1px solid #ccc; padding: 0.2rem 0.5rem; text-align: right; }
+th { background: #f3f3f3; }
+td:first-child, th:first-child { text-align: left; }
+.status { font-weight: bold; padding: 0.1rem 0.5rem; border-radius: 0.3rem; color: white; }
+.PASS { background: #2e7d32; } .FAIL { background: #c62828; } .ERROR { background: #6d4c41; }
+.notice-warning { color: #a15c00; } .notice-violation, .notice-error { color: #c62828; }
+.columns { display: flex; gap: 2rem; flex-wrap: wrap; align-items: flex-start; }
+"""
+
+HTML_SUMMARY_COLUMNS = ("anchor_id", "borehole", "status", "bond_length", "fos", "working_capacity", "design_load")
+METRICS = [("Design Load (Tons)", "design_load"), ("Bond Length (m)", "bond_length"), ("Factor of Safety", "fos"),
+           ("Working Capacity (Tons)", "working_capacity"), ("Ultimate Capacity (Tons)", "ultimate_capacity"),
+           ("Top of Bond (m)", "bond_start"), ("Bottom of Bond (m)", "bond_end")]
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return html.escape(str(value))
+
+
+def _table(rows, columns):
+    head = "".join(f"<th>{html.escape(c)}</th>" for c in columns)
+    body = "".join("<tr>" + "".join(f"<td>{_cell(row.get(c, ''))}</td>" for c in columns) + "</tr>" for row in rows)
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+class HtmlReport:
+    """Self-contained HTML report written to a path or text stream as anchors are added."""
+
+    def __init__(self, target, boreholes, title="Ground Anchor Calculation Report", mode=None):
+        from plotly.offline import get_plotlyjs
+
+        self.target = target
+        self._file = open(target, "w", encoding="utf-8") if isinstance(target, (str, os.PathLike)) else target
+        self.boreholes = boreholes
+        self.figures = {}
+        self._summary = []
+        self._file.write(
+            f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+            f"<style>{STYLE}</style><script type='text/javascript'>{get_plotlyjs()}</script></head><body>"
+            f"<h1>{html.escape(title)}</h1><p>{f'Mode: {html.escape(mode)} · ' if mode else ''}"
+            f"Generated {time.strftime('%Y-%m-%d %H:%M')} · <a href='#summary'>Summary table</a></p>"
+        )
+
+    def _figure(self, borehole, result):
+        """Id of the figure div for this borehole and geometry, and its HTML if it is new."""
+        anchor = result.anchor
+        key = (borehole, anchor.free_length, result.bond_length, anchor.elevation, anchor.angle_deg)
+        if key in self.figures:
+            return self.figures[key], ""
+        div_id = f"figure-{len(self.figures) + 1}"
+        self.figures[key] = div_id
+        soil = pd.DataFrame(self.boreholes[borehole].to_records())
+        fig = plots.plot_anchor_plotly(soil, anchor.free_length, result.bond_length, anchor.elevation, anchor.angle_deg)
+        return div_id, fig.to_html(full_html=False, include_plotlyjs=False, div_id=div_id,
+                                   default_width="520px", default_height="520px")
+
+    def add(self, anchor_id, borehole, anchor, result, mode):
+        """Write one anchor section; `result` is None when its borehole is unknown."""
+        section_id = f"anchor-{len(self._summary) + 1}"
+        row = (batch.unknown_borehole_row(anchor_id, borehole, mode) if result is None
+               else batch.summary_row(anchor_id, borehole, result))
+        self._summary.append((section_id, {c: row[c] for c in HTML_SUMMARY_COLUMNS}))
+        status = row["status"]
+        parts = [f"<section id='{section_id}'><h2>Anchor {html.escape(anchor_id)} "
+                 f"<span class='status {status}'>{status}</span></h2>"
+                 f"<p>Borehole {html.escape(borehole)}</p><div class='columns'><div>"
+                 "<h3>Inputs</h3>" + _table([{"Input": k, "Value": getattr(anchor, k)} for k in batch.ANCHOR_FIELDS],
+                                             ["Input", "Value"])]
+        if result is None:
+            parts.append(f"<p class='notice-error'>{html.escape(row['error'])}</p></div></div></section>")
+            self._file.write("".join(parts))
+            return
+
+        if result.ok:
+            parts.append("<h3>Verification</h3>" + _table(
+                [{"Metric": label, "Value": row[key]} for label, key in METRICS], ["Metric", "Value"]))
+        notices = notice_rows(anchor_id, borehole, result)
+        if notices:
+            parts.append("<h3>Notices</h3><ul>" + "".join(
+                f"<li class='notice-{n['kind']}'><b>{html.escape(n['title'])}</b>: {html.escape(n['message'])}</li>"
+                for n in notices) + "</ul>")
+        parts.append("</div>")
+        if result.ok:
+            div_id, figure = self._figure(borehole, result)
+            parts.append(f"<div>{figure}</div>" if figure else
+                         f"<div><p>Profile figure: <a href='#{div_id}'>same borehole and geometry as above</a></p></div>")
+        parts.append("</div>")
+        layer_rows = result.layer_rows()
+        if layer_rows:
+            parts.append("<h3>Layers</h3>" + _table(layer_rows, LAYER_COLUMNS[2:]))
+        parts.append("</section>")
+        self._file.write("".join(parts))
+
+    def close(self):
+        rows = [{**row, "anchor_id": f"<a href='#{section_id}'>{html.escape(row['anchor_id'])}</a>"}
+                for section_id, row in self._summary]
+        head = "".join(f"<th>{html.escape(c)}</th>" for c in HTML_SUMMARY_COLUMNS)
+        body = "".join("<tr>" + "".join(f"<td>{row[c] if c == 'anchor_id' else _cell(row[c])}</td>"
+                                        for c in HTML_SUMMARY_COLUMNS)
+                       + "</tr>" for row in rows)
+        self._file.write(f"<section id='summary'><h2>Summary</h2><table><thead><tr>{head}</tr></thead>"
+                         f"<tbody>{body}</tbody></table></section></body></html>")
+        if self._file is not self.target:
+            self._file.close()
+
+
+# ========== Generation ==========
+def open_reports(mode, boreholes, excel=None, html_target=None, title="Ground Anchor Calculation Report"):
+    """
+    The ExcelReport and/or HtmlReport writing to `excel` and `html_target`
+    (paths or streams). Feed each one every analysed anchor with `add`, then `close` it.
+    """
+    reports = []
+    if excel is not None:
+        reports.append(ExcelReport(excel))
+    if html_target is not None:
+        reports.append(HtmlReport(html_target, boreholes, title=title, mode=mode))
+    return reports
+
+
+def write_report(mode, anchors, boreholes, excel=None, html_target=None, step=anchor_engine.LENGTH_STEP,
+                 cache=None, chunk_size=256, title="Ground Anchor Calculation Report", progress=None):
+    """
+    Analyse (anchor_id, borehole, Anchor) items chunk by chunk and stream them
+    into an Excel workbook and/or an HTML report (paths or streams).
+    `progress(done, total)` is called after every anchor.
+    """
+    reports = open_reports(mode, boreholes, excel=excel, html_target=html_target, title=title)
+    results = batch.iter_results(mode, anchors, boreholes, step=step, cache=cache, chunk_size=chunk_size)
+    for done, ((anchor_id, borehole, result), (_, _, anchor)) in enumerate(zip(results, anchors), start=1):
+        for report in reports:
+            report.add(anchor_id, borehole, anchor, result, mode)
+        if progress:
+            progress(done, len(anchors))
+    for report in reports:
+        report.close()
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m report", description="Write Excel and HTML calculation reports.")
+    parser.add_argument("mode", choices=anchor_engine.MODES)
+    parser.add_argument("anchors", help="anchors CSV")
+    parser.add_argument("boreholes", help="boreholes CSV")
+    parser.add_argument("--excel", help="workbook to write (.xlsx)")
+    parser.add_argument("--html", help="HTML report to write")
+    parser.add_argument("--title", default="Ground Anchor Calculation Report")
+    parser.add_argument("--exact", action="store_true", help="exact design lengths instead of rounding up to 0.1 m")
+    parser.add_argument("--cache", nargs="?", const=result_cache.DEFAULT_PATH, default=None,
+                        help=f"use the persistent result cache (default file {result_cache.DEFAULT_PATH})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    if not (args.excel or args.html):
+        sys.exit("error: give --excel and/or --html")
+    boreholes = batch.read_boreholes(args.boreholes)
+    anchors = batch.read_anchors(args.anchors)
+    cache = result_cache.ResultCache(args.cache) if args.cache else None
+
+    def progress(done, total):
+        if done % 100 == 0 or done == total:
+            print(f"\r{done}/{total} anchors", end="", file=sys.stderr)
+
+    start = time.perf_counter()
+    write_report(args.mode, anchors, boreholes, excel=args.excel, html_target=args.html,
+                 step=None if args.exact else anchor_engine.LENGTH_STEP, cache=cache, title=args.title,
+                 progress=progress)
+    print(f"\n{len(anchors)} anchors in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Persistent, content-addressed cache of anchor analyses.
+
+Results are stored in a local SQLite file under the SHA-256 of a canonical
+JSON form of every input (mode, anchor geometry and loads, normalised soil
+rows, length rounding step and correlation version). The least recently
+used entries are evicted once the entry or size limit is exceeded. Hit and
+miss counters are kept in the same file so they are shared by every
+session and worker process using it.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+
+import anchor_engine
+import formulas
+import profiling
+
+DEFAULT_PATH = os.environ.get("ANCHOR_RESULT_CACHE", ".anchor_results.sqlite3")
+DEFAULT_MAX_ENTRIES = 50_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _num(value):
+    # 8, 8.0 and numpy floats hash alike; rounding absorbs float noise from editors
+    return round(float(value), 9)
+
+
+def cache_key(mode, anchor, strata, step=anchor_engine.LENGTH_STEP):
+    """SHA-256 of the canonical inputs of one analysis."""
+    payload = {
+        "version": formulas.CORRELATION_VERSION,
+        "mode": mode,
+        "step": None if step is None else _num(step),
+        "anchor": {k: _num(v) for k, v in sorted(asdict(anchor).items())},
+        "soil": [[_num(b), str(t).strip(), _num(s)]
+                 for b, t, s in zip(strata.bottoms.tolist(), strata.soil_types.tolist(), strata.spt.tolist())],
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed LRU cache of AnchorResult objects. Safe to share between threads."""
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                           "size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_lru ON results (last_access)")
+        # Counters, including the entry count and total size so eviction never scans the table
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO stats VALUES "
+                           "('hits', 0), ('misses', 0), ('evictions', 0), ('entries', 0), ('bytes', 0)")
+
+    def _bump(self, name, amount):
+        self._conn.execute("UPDATE stats SET value = value + ? WHERE name = ?", (amount, name))
+
+    def get(self, key):
+        """Cached AnchorResult for `key`, or None. Counts a hit or a miss."""
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        """Cached results for `keys` (None where missing) in one transaction."""
+        found = {}
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT key, value FROM results WHERE key IN ({placeholders})", batch).fetchall())
+            now = time.time()
+            self._conn.executemany("UPDATE results SET last_access = ? WHERE key = ?", [(now, k) for k in found])
+            hits = sum(k in found for k in keys)
+            self._bump("hits", hits)
+            self._bump("misses", len(keys) - hits)
+            self._conn.execute("COMMIT")
+        return [anchor_engine.AnchorResult.from_dict(json.loads(found[k])) if k in found else None for k in keys]
+
+    def put(self, key, result):
+        self.put_many([(key, result)])
+
+    def put_many(self, items):
+        """Store (key, AnchorResult) pairs in one transaction, then evict."""
+        rows = [(key, json.dumps(result.to_dict(), separators=(",", ":"))) for key, result in items]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            for key, value in rows:
+                old = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, value, len(value), now))
+                self._bump("entries", 0 if old else 1)
+                self._bump("bytes", len(value) - (old[0] if old else 0))
+            self._evict()
+            self._conn.execute("COMMIT")
+
+    def _evict(self):
+        """Drop least recently used entries until both limits hold (caller holds the transaction)."""
+        counters = dict(self._conn.execute("SELECT name, value FROM stats WHERE name IN ('entries', 'bytes')").fetchall())
+        entries, size = counters["entries"], counters["bytes"]
+        evicted = freed = 0
+        cursor = self._conn.execute("SELECT key, size FROM results ORDER BY last_access")
+        victims = []
+        while entries - evicted > self.max_entries or (self.max_bytes and size - freed > self.max_bytes):
+            row = cursor.fetchone()
+            if row is None:
+                break
+            victims.append((row[0],))
+            evicted += 1
+            freed += row[1]
+        cursor.close()
+        if victims:
+            self._conn.executemany("DELETE FROM results WHERE key = ?", victims)
+            self._bump("entries", -evicted)
+            self._bump("bytes", -freed)
+            self._bump("evictions", evicted)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+        lookups = counters["hits"] + counters["misses"]
+        return {**counters, "hit_rate": counters["hits"] / lookups if lookups else 0.0}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM results")
+            self._conn.execute("UPDATE stats SET value = 0")
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        self._conn.close()
+
+
+def analyse(cache, mode, anchor, strata, profile=None, step=anchor_engine.LENGTH_STEP):
+    """anchor_engine.analyse through `cache` (None disables caching)."""
+    if cache is None:
+        return anchor_engine.analyse(mode, anchor, strata, profile=profile, step=step)
+    with profiling.stage("cache_lookup"):
+        key = cache_key(mode, anchor, strata, step)
+        result = cache.get(key)
+    if result is None:
+        result = anchor_engine.analyse(mode, anchor, strata, profile=profile, step=step)
+        with profiling.stage("cache_store"):
+            cache.put(key, result)
+    return result
+
+
+def analyse_many(cache, mode, items, step=anchor_engine.LENGTH_STEP):
+    """
+    Results for (anchor, strata, profile) items, looking all of them up in one
+    cache transaction and storing the misses in another.
+    """
+    if cache is None:
+        return [anchor_engine.analyse(mode, a, s, profile=p, step=step) for a, s, p in items]
+    keys = [cache_key(mode, a, s, step) for a, s, _ in items]
+    results = cache.get_many(keys)
+    missing = [i for i, r in enumerate(results) if r is None]
+    for i in missing:
+        anchor, strata, profile = items[i]
+        results[i] = anchor_engine.analyse(mode, anchor, strata, profile=profile, step=step)
+    if missing:
+        cache.put_many([(keys[i], results[i]) for i in missing])
+    return results
+
+
+def analyse_stack(cache, mode, anchors, stratigraphies, step=anchor_engine.LENGTH_STEP):
+    """
+    Like analyse_many, for anchors with their own stratigraphies, with the
+    cache misses evaluated together by anchor_engine.analyse_many.
+    """
+    if cache is None:
+        return anchor_engine.analyse_many(mode, anchors, stratigraphies, step=step)
+    keys = [cache_key(mode, a, s, step) for a, s in zip(anchors, stratigraphies)]
+    results = cache.get_many(keys)
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        fresh = anchor_engine.analyse_many(mode, [anchors[i] for i in missing], [stratigraphies[i] for i in missing], step=step)
+        for i, result in zip(missing, fresh):
+            results[i] = result
+        cache.put_many([(keys[i], results[i]) for i in missing])
+    return results
@@ -0,0 +1,400 @@
+"""
+Local HTTP API for the anchor calculations.
+
+POST /check, /design or /safety with a JSON case in the format of
+`python -m anchor_engine --input` ({"anchor": {...}, "soil": [layer rows],
+optionally "exact": true}) returns the AnchorResult as JSON. GET /metrics
+reports request counts, batch sizes and p50/p99 latency, GET /health "ok".
+
+Requests arriving together are queued and evaluated in micro-batches of up
+to `max_batch`, waiting at most `max_wait` seconds for a batch to fill. A
+batch runs in one worker thread, evaluating its cache misses together in
+one vectorized pass over a capacity.ProfileStack and using one result cache
+transaction. Invalid cases get 400 before they are queued. At most
+`max_concurrency` requests are in flight; further ones get 503. Only the
+standard library is used, so the service runs offline:
+
+    python -m service --port 8765 --max-batch 64 --max-wait 5 --cache
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import anchor_engine
+import capacity
+import result_cache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT = 0.005
+DEFAULT_MAX_CONCURRENCY = 256
+LATENCY_WINDOW = 10_000
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+# ========== Evaluation ==========
+def parse_case(payload, mode):
+    """
+    (Anchor, Stratigraphy, step) of a JSON case for `mode`; ValueError if it is
+    incomplete or any value is out of range.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object with 'anchor' and 'soil'")
+    try:
+        anchor = anchor_engine.Anchor(**{k: float(v) for k, v in payload["anchor"].items()})
+        strata = capacity.Stratigraphy.from_records(payload["soil"])
+    except KeyError as exc:
+        raise ValueError(f"Missing {exc}") from None
+    except (TypeError, AttributeError) as exc:
+        raise ValueError(f"Invalid case ({exc})") from None
+    if not len(strata):
+        raise ValueError("'soil' has no layers")
+    if not all(isinstance(t, str) for t in strata.soil_types):
+        raise ValueError("'Soil Type' must be a string")
+    if not (np.isfinite(strata.bottoms).all() and (strata.bottoms > 0).all()):
+        raise ValueError("'Elevation (m)' must be a positive number in every layer")
+    if not (np.isfinite(strata.spt).all() and (strata.spt >= 0).all()):
+        raise ValueError("'SPT' must be a non-negative number in every layer")
+    invalid = anchor_engine.input_error(mode, anchor)
+    if invalid:
+        raise ValueError(invalid.message)
+    exact = payload.get("exact", False)
+    if not isinstance(exact, bool):
+        raise ValueError("'exact' must be true or false")
+    step = None if exact else anchor_engine.LENGTH_STEP
+    return anchor, strata, step
+
+
+def evaluate_batch(items, cache=None):
+    """
+    Results for (mode, anchor, strata, step) items, where an item whose
+    evaluation raised gets the exception instead. Each (mode, step) group is
+    looked up in one cache transaction and its misses are evaluated together
+    on a capacity.ProfileStack; if that raises, the group is retried one
+    item at a time so a failure only reaches its own request.
+    """
+    groups = {}
+    for i, (mode, anchor, strata, step) in enumerate(items):
+        groups.setdefault((mode, step), []).append(i)
+
+    results = [None] * len(items)
+    for (mode, step), indices in groups.items():
+        anchors = [items[i][1] for i in indices]
+        strats = [items[i][2] for i in indices]
+        try:
+            analysed = result_cache.analyse_stack(cache, mode, anchors, strats, step=step)
+        except Exception:
+            analysed = [_analyse_one(cache, mode, a, s, step) for a, s in zip(anchors, strats)]
+        for i, result in zip(indices, analysed):
+            results[i] = result
+    return results
+
+
+def _analyse_one(cache, mode, anchor, strata, step):
+    """Result of one anchor, or the exception it raised."""
+    try:
+        return result_cache.analyse(cache, mode, anchor, strata, step=step)
+    except Exception as exc:
+        return exc
+
+
+# ========== Micro-batching ==========
+class MicroBatcher:
+    """
+    Collects submitted items into batches for `evaluate(items) -> results`, run
+    in a worker thread. An exception returned in place of a result fails only
+    that item's `submit`; one raised by `evaluate` fails the whole batch.
+    """
+
+    def __init__(self, evaluate, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT, on_batch=None):
+        self.evaluate = evaluate
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.on_batch = on_batch
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="anchor-batch")
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if self.on_batch:
+                self.on_batch(len(batch))
+            try:
+                results = await loop.run_in_executor(self._executor, self.evaluate, [item for item, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                if future.done():  # the client may have gone away
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+# ========== Metrics ==========
+class Metrics:
+    """Request counters plus latency and batch size windows of the last LATENCY_WINDOW requests."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.rejected = 0
+        self.latencies = {}
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, endpoint, seconds, ok=True):
+        self.requests[endpoint] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+        self.latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def snapshot(self):
+        def percentiles(values):
+            if not values:
+                return {"count": 0}
+            p50, p99 = np.percentile(np.fromiter(values, float, len(values)), [50, 99]) * 1000.0
+            return {"count": len(values), "p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3)}
+
+        all_latencies = [s for window in self.latencies.values() for s in window]
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "rejected": self.rejected,
+            "latency": {"all": percentiles(all_latencies),
+                        **{name: percentiles(window) for name, window in self.latencies.items()}},
+            "batches": {"count": len(self.batch_sizes),
+                        "mean_size": round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else 0.0,
+                        "max_size": max(self.batch_sizes, default=0)},
+        }
+
+
+# ========== HTTP Server ==========
+def encode(payload):
+    """Strict JSON bytes: NaN and Infinity are not JSON, so they raise ValueError."""
+    return json.dumps(payload, allow_nan=False).encode()
+
+
+class Service:
+    def __init__(self, cache=None, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.metrics = Metrics()
+        self.batcher = MicroBatcher(self._evaluate, max_batch, max_wait, on_batch=self.metrics.batch_sizes.append)
+        self.in_flight = 0
+        self.server = None
+
+    def _evaluate(self, items):
+        return evaluate_batch(items, self.cache)
+
+    async def analyse(self, mode, payload):
+        """Evaluate one JSON case through the micro-batcher, returning the AnchorResult."""
+        anchor, strata, step = parse_case(payload, mode)
+        return await self.batcher.submit((mode, anchor, strata, step))
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._connection, host, port)
+        return self.server
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def _route(self, method, path, body):
+        """(status, payload) of one request."""
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, {**self.metrics.snapshot(), "in_flight": self.in_flight}
+        mode = path.lstrip("/")
+        if mode not in anchor_engine.MODES:
+            return 404, {"error": f"Unknown endpoint {path!r}"}
+        if method != "POST":
+            return 405, {"error": f"Use POST for {path}"}
+
+        if self.in_flight >= self.max_concurrency:
+            self.metrics.rejected += 1
+            return 503, {"error": "Too many requests in flight"}
+        self.in_flight += 1
+        start = time.perf_counter()
+        status = 500
+        try:
+            try:
+                result = await self.analyse(mode, json.loads(body or b"null"))
+            except ValueError as exc:  # includes JSONDecodeError
+                status = 400
+                return status, {"error": str(exc)}
+            except Exception as exc:
+                return status, {"error": f"Internal error: {type(exc).__name__}: {exc}"}
+            try:
+                payload = encode(result.to_dict())
+            except ValueError as exc:  # a non-finite number in the result
+                return status, {"error": f"Internal error: {exc}"}
+            status = 200
+            return status, payload
+        finally:
+            self.in_flight -= 1
+            self.metrics.record(mode, time.perf_counter() - start, status == 200)
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                keep_alive = True
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                    headers = {}
+                    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                except ValueError:
+                    status, payload, keep_alive = 400, {"error": "Malformed HTTP request"}, False
+                else:
+                    if length > MAX_BODY_BYTES:
+                        status, payload, keep_alive = 413, {"error": f"Body larger than {MAX_BODY_BYTES} bytes"}, False
+                    else:
+                        try:
+                            status, payload = await self._route(method.upper(), path, await reader.readexactly(length))
+                        except asyncio.IncompleteReadError:
+                            raise
+                        except Exception as exc:
+                            status, payload = 500, {"error": f"Internal error: {type(exc).__name__}: {exc}"}
+
+                body = payload if isinstance(payload, bytes) else encode(payload)
+                writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                              f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+# ========== Client ==========
+class Client:
+    """Blocking client for a running service, keeping one connection open."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=60):
+        self._conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, payload=None):
+        """(status, decoded JSON) of one request."""
+        body = None if payload is None else json.dumps(payload)
+        self._conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        response = self._conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def analyse(self, mode, case):
+        """AnchorResult for a JSON case; RuntimeError if the service refuses it."""
+        status, data = self.request("POST", f"/{mode}", case)
+        if status != 200:
+            raise RuntimeError(f"{status}: {data.get('error')}")
+        return anchor_engine.AnchorResult.from_dict(data)
+
+    def metrics(self):
+        return self.request("GET", "/metrics")[1]
+
+    def close(self):
+        self._conn.close()
+
+
+# ========== Command Line ==========
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m service", description="Serve the anchor calculations over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="largest micro-batch")
+    parser.add_argument("--max-wait", type=float, default=DEFAULT_MAX_WAIT * 1000,
+                        help="ms to wait for a batch to fill (default %(default)g)")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="requests in flight before answering 503")
+    parser.add_argument("--cache", nargs="?", const=result_cache.DEFAULT_PATH, default=None,
+                        help=f"use the persistent result cache (default file {result_cache.DEFAULT_PATH})")
+    return parser.parse_args(argv)
+
+
+async def _serve(args):
+    cache = result_cache.ResultCache(args.cache) if args.cache else None
+    service = Service(cache, args.max_batch, args.max_wait / 1000.0, args.max_concurrency)
+    server = await service.start(args.host, args.port)
+    print(f"serving on http://{args.host}:{server.sockets[0].getsockname()[1]}", file=sys.stderr)
+    try:
+        await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    try:
+        asyncio.run(_serve(_parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
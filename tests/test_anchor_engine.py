@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import anchor_engine
+import capacity
+
+SAND = capacity.Stratigraphy([20.0], ["Sand"], [30.0])
+
+
+def anchor(**overrides):
+    params = dict(free_length=5.0, angle_deg=30.0, dia_mm=150.0, design_load=30.0, bond_length=10.0, fos=2.0)
+    params.update(overrides)
+    return anchor_engine.Anchor(**params)
+
+
+@pytest.mark.parametrize("mode", anchor_engine.MODES)
+def test_valid_anchor_passes_every_mode(mode):
+    result = anchor_engine.analyse(mode, anchor(), SAND)
+    assert result.ok
+    assert np.isfinite([result.fos, result.bond_length, result.working_capacity]).all()
+
+
+@pytest.mark.parametrize("mode,field,value", [
+    (anchor_engine.MODE_CHECK, "fos", 0.0),
+    (anchor_engine.MODE_DESIGN, "fos", -1.0),
+    (anchor_engine.MODE_CHECK, "angle_deg", 0.0),
+    (anchor_engine.MODE_DESIGN, "angle_deg", 120.0),
+    (anchor_engine.MODE_SAFETY, "dia_mm", 0.0),
+    (anchor_engine.MODE_CHECK, "design_load", 0.0),
+    (anchor_engine.MODE_SAFETY, "design_load", float("nan")),
+    (anchor_engine.MODE_CHECK, "bond_length", 0.0),
+])
+def test_invalid_inputs_return_error_notice(mode, field, value):
+    result = anchor_engine.analyse(mode, anchor(**{field: value}), SAND)
+    assert result.status == "ERROR"
+    assert result.error.code == "invalid_input"
+    assert result.layers == []
+
+
+def test_unused_inputs_are_not_validated():
+    # Safety mode computes the SF and design mode the bond length
+    assert anchor_engine.analyse(anchor_engine.MODE_SAFETY, anchor(fos=0.0), SAND).ok
+    assert anchor_engine.analyse(anchor_engine.MODE_DESIGN, anchor(bond_length=0.0), SAND).ok
+
+
+def test_safety_mode_without_bond_capacity_is_an_error():
+    strata = capacity.Stratigraphy([20.0], ["Sand"], [0.0])
+    result = anchor_engine.analyse(anchor_engine.MODE_SAFETY, anchor(), strata)
+    assert result.status == "ERROR"
+    assert result.error.code == "no_capacity"
+
+
+def test_cli_reports_invalid_input(tmp_path, capsys):
+    soil = tmp_path / "soil.csv"
+    soil.write_text("Elevation (m),Soil Type,SPT\n20,Sand,30\n")
+    code = anchor_engine.main(["check", "--soil", str(soil), "--free-length", "5", "--bond-length", "10",
+                               "--angle", "30", "--diameter", "150", "--load", "30", "--fos", "0"])
+    assert code == 1
+    assert '"invalid_input"' in capsys.readouterr().out
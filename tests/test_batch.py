@@ -0,0 +1,69 @@
+import pytest
+
+import anchor_engine
+import batch
+import capacity
+
+BOREHOLES = {"BH1": capacity.Stratigraphy([8.0, 30.0], ["Clay", "Sand"], [12.0, 35.0])}
+
+
+def anchor(**overrides):
+    params = dict(free_length=5.0, angle_deg=30.0, dia_mm=150.0, design_load=20.0, bond_length=10.0, fos=2.0)
+    params.update(overrides)
+    return anchor_engine.Anchor(**params)
+
+
+def test_invalid_anchor_only_fails_its_own_row():
+    anchors = [("A1", "BH1", anchor()), ("A2", "BH1", anchor(fos=0.0)), ("A3", "BH1", anchor()), ("A4", "BH9", anchor())]
+    summaries, layers = batch.evaluate_anchors(anchor_engine.MODE_CHECK, anchors, BOREHOLES)
+    assert [row["status"] for row in summaries] == ["PASS", "ERROR", "PASS", "ERROR"]
+    assert "Factor of safety" in summaries[1]["error"]
+    assert "Unknown borehole" in summaries[3]["error"]
+    assert {row["anchor_id"] for row in layers} == {"A1", "A3"}
+
+
+def test_exception_in_one_anchor_is_reported_in_its_row(monkeypatch):
+    analyse = anchor_engine.analyse
+
+    def flaky(mode, a, strata, profile=None, step=anchor_engine.LENGTH_STEP):
+        if a.design_load == 99.0:
+            raise RuntimeError("boom")
+        return analyse(mode, a, strata, profile=profile, step=step)
+
+    monkeypatch.setattr(anchor_engine, "analyse", flaky)
+    anchors = [("A1", "BH1", anchor()), ("A2", "BH1", anchor(design_load=99.0)), ("A3", "BH1", anchor())]
+    summaries, _ = batch.evaluate_anchors(anchor_engine.MODE_CHECK, anchors, BOREHOLES)
+    assert [row["status"] for row in summaries] == ["PASS", "ERROR", "PASS"]
+    assert summaries[1]["error"] == "Error: RuntimeError: boom"
+
+
+def test_run_batch_pool_survives_invalid_rows():
+    anchors = [(str(i), "BH1", anchor(fos=0.0 if i % 5 == 0 else 2.0)) for i in range(20)]
+    rows = [row for summaries, _ in batch.run_batch(anchor_engine.MODE_DESIGN, anchors, BOREHOLES, workers=2, chunk_size=4)
+            for row in summaries]
+    assert len(rows) == 20
+    assert sum(row["status"] == "ERROR" for row in rows) == 4
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_iter_batch_results_give_the_run_batch_rows(workers):
+    anchors = [(str(i), "BH9" if i == 7 else "BH1", anchor(bond_length=4.0 + i)) for i in range(12)]
+    rows = []
+    for chunk, results in batch.iter_batch(anchor_engine.MODE_CHECK, anchors, BOREHOLES, workers=workers, chunk_size=5):
+        assert [r is None for r in results] == [borehole == "BH9" for _, borehole, _ in chunk]
+        rows.extend(batch.result_rows(anchor_engine.MODE_CHECK, chunk, results)[0])
+    expected = [row for summaries, _ in batch.run_batch(anchor_engine.MODE_CHECK, anchors, BOREHOLES, workers=1)
+                for row in summaries]
+    assert sorted(rows, key=lambda r: int(r["anchor_id"])) == expected
+
+
+def test_unknown_borehole_rows_keep_numeric_columns(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    anchors = [("A1", "BH1", anchor()), ("A2", "BH9", anchor())]
+    summaries, _ = batch.evaluate_anchors(anchor_engine.MODE_CHECK, anchors, BOREHOLES)
+    df = pd.DataFrame(summaries, columns=batch.SUMMARY_COLUMNS)
+    assert df["bond_length"].dtype == float and df["error"].tolist()[0] == ""
+    df.to_parquet(tmp_path / "summary.parquet", index=False)
+    batch.write_csv(summaries, tmp_path / "summary.csv", batch.SUMMARY_COLUMNS)
+    assert (tmp_path / "summary.csv").read_text().splitlines()[2].startswith("A2,BH9,check,ERROR,,,")
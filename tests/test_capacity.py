@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+import capacity
+import formulas
+
+
+def random_strata(rng, n_layers):
+    bottoms = np.round(np.cumsum(rng.uniform(0.5, 6.0, n_layers)), 2)
+    return capacity.Stratigraphy(bottoms, rng.choice(["Clay", "Sand"], n_layers), rng.integers(2, 60, n_layers).astype(float))
+
+
+def stepped_bond_length(strata, z_s, sin_theta, effective_dia_cm, required):
+    """The 0.1 m stepping search the app used before the exact solve (None: soil exhausted or over 100 m)."""
+    tops = [0.0] + strata.bottoms.tolist()[:-1]
+    current_l = 0.5
+    while current_l <= 100.0:
+        z_e = z_s + current_l * sin_theta
+        if z_e > strata.max_depth:
+            return None
+        ult = 0.0
+        for top, bottom, soil_type, spt in zip(tops, strata.bottoms.tolist(), strata.soil_types, strata.spt.tolist()):
+            z_ov = max(0.0, min(z_e, bottom) - max(z_s, top))
+            if z_ov > 0:
+                qs = (formulas.calculate_clay_bond_strength(spt) if soil_type == "Clay"
+                      else formulas.calculate_sand_bond_strength(spt)) * capacity.CONV_MPA_TO_KG
+                ult += (qs * (np.pi * effective_dia_cm * (z_ov / sin_theta) * 100.0)) / 1000.0
+        if ult >= required:
+            return current_l
+        current_l += 0.1
+    return None
+
+
+def test_rounded_design_solve_matches_the_stepping_loop():
+    rng = np.random.default_rng(2)
+    compared = 0
+    for _ in range(300):
+        strata = random_strata(rng, int(rng.integers(1, 6)))
+        profile = capacity.CapacityProfile(strata, float(rng.choice([100.0, 150.0, 200.0])))
+        sin_theta = float(np.sin(np.radians(rng.uniform(10.0, 60.0))))
+        z_s = float(rng.uniform(0.0, 0.5 * strata.max_depth))
+        required = float(rng.uniform(5.0, 200.0))
+        expected = stepped_bond_length(strata, z_s, sin_theta, profile.effective_dia_cm, required)
+        solved = profile.required_bond_length(z_s, sin_theta, required, step=0.1)
+        if expected is None:
+            assert np.isnan(solved)
+        else:
+            assert solved == pytest.approx(expected, abs=1e-9)
+            compared += 1
+    assert compared > 100
+
+
+def test_exact_design_solve_reaches_the_required_capacity():
+    strata = capacity.Stratigraphy([4.0, 9.0, 30.0], ["Clay", "Sand", "Sand"], [10.0, 28.0, 45.0])
+    profile = capacity.CapacityProfile(strata, 150.0)
+    sin_theta = np.sin(np.radians(30.0))
+    for required in (1.0, 20.0, 60.0, 150.0):
+        length = profile.required_bond_length(3.0, sin_theta, required)
+        assert profile.capacity(3.0, 3.0 + length * sin_theta, sin_theta) == pytest.approx(required)
+        rounded = profile.required_bond_length(3.0, sin_theta, required, step=0.1)
+        assert rounded == pytest.approx(max(0.5, np.ceil(length * 10 - 1e-9) / 10))
+
+
+def test_design_solve_reports_insufficient_soil():
+    strata = capacity.Stratigraphy([5.0], ["Sand"], [10.0])
+    profile = capacity.CapacityProfile(strata, 150.0)
+    assert np.isnan(profile.required_bond_length(1.0, 0.5, 1e6))
+    assert np.isnan(profile.required_bond_length(1.0, 0.5, 1e6, step=0.1))
+
+
+STRATA = capacity.Stratigraphy([3.0, 2.0, 8.0, 15.0], ["Clay", "Sand", "Sand", "Clay"], [12.0, 30.0, 0.0, 40.0])
+
+
+def test_out_of_order_rows_have_zero_thickness():
+    np.testing.assert_allclose(STRATA.boundaries, [0.0, 3.0, 3.0, 8.0, 15.0])
+    profile = capacity.CapacityProfile(STRATA, 150.0)
+    np.testing.assert_allclose(profile.overlaps(1.0, 10.0), [2.0, 0.0, 5.0, 2.0])
+
+
+def test_depth_capacity_is_the_integral_of_unit_capacity():
+    profile = capacity.CapacityProfile(STRATA, 150.0)
+    z = np.linspace(0.0, 20.0, 81)
+    unit = capacity.layer_unit_capacity(STRATA.soil_types, STRATA.spt, profile.effective_dia_cm)
+    expected = [sum(u * o for u, o in zip(unit, profile.overlaps(0.0, d))) for d in z]
+    np.testing.assert_allclose(profile.depth_capacity(z), expected)
+    assert profile.depth_capacity(20.0) == profile.depth_capacity(15.0)
+    assert profile.capacity(1.0, 10.0, 0.5) == pytest.approx(2 * (profile.depth_capacity(10.0) - profile.depth_capacity(1.0)))
+
+
+def test_depth_at_capacity_inverts_depth_capacity():
+    profile = capacity.CapacityProfile(STRATA, 150.0)
+    z_start = np.array([0.0, 1.0, 3.0, 4.0, 7.5])
+    required = np.array([5.0, 30.0, 10.0, 0.0, 40.0])
+    depth = profile.depth_at_capacity(z_start, required, 1.0)
+    np.testing.assert_allclose(profile.depth_capacity(depth) - profile.depth_capacity(z_start), required)
+    # The SPT 0 layer (3-8 m) gives no capacity, so the bond is solved in the clay below it
+    assert 8.0 < profile.depth_at_capacity(4.0, 10.0, 1.0) < 15.0
+    assert np.isnan(profile.depth_at_capacity(0.0, profile.depth_capacity(15.0) + 1.0, 1.0))
+    assert profile.depth_at_capacity(5.0, 0.0, 1.0) == 5.0
+
+
+def test_required_bond_length_accounts_for_inclination():
+    profile = capacity.CapacityProfile(STRATA, 150.0)
+    vertical = profile.required_bond_length(1.0, 1.0, 20.0)
+    inclined = profile.required_bond_length(1.0, 0.5, 20.0)
+    assert profile.capacity(1.0, 1.0 + inclined * 0.5, 0.5) == pytest.approx(20.0)
+    assert inclined < 2 * vertical
+
+
+def test_profile_stack_rows_match_single_profiles():
+    rng = np.random.default_rng(3)
+    strats = [random_strata(rng, n) for n in (1, 3, 6, 2)]
+    dia = np.array([100.0, 150.0, 150.0, 200.0])
+    enlarge = np.array([1.0, 1.2, 1.0, 1.5])
+    stack = capacity.ProfileStack.from_stratigraphies(strats, dia, enlarge)
+    profiles = [capacity.CapacityProfile(s, d, e) for s, d, e in zip(strats, dia, enlarge)]
+
+    assert stack.bond_strength.shape == (4, 6)
+    np.testing.assert_allclose(stack.max_depth, [s.max_depth for s in strats])
+    z_s = np.array([0.2, 1.0, 2.0, 0.5])
+    z_e = np.minimum(z_s + 6.0, stack.max_depth)
+    sin_theta = np.sin(np.radians([15.0, 30.0, 45.0, 60.0]))
+    required = np.array([10.0, 40.0, 80.0, 1e6])
+    np.testing.assert_allclose(stack.capacity(z_s, z_e, sin_theta),
+                               [p.capacity(a, b, s) for p, a, b, s in zip(profiles, z_s, z_e, sin_theta)])
+    np.testing.assert_allclose(stack.depth_at_capacity(z_s, required, sin_theta),
+                               [p.depth_at_capacity(a, r, s) for p, a, r, s in zip(profiles, z_s, required, sin_theta)])
+    for step in (None, 0.1):
+        np.testing.assert_allclose(stack.required_bond_length(z_s, sin_theta, required, step=step),
+                                   [p.required_bond_length(a, s, r, step=step)
+                                    for p, a, r, s in zip(profiles, z_s, required, sin_theta)])
+    overlaps = stack.overlaps(z_s, z_e)
+    for k, (p, s) in enumerate(zip(profiles, strats)):
+        np.testing.assert_allclose(overlaps[k, :len(s)], p.overlaps(z_s[k], z_e[k]))
+        # Padding layers have zero thickness, so no bond ever overlaps them
+        assert not overlaps[k, len(s):].any()
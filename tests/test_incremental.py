@@ -0,0 +1,63 @@
+import numpy as np
+
+import incremental
+
+
+def counting(value):
+    calls = []
+
+    def compute():
+        calls.append(value)
+        return value
+    return compute, calls
+
+
+def run(store, soil, anchor, view):
+    graph = incremental.Graph(store, "analysis")
+    profile = graph.stage("profile", soil, [], lambda: f"profile({soil})")
+    result = graph.stage("result", anchor, ["profile"], lambda: f"result({profile}, {anchor})")
+    graph.stage("figure", view, ["result"], lambda: f"figure({result}, {view})")
+    return graph
+
+
+def test_unchanged_inputs_reuse_every_stage():
+    store = {}
+    assert run(store, "soil", "anchor", "view").recomputed == ["profile", "result", "figure"]
+    graph = run(store, "soil", "anchor", "view")
+    assert graph.recomputed == [] and graph.reused == ["profile", "result", "figure"]
+    assert store["analysis.figure"]["value"] == "figure(result(profile(soil), anchor), view)"
+
+
+def test_changed_key_recomputes_only_that_stage_and_its_dependants():
+    store = {}
+    run(store, "soil", "anchor", "view")
+    graph = run(store, "soil", "anchor", "zoomed")
+    assert graph.recomputed == ["figure"] and graph.reused == ["profile", "result"]
+    graph = run(store, "soil", "longer anchor", "zoomed")
+    assert graph.recomputed == ["result", "figure"]
+    assert graph.version("profile") == 1 and graph.version("result") == 2 and graph.version("figure") == 3
+
+
+def test_upstream_version_change_invalidates_downstream_stages():
+    store = {}
+    run(store, "soil", "anchor", "view")
+    graph = run(store, "new soil", "anchor", "view")
+    assert graph.recomputed == ["profile", "result", "figure"]
+    assert store["analysis.figure"]["value"] == "figure(result(profile(new soil), anchor), view)"
+    # Going back to the old soil is a new version too, not a cache hit on the first one
+    assert run(store, "soil", "anchor", "view").recomputed == ["profile", "result", "figure"]
+
+
+def test_array_keys_and_clear():
+    store = {"other.profile": 1}
+    graph = incremental.Graph(store, "analysis")
+    compute, calls = counting("value")
+    graph.stage("profile", np.arange(3), [], compute)
+    graph.stage("profile", np.arange(3), [], compute)
+    assert len(calls) == 2  # arrays never compare equal as a whole, so they are recomputed
+    graph.stage("profile", (1.0, "Clay"), [], compute)
+    graph.stage("profile", (1.0, "Clay"), [], compute)
+    assert len(calls) == 3
+    incremental.clear(store, "analysis")
+    assert store == {"other.profile": 1}
+    assert graph.version("profile") == 0
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import anchor_engine
+import capacity
+import optimiser
+
+STRATA = capacity.Stratigraphy([3.0, 6.0, 12.0, 40.0], ["Clay", "Sand", "Clay", "Sand"], [25.0, 18.0, 30.0, 45.0])
+ANGLES = [15.0, 30.0, 45.0]
+
+
+def anchor(result, i, **overrides):
+    return anchor_engine.Anchor(free_length=float(result.free_length[i]), angle_deg=float(result.angle_deg[i]),
+                                dia_mm=float(result.dia_mm[i]), design_load=60.0, fos=2.0, **overrides)
+
+
+def test_optimise_prunes_short_free_lengths_long_bonds_and_weak_layers(monkeypatch):
+    result = optimiser.optimise(STRATA, 60.0, 2.0, ANGLES, free_lengths=[2.0, 4.0, 4.5, 6.0, 9.0])
+    assert result.n_evaluated == len(ANGLES) * len(optimiser.DRILL_SIZES) * 3
+    assert len(result)
+    assert (result.free_length >= anchor_engine.MIN_FREE_LENGTH).all()
+    assert (result.bond_length <= anchor_engine.PULLOUT_TEST_BOND_LENGTH).all()
+    assert (np.diff(result.cost) >= 0).all()
+    for i in range(len(result)):
+        design = anchor_engine.analyse(anchor_engine.MODE_DESIGN, anchor(result, i), STRATA)
+        assert design.bond_length == pytest.approx(result.bond_length[i])
+        # The SPT 18 sand between 3 m and 6 m is below the SNI minimum of 25
+        assert not design.violations
+
+    monkeypatch.setattr(optimiser, "_spt_violation", lambda strata, z_start, z_end: np.zeros(np.shape(z_start), bool))
+    assert len(optimiser.optimise(STRATA, 60.0, 2.0, ANGLES, free_lengths=[2.0, 4.0, 4.5, 6.0, 9.0])) > len(result)
+
+
+def test_optimise_allows_longer_bonds_with_a_pullout_test():
+    limited = optimiser.optimise(STRATA, 60.0, 2.0, ANGLES, diameters=[100.0])
+    tested = optimiser.optimise(STRATA, 60.0, 2.0, ANGLES, diameters=[100.0], allow_pullout_test=True)
+    assert (tested.bond_length > anchor_engine.PULLOUT_TEST_BOND_LENGTH).any()
+    assert len(tested) > len(limited)
+
+
+def test_cost_model_rates_per_diameter():
+    cost_model = optimiser.CostModel(drill_per_m=[2.0, 3.0], grout_per_m=[1.0, 4.0])
+    result = optimiser.optimise(STRATA, 40.0, 2.0, [30.0], diameters=[150.0, 200.0], free_lengths=[6.0],
+                                cost_model=cost_model)
+    for i in range(len(result)):
+        drill, grout = (2.0, 1.0) if result.dia_mm[i] == 150.0 else (3.0, 4.0)
+        expected = drill * (result.free_length[i] + result.bond_length[i]) + grout * result.bond_length[i]
+        assert result.cost[i] == pytest.approx(expected)
+
+
+def candidates(cost, total_length):
+    cost, total_length = np.asarray(cost, dtype=float), np.asarray(total_length, dtype=float)
+    order = np.lexsort((total_length, cost))
+    zeros = np.zeros(len(cost))
+    return optimiser.OptimisationResult(zeros, zeros, zeros, total_length[order], cost[order], len(cost))
+
+
+def test_pareto_indices_keep_candidates_not_beaten_on_both():
+    result = candidates([10, 12, 12, 15, 20, 25], [30, 28, 29, 31, 20, 20])
+    assert result.pareto_indices().tolist() == [0, 1, 4]
+    assert candidates([], []).pareto_indices().tolist() == []
+
+
+def test_pareto_indices_match_brute_force():
+    rng = np.random.default_rng(4)
+    result = candidates(rng.uniform(0, 100, 200), rng.uniform(0, 50, 200))
+    cost, length = result.cost, result.total_length
+    dominated = [((cost <= cost[i]) & (length <= length[i]) & ((cost < cost[i]) | (length < length[i]))).any()
+                 for i in range(len(result))]
+    assert result.pareto_indices().tolist() == np.flatnonzero(~np.array(dominated)).tolist()
@@ -0,0 +1,54 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import anchor_engine
+import capacity
+import parametric
+
+STRATA = capacity.Stratigraphy([4.0, 9.0, 16.0], ["Clay", "Sand", "Sand"], [14.0, 28.0, 42.0])
+ANGLES = [15.0, 30.0, 45.0]
+DIAMETERS = [100.0, 150.0, 200.0]
+ENLARGEMENTS = [1.0, 1.3]
+FREE_LENGTHS = [4.5, 8.0, 20.0]
+
+
+@pytest.mark.parametrize("step", [None, 0.1])
+def test_sweep_matches_direct_evaluation(step):
+    grid = parametric.sweep(STRATA, ANGLES, DIAMETERS, ENLARGEMENTS, FREE_LENGTHS, design_load=30.0, fos=2.0,
+                            bond_length=10.0, elevation=1.0, step=step)
+    assert grid.shape == (3, 3, 2, 3)
+    for (i, angle), (j, dia), (k, enlarge), (m, free) in itertools.product(
+            *(enumerate(axis) for axis in (ANGLES, DIAMETERS, ENLARGEMENTS, FREE_LENGTHS))):
+        anchor = anchor_engine.Anchor(free_length=free, angle_deg=angle, dia_mm=dia, design_load=30.0,
+                                      bond_length=10.0, fos=2.0, enlarge_coeff=enlarge, elevation=1.0)
+        design = anchor_engine.analyse(anchor_engine.MODE_DESIGN, anchor, STRATA, step=step)
+        if design.ok:
+            assert grid.required_bond_length[i, j, k, m] == pytest.approx(design.bond_length)
+        else:
+            assert np.isnan(grid.required_bond_length[i, j, k, m])
+        safety = anchor_engine.analyse(anchor_engine.MODE_SAFETY, anchor, STRATA)
+        if safety.ok:
+            assert grid.fos[i, j, k, m] == pytest.approx(safety.fos)
+        else:
+            assert np.isnan(grid.fos[i, j, k, m])
+    # Some points must hit the soil limit for the NaN branch to be exercised
+    assert np.isnan(grid.fos).any() and np.isfinite(grid.fos).any()
+
+
+def test_required_length_grid_scales_with_the_bulb_diameter():
+    grid = parametric.required_length_grid(STRATA, [30.0], [100.0, 200.0], [1.0], [5.0], required_capacity=40.0)
+    profile = capacity.CapacityProfile(STRATA, 200.0)
+    sin_theta = np.sin(np.radians(30.0))
+    assert grid[0, 1, 0, 0] == pytest.approx(profile.required_bond_length(5.0 * sin_theta, sin_theta, 40.0))
+    assert grid[0, 0, 0, 0] > grid[0, 1, 0, 0]
+
+
+def test_slice2d_puts_y_on_rows_and_x_on_columns():
+    grid = parametric.sweep(STRATA, ANGLES, DIAMETERS, ENLARGEMENTS, FREE_LENGTHS, 30.0, 2.0, 10.0)
+    plane = grid.slice2d(grid.fos, "dia_mm", "free_length", {"angle_deg": 1, "enlarge_coeff": 0})
+    assert plane.shape == (len(FREE_LENGTHS), len(DIAMETERS))
+    np.testing.assert_array_equal(plane, grid.fos[1, :, 0, :].T)
+    plane = grid.slice2d(grid.fos, "free_length", "angle_deg", {"dia_mm": 2, "enlarge_coeff": 1})
+    np.testing.assert_array_equal(plane, grid.fos[:, 2, 1, :])
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import plots
+
+go = pytest.importorskip("plotly.graph_objects")
+
+
+def alternating(n_layers, thickness=0.1):
+    bottoms = np.cumsum(np.full(n_layers, thickness))
+    return bottoms, np.where(np.arange(n_layers) % 2, "Sand", "Clay").astype(object)
+
+
+def test_soil_runs_merge_same_type_layers_and_drop_empty_ones():
+    tops, bottoms, types = plots._soil_runs([2.0, 4.0, 3.0, 6.0, 6.0, 9.0], ["Clay", "Clay", "Sand", "Sand", "Clay", "Clay"])
+    assert tops.tolist() == [0.0, 4.0, 6.0]
+    assert bottoms.tolist() == [4.0, 6.0, 9.0]
+    assert types.tolist() == ["Clay", "Sand", "Clay"]
+
+
+def test_label_runs_keep_the_thickest_run_per_depth_bin():
+    tops = np.array([0.0, 1.0, 1.5, 5.0, 5.2])
+    bottoms = np.array([1.0, 1.5, 5.0, 5.2, 10.0])
+    assert plots._label_runs(tops, bottoms, 10.0, 2).tolist() == [2, 4]
+    assert plots._label_runs(tops, bottoms, 10.0, 100).tolist() == [0, 1, 2, 3, 4]
+    assert plots._label_runs(np.array([]), np.array([]), 10.0, 5).tolist() == []
+
+
+def strata_traces(n_layers):
+    bottoms, types = alternating(n_layers)
+    fig = go.Figure()
+    plots._add_strata(fig, bottoms, types, 0.0, 10.0, float(bottoms[-1]))
+    return fig.data[:-1], fig.data[-1]
+
+
+def test_few_runs_are_drawn_as_one_filled_trace_per_soil_type():
+    strata, labels = strata_traces(plots.MAX_STRATA_POLYGONS)
+    assert [t.type for t in strata] == ["scatter", "scatter"]
+    assert sorted(t.name for t in strata) == ["Clay", "Sand"]
+    assert len(labels.text) == plots.MAX_SOIL_LABELS
+
+
+def test_many_runs_fall_back_to_a_fixed_size_heatmap():
+    strata, labels = strata_traces(plots.MAX_STRATA_POLYGONS + 1)
+    assert [t.type for t in strata] == ["heatmap"]
+    assert len(strata[0].z) == plots.STRATA_CELLS
+    assert len(labels.text) == plots.MAX_SOIL_LABELS
+    # The figure size does not grow with the number of layers
+    assert len(strata_traces(20_000)[0][0].z) == plots.STRATA_CELLS
+
+
+def test_strata_cells_colour_codes():
+    tops, bottoms, types = plots._soil_runs([2.0, 5.0], ["Clay", "Sand"])
+    edges, codes = plots._strata_cells(tops, bottoms, types, 10.0, 10)
+    assert len(edges) == 11
+    assert codes.tolist() == [0, 0, 1, 1, 1, 2, 2, 2, 2, 2]
+
+
+def test_anchor_figure_with_a_detailed_log():
+    bottoms, types = alternating(5000, thickness=0.01)
+    layers = pd.DataFrame({"Elevation (m)": bottoms, "Soil Type": types})
+    fig = plots.plot_anchor_plotly(layers, 5.0, 10.0, 0.0, 30.0)
+    assert sum(t.type == "heatmap" for t in fig.data) == 1
+    labels = [t for t in fig.data if t.type == "scatter" and t.mode == "text"]
+    assert labels and max(len(t.text) for t in labels) <= plots.MAX_SOIL_LABELS
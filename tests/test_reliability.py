@@ -0,0 +1,41 @@
+import math
+
+import numpy as np
+import pytest
+
+import anchor_engine
+import capacity
+import reliability
+
+STRATA = capacity.Stratigraphy([8.0, 30.0], ["Clay", "Sand"], [25.0, 40.0])
+ANCHOR = anchor_engine.Anchor(free_length=5.0, angle_deg=30.0, dia_mm=150.0, design_load=20.0, bond_length=10.0)
+
+
+def test_zero_covs_give_deterministic_fos_and_infinite_beta():
+    result = reliability.simulate(ANCHOR, STRATA, spt_cov=0.0, n_samples=1000, workers=1)
+    assert np.allclose(result.fos, result.deterministic_fos)
+    assert result.deterministic_fos > 1
+    assert result.reliability_index_lognormal == math.inf
+    assert result.reliability_index == math.inf
+
+
+def test_deterministic_fos_below_one_gives_negative_infinite_beta():
+    weak = anchor_engine.Anchor(free_length=5.0, angle_deg=30.0, dia_mm=150.0, design_load=500.0, bond_length=10.0)
+    result = reliability.simulate(weak, STRATA, spt_cov=0.0, n_samples=1000, workers=1)
+    assert result.reliability_index_lognormal == -math.inf
+
+
+def test_beta_is_finite_with_spread():
+    result = reliability.simulate(ANCHOR, STRATA, spt_cov=0.3, n_samples=20_000, workers=1)
+    assert math.isfinite(result.reliability_index_lognormal)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"spt_cov": [0.2, float("nan")]},
+    {"spt_cov": [0.2, -0.1]},
+    {"spt_cov": 0.2, "dia_cov": float("nan")},
+    {"spt_cov": 0.2, "enlarge_cov": -1.0},
+])
+def test_invalid_covs_are_rejected_before_sampling(kwargs):
+    with pytest.raises(ValueError, match="COV"):
+        reliability.simulate(ANCHOR, STRATA, n_samples=1000, workers=1, **kwargs)
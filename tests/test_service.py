@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import anchor_engine
+import service
+
+SOIL = [{"Elevation (m)": 8.0, "Soil Type": "Clay", "SPT": 12.0}, {"Elevation (m)": 30.0, "Soil Type": "Sand", "SPT": 35.0}]
+
+
+def case(**overrides):
+    params = dict(free_length=5.0, angle_deg=30.0, dia_mm=150.0, design_load=20.0, bond_length=10.0, fos=2.0)
+    params.update(overrides)
+    return {"anchor": params, "soil": SOIL}
+
+
+def route_all(bodies, mode="check"):
+    async def main():
+        svc = service.Service(max_wait=0.05)
+        svc.batcher.start()
+        try:
+            return await asyncio.gather(*[svc._route("POST", f"/{mode}", body) for body in bodies]), svc.metrics.snapshot()
+        finally:
+            await svc.stop()
+    return asyncio.run(main())
+
+
+def test_exception_fails_only_its_own_request(monkeypatch):
+    analyse, analyse_many = anchor_engine.analyse, anchor_engine.analyse_many
+
+    def flaky(mode, a, strata, profile=None, step=anchor_engine.LENGTH_STEP):
+        if a.design_load == 99.0:
+            raise ZeroDivisionError("boom")
+        return analyse(mode, a, strata, profile=profile, step=step)
+
+    def flaky_many(mode, anchors, stratigraphies, step=anchor_engine.LENGTH_STEP):
+        if any(a.design_load == 99.0 for a in anchors):
+            raise ZeroDivisionError("boom")
+        return analyse_many(mode, anchors, stratigraphies, step=step)
+
+    monkeypatch.setattr(anchor_engine, "analyse", flaky)
+    monkeypatch.setattr(anchor_engine, "analyse_many", flaky_many)
+    bodies = [json.dumps(case(design_load=99.0 if i == 3 else 20.0)).encode() for i in range(8)]
+    responses, metrics = route_all(bodies)
+    assert [status for status, _ in responses] == [200, 200, 200, 500, 200, 200, 200, 200]
+    assert "ZeroDivisionError" in responses[3][1]["error"]
+    assert metrics["errors"] == {"check": 1}
+
+
+def test_invalid_requests_get_400():
+    bodies = [b"{not json", b"[]", json.dumps({"anchor": {}}).encode(), json.dumps(case()).encode()]
+    responses, _ = route_all(bodies)
+    assert [status for status, _ in responses] == [400, 400, 400, 200]
+
+
+def test_out_of_range_fields_get_400():
+    bad_soil = [{**SOIL[0], "SPT": float("nan")}, SOIL[1]]
+    bodies = [json.dumps(c).encode() for c in (case(fos=0.0), case(angle_deg=0.0), case(dia_mm=-150.0),
+                                                case(design_load=float("inf")), {**case(), "soil": bad_soil},
+                                                {**case(), "exact": "yes"}, case())]
+    responses, metrics = route_all(bodies)
+    assert [status for status, _ in responses] == [400] * 6 + [200]
+    assert "Factor of safety" in responses[0][1]["error"]
+    assert metrics["errors"] == {"check": 6}
+
+
+def test_non_finite_result_is_500_not_invalid_json(monkeypatch):
+    analyse_many = anchor_engine.analyse_many
+
+    def non_finite(*args, **kwargs):
+        results = analyse_many(*args, **kwargs)
+        for result in results:
+            result.working_capacity = float("nan")
+        return results
+
+    monkeypatch.setattr(anchor_engine, "analyse_many", non_finite)
+    responses, _ = route_all([json.dumps(case()).encode()])
+    assert responses[0][0] == 500
+    service.encode(responses[0][1])
+
+
+def test_malformed_http_request_gets_400():
+    async def main():
+        svc = service.Service()
+        server = await svc.start(port=0)
+        try:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(b"POST /check HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            await svc.stop()
+    assert asyncio.run(main()).startswith(b"HTTP/1.1 400 ")
+
+
+def test_batch_matches_single_evaluation():
+    modes = [anchor_engine.MODE_CHECK, anchor_engine.MODE_DESIGN, anchor_engine.MODE_SAFETY]
+    bodies = [case(angle_deg=15.0 + 5 * i, dia_mm=100.0 + 10 * i, bond_length=4.0 + i) for i in range(6)]
+    bodies[1]["soil"] = SOIL[:1]
+    bodies[2]["exact"] = True
+    for mode in modes:
+        items = [(mode, *service.parse_case(body, mode)) for body in bodies]
+        batched = service.evaluate_batch(items)
+        single = [anchor_engine.analyse(m, a, s, step=step) for m, a, s, step in items]
+        assert [r.to_dict() for r in batched] == [r.to_dict() for r in single]
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import anchor_engine
+import capacity
+import wall
+
+BOREHOLES = [
+    {"borehole": "BH-1", "chainage": 0.0, "Elevation (m)": 6.0, "Soil Type": "Clay", "SPT": 22.0},
+    {"borehole": "BH-1", "chainage": 0.0, "Elevation (m)": 20.0, "Soil Type": "Sand", "SPT": 30.0},
+    {"borehole": "BH-3", "chainage": 80.0, "Elevation (m)": 5.0, "Soil Type": "Sand", "SPT": 40.0},
+    {"borehole": "BH-2", "chainage": 40.0, "Elevation (m)": 10.0, "Soil Type": "Clay", "SPT": 26.0},
+    {"borehole": "BH-2", "chainage": 40.0, "Elevation (m)": 24.0, "Soil Type": "Sand", "SPT": 34.0},
+]
+ROW = {"elevation": 1.5, "free_length": 6.0, "bond_length": 10.0, "angle_deg": 20.0, "dia_mm": 150.0,
+       "enlarge_coeff": 1.0, "design_load": 30.0, "fos": 2.5}
+
+
+@pytest.fixture
+def index():
+    return wall.BoreholeIndex.from_records(BOREHOLES)
+
+
+def test_bracket_sorts_boreholes_and_clamps_past_the_ends(index):
+    assert index.names == ["BH-1", "BH-2", "BH-3"]
+    left, right, weight = index.bracket([-5.0, 0.0, 10.0, 40.0, 60.0, 95.0])
+    assert left.tolist() == [0, 0, 0, 0, 1, 1]
+    assert right.tolist() == [1, 1, 1, 1, 2, 2]
+    np.testing.assert_allclose(weight, [0.0, 0.0, 0.25, 1.0, 0.5, 1.0])
+    assert index.nearest([10.0, 30.0, 70.0]).tolist() == [0, 1, 2]
+
+
+def test_bracket_with_one_borehole():
+    index = wall.BoreholeIndex.from_records(BOREHOLES[:2])
+    left, right, weight = index.bracket([-10.0, 0.0, 50.0])
+    assert left.tolist() == right.tolist() == [0, 0, 0]
+    assert weight.tolist() == [0.0, 0.0, 0.0]
+
+
+def test_interpolate_between_compatible_logs(index):
+    bottoms, types, spt = index.interpolate([10.0])
+    np.testing.assert_allclose(bottoms[0], [7.0, 21.0])
+    np.testing.assert_allclose(spt[0], [23.0, 31.0])
+    assert types[0].tolist() == ["Clay", "Sand"]
+
+
+def test_interpolate_uses_nearest_log_when_sequences_differ(index):
+    bottoms, types, spt = index.interpolate([50.0, 70.0])
+    np.testing.assert_allclose(bottoms[0], [10.0, 24.0])
+    assert types[0].tolist() == ["Clay", "Sand"]
+    # BH-3 has one layer; the padding slot is a zero-thickness layer at its bottom
+    np.testing.assert_allclose(bottoms[1], [5.0, 5.0])
+    np.testing.assert_allclose(spt[1], [40.0, 0.0])
+    assert types[1][0] == "Sand"
+
+
+@pytest.mark.parametrize("mode", anchor_engine.MODES)
+def test_evaluate_matches_the_engine(index, mode):
+    anchors = wall.generate_anchors([ROW, {**ROW, "elevation": 4.0, "design_load": 40.0}], 0.0, 40.0, 5.0)
+    result = wall.evaluate(mode, anchors, index)
+    bottoms, types, spt = index.interpolate(anchors.chainage)
+    for i in range(len(anchors)):
+        anchor = anchor_engine.Anchor(**{name: float(getattr(anchors, name)[i]) for name in ROW})
+        expected = anchor_engine.analyse(mode, anchor, capacity.Stratigraphy(bottoms[i], types[i], spt[i]))
+        assert result.status[i] == expected.status
+        assert result.bond_length[i] == pytest.approx(expected.bond_length)
+        assert result.fos[i] == pytest.approx(expected.fos)
+        assert result.working_capacity[i] == pytest.approx(expected.working_capacity)
+        assert result.spt_violation[i] == bool(expected.violations)
+
+
+@pytest.mark.parametrize("mode", anchor_engine.MODES)
+def test_invalid_rows_are_errors_not_passes(index, mode):
+    rows = [ROW, {**ROW, "fos": 0.0}, {**ROW, "angle_deg": 0.0}, {**ROW, "dia_mm": -150.0}]
+    anchors = wall.generate_anchors(rows, 10.0, 10.0, 1.0)
+    with np.errstate(all="raise"):
+        result = wall.evaluate(mode, anchors, index)
+    expected = ["PASS" if mode != anchor_engine.MODE_CHECK else "FAIL", "ERROR", "ERROR", "ERROR"]
+    if mode == anchor_engine.MODE_SAFETY:
+        expected[1] = "PASS"  # the SF is the result in safety mode, not an input
+    assert result.status.tolist() == expected
+    assert all(np.isfinite(result.working_capacity)) and all(np.isfinite(result.fos))
+    assert result.error[2].startswith("Invalid Input: Angle of inclination")
+    records = result.to_records()
+    assert [r["status"] for r in records] == expected
@@ -0,0 +1,223 @@
+"""
+Wall-scale anchor layout.
+
+Boreholes are located by chainage along the wall. Each anchor gets a
+stratigraphy interpolated between the two boreholes bracketing its chainage
+(layer bottoms and SPT interpolated linearly when both logs have the same
+layer sequence, otherwise the nearest borehole is used). All anchors are
+then evaluated together in one ProfileStack pass.
+
+Boreholes CSV columns: borehole, chainage, Elevation (m), Soil Type, SPT
+Anchors CSV columns: anchor_id, chainage, free_length, bond_length, angle_deg,
+    dia_mm, enlarge_coeff, elevation, design_load, fos
+"""
+import csv
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+import anchor_engine
+import batch
+import capacity
+
+
+# ========== Borehole Index ==========
+class BoreholeIndex:
+    """Boreholes sorted by chainage, with bracket and nearest-neighbour lookup."""
+
+    def __init__(self, names, chainages, stratigraphies):
+        order = np.argsort(chainages, kind="stable")
+        self.names = [names[i] for i in order]
+        self.chainages = np.asarray(chainages, dtype=float)[order]
+        self.stratigraphies = [stratigraphies[i] for i in order]
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from layer rows with 'borehole', 'chainage', 'Elevation (m)', 'Soil Type' and 'SPT'."""
+        layers, chainage = {}, {}
+        for row in records:
+            name = str(row["borehole"]).strip()
+            layers.setdefault(name, []).append(row)
+            chainage.setdefault(name, float(row["chainage"]))
+        names = list(layers)
+        return cls(names, [chainage[n] for n in names],
+                   [capacity.Stratigraphy.from_records(layers[n]) for n in names])
+
+    @classmethod
+    def from_csv(cls, source):
+        with batch.open_text(source) as f:
+            return cls.from_records(list(csv.DictReader(f)))
+
+    def __len__(self):
+        return len(self.chainages)
+
+    def bracket(self, chainage):
+        """Indices of the boreholes left and right of each chainage and the weight of the right one."""
+        chainage = np.asarray(chainage, dtype=float)
+        right = np.clip(np.searchsorted(self.chainages, chainage), 1, max(len(self) - 1, 1))
+        left = right - 1
+        if len(self) == 1:
+            return np.zeros_like(right), np.zeros_like(right), np.zeros(chainage.shape)
+        span = self.chainages[right] - self.chainages[left]
+        weight = np.clip(np.divide(chainage - self.chainages[left], span, out=np.zeros(chainage.shape), where=span > 0), 0.0, 1.0)
+        return left, right, weight
+
+    def nearest(self, chainage):
+        left, right, weight = self.bracket(chainage)
+        return np.where(weight > 0.5, right, left)
+
+    def compatible(self, i, j):
+        """Whether two logs have the same layer sequence and can be interpolated."""
+        a, b = self.stratigraphies[i], self.stratigraphies[j]
+        return len(a) == len(b) and np.array_equal(a.soil_types, b.soil_types)
+
+    def interpolate(self, chainage):
+        """
+        Padded (bottoms, soil types, SPT) arrays, one row per chainage.
+        Anchors sharing a bracketing pair are interpolated together; past the
+        first and last borehole the end log is used as is.
+        """
+        chainage = np.atleast_1d(np.asarray(chainage, dtype=float))
+        left, right, weight = self.bracket(chainage)
+        n_layers = max(len(s) for s in self.stratigraphies)
+        bottoms = np.full((len(chainage), n_layers), np.nan)
+        spt = np.zeros((len(chainage), n_layers))
+        types = np.full((len(chainage), n_layers), "Sand", dtype=object)
+
+        pairs, inverse = np.unique(np.stack([left, right], axis=1), axis=0, return_inverse=True)
+        for p, (i, j) in enumerate(pairs):
+            rows = np.flatnonzero(inverse.ravel() == p)
+            w = weight[rows][:, None]
+            a, b = self.stratigraphies[i], self.stratigraphies[j]
+            n = len(a)
+            if i != j and self.compatible(i, j):
+                bottoms[rows, :n] = (1 - w) * a.bottoms + w * b.bottoms
+                spt[rows, :n] = (1 - w) * a.spt + w * b.spt
+                types[rows, :n] = a.soil_types
+            else:
+                for src, sel in ((a, w[:, 0] <= 0.5), (b, w[:, 0] > 0.5)):
+                    r = rows[sel]
+                    bottoms[r, :len(src)] = src.bottoms
+                    spt[r, :len(src)] = src.spt
+                    types[r, :len(src)] = src.soil_types
+        # Unused slots become zero-thickness layers at each row's own bottom
+        return np.fmax.accumulate(bottoms, axis=1), types, spt
+
+
+# ========== Wall Evaluation ==========
+@dataclass
+class WallAnchors:
+    """Anchor inputs as arrays, one entry per anchor."""
+    anchor_id: np.ndarray
+    chainage: np.ndarray
+    free_length: np.ndarray
+    angle_deg: np.ndarray
+    dia_mm: np.ndarray
+    design_load: np.ndarray
+    bond_length: np.ndarray
+    fos: np.ndarray
+    enlarge_coeff: np.ndarray
+    elevation: np.ndarray
+
+    @classmethod
+    def from_records(cls, records):
+        records = list(records)
+        defaults = {"bond_length": 0.0, "fos": 1.0, "enlarge_coeff": 1.0, "elevation": 0.0}
+
+        def column(name):
+            return np.array([float(r[name]) if str(r.get(name, "")).strip() not in ("", "nan") else defaults[name]
+                             for r in records])
+
+        ids = np.array([str(r.get("anchor_id") or i + 1) for i, r in enumerate(records)], dtype=object)
+        return cls(ids, column("chainage"), column("free_length"), column("angle_deg"), column("dia_mm"),
+                   column("design_load"), column("bond_length"), column("fos"), column("enlarge_coeff"),
+                   column("elevation"))
+
+    @classmethod
+    def from_csv(cls, source):
+        with batch.open_text(source) as f:
+            return cls.from_records(list(csv.DictReader(f)))
+
+    def __len__(self):
+        return len(self.chainage)
+
+    def take(self, rows):
+        """The anchors selected by an index or boolean mask."""
+        return WallAnchors(*(getattr(self, f.name)[rows] for f in fields(self)))
+
+
+@dataclass
+class WallResult:
+    mode: str
+    anchors: WallAnchors
+    bond_length: np.ndarray
+    fos: np.ndarray
+    bond_start: np.ndarray
+    bond_end: np.ndarray
+    ultimate_capacity: np.ndarray
+    working_capacity: np.ndarray
+    spt_violation: np.ndarray
+    error: np.ndarray
+
+    @property
+    def status(self):
+        passed = np.where(self.mode == anchor_engine.MODE_CHECK,
+                          self.working_capacity >= self.anchors.design_load, True)
+        return np.where(self.error != "", "ERROR", np.where(passed, "PASS", "FAIL"))
+
+    def to_records(self):
+        a = self.anchors
+        status = self.status
+        return [{
+            "anchor_id": a.anchor_id[i], "chainage": float(a.chainage[i]), "status": status[i],
+            "bond_length": float(self.bond_length[i]), "fos": float(self.fos[i]),
+            "ultimate_capacity": float(self.ultimate_capacity[i]), "working_capacity": float(self.working_capacity[i]),
+            "design_load": float(a.design_load[i]), "spt_violation": bool(self.spt_violation[i]), "error": self.error[i],
+        } for i in range(len(a))]
+
+
+def _spt_violation(stack, overlaps):
+    min_spt = np.vectorize(lambda t: anchor_engine.MIN_SPT.get(t, -np.inf), otypes=[float])(stack.soil_types)
+    return ((stack.spt < min_spt) & (overlaps > 0)).any(axis=1)
+
+
+def evaluate(mode, anchors, index, step=anchor_engine.LENGTH_STEP):
+    """
+    Evaluate every anchor of the wall in one batched pass. Anchors with invalid
+    inputs are not solved and get the engine's input error.
+    """
+    n = len(anchors)
+    notices = anchor_engine.input_errors(mode, anchors)
+    valid = np.array([e is None for e in notices], dtype=bool)
+    bond_l, fos = anchors.bond_length.copy(), anchors.fos.copy()
+    z_s, z_e = anchors.elevation.copy(), anchors.elevation.copy()
+    ultimate, working = np.zeros(n), np.zeros(n)
+    spt_violation = np.zeros(n, dtype=bool)
+
+    if valid.any():
+        solved = anchors.take(valid)
+        bottoms, types, spt = index.interpolate(solved.chainage)
+        stack = capacity.ProfileStack(bottoms, types, spt, solved.dia_mm, solved.enlarge_coeff)
+        bond_l[valid], fos[valid], z_s[valid], z_e[valid], errors = anchor_engine.solve_stack(mode, solved, stack, step=step)
+        for i, e in zip(np.flatnonzero(valid), errors):
+            notices[i] = e
+        ok = np.array([e is None for e in errors], dtype=bool)
+        ultimate[valid] = np.where(ok, stack.capacity(z_s[valid], z_e[valid], np.sin(np.radians(solved.angle_deg))), 0.0)
+        working[valid] = np.divide(ultimate[valid], fos[valid], out=np.zeros(len(solved)), where=ok)
+        spt_violation[valid] = _spt_violation(stack, stack.overlaps(z_s[valid], z_e[valid])) & ok
+
+    error = np.array([f"{e.title}: {e.message}" if e else "" for e in notices], dtype=object)
+    return WallResult(mode, anchors, bond_l, fos, z_s, z_e, ultimate, working, spt_violation, error)
+
+
+def generate_anchors(rows, start, end, spacing):
+    """
+    Anchor rows repeated along the wall every `spacing` metres between chainages
+    `start` and `end`. `rows` are dicts of anchor parameters, one per row.
+    """
+    chainages = np.arange(start, end + 1e-9, spacing)
+    records = []
+    for r, row in enumerate(rows, start=1):
+        for ch in chainages:
+            records.append({**row, "anchor_id": f"R{r}-{ch:.1f}", "chainage": ch})
+    return WallAnchors.from_records(records)